@@ -5,37 +5,37 @@ from typing import Optional
 
 from ..database.session import get_db
 from ..database.models import User
+from ..services import auth_service
 from ..services.auth_service import AuthService
 
 # Security scheme for JWT tokens
 security = HTTPBearer()
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """
-    Dependency to get the current authenticated user.
-    """
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    token = credentials.credentials
-    payload = AuthService.verify_token(token)
-    
-    if payload is None:
-        raise credentials_exception
-    
-    username: str = payload.get("sub")
-    if username is None:
-        raise credentials_exception
-    
-    user = AuthService.get_user_by_username(db, username=username)
+
+def _token_payload(credentials: HTTPAuthorizationCredentials) -> dict:
+    payload = AuthService.verify_token(credentials.credentials)
+    if payload is None or payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+def _load_token_user(payload: dict, db: Session) -> User:
+    user_id = payload.get("uid")
+    if user_id is not None:
+        # Served from the user cache for the following requests of the session
+        user = AuthService.get_token_user(db, user_id, payload.get("ver", 0))
+    else:
+        # Tokens issued before user ids and versions were signed in
+        user = AuthService.get_user_by_username(db, username=payload["sub"])
+        if user is not None and user.token_version:
+            user = None
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     
     if not user.is_active:
         raise HTTPException(
@@ -45,6 +45,41 @@ def get_current_user(
     
     return user
 
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Dependency to get the current authenticated user.
+    
+    The user comes from the user cache (see AuthService.get_token_user) and
+    must not be modified or added to a session. With AUTH_MODE=claims it is
+    built from the token instead, without a query: only id, username, role
+    and token_version are set. Use get_current_user_record for the rest.
+    """
+    payload = _token_payload(credentials)
+    if auth_service.AUTH_MODE == "claims" and payload.get("uid") is not None and payload.get("role"):
+        # Revoked and deactivated users are refused through the version table
+        if not auth_service.token_versions.is_current(db, payload["uid"], payload.get("ver", 0)):
+            raise _credentials_exception()
+        return User(
+            id=payload["uid"],
+            username=payload["sub"],
+            role=payload["role"],
+            token_version=payload.get("ver", 0),
+            is_active=True
+        )
+    return _load_token_user(payload, db)
+
+def get_current_user_record(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Dependency to get the current user with every column loaded, whatever the AUTH_MODE.
+    """
+    return _load_token_user(_token_payload(credentials), db)
+
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """
     Dependency to get the current active user.
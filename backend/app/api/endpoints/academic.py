@@ -1,18 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import date
 
 from ...database.session import get_db
 from ...database.models import User
 from ...api.dependencies import get_current_user
+from ...api.utils import json_response
 from ...schemas.academic import (
     Subject, SubjectCreate, SubjectUpdate,
-    Grade, GradeCreate, GradeUpdate, BulkGradeCreate,
-    Attendance, AttendanceCreate, AttendanceUpdate, BulkAttendanceCreate,
-    AttendanceStats, GradeStats
+    Grade, GradeCreate, GradeUpdate, BulkGradeCreate, BulkGradeResult, BulkModeEnum,
+    Attendance, AttendanceCreate, AttendanceUpdate, BulkAttendanceCreate, BulkAttendanceResult,
+    AttendanceStats, GradeStats, SubjectGradeStats, StudentGradeStats, AcademicPeriodEnum, AttendanceMatrix,
+    AttendanceHeatmap, HeatmapGroupingEnum, SchoolCalendar, SchoolCalendarCreate, AttendanceSummary,
+    ClassRankings, GradeDistribution
 )
 from ...services.academic_service import SubjectService, GradeService, AttendanceService
+from ...services.attendance_bitmap_service import SchoolCalendarService, AttendanceBitmapService, CHRONIC_ABSENCE_RATE
+from ...services.grade_analytics_service import GradeAnalyticsService, parse_type_weights
+from ...services.report_card_service import ReportCardService
 
 router = APIRouter()
 
@@ -49,14 +56,14 @@ def get_subjects(
     current_user: User = Depends(get_current_user)
 ):
     """Get all subjects with optional filtering."""
-    return SubjectService.get_subjects(
+    return json_response(List[Subject], SubjectService.get_subjects(
         db, 
         skip=skip, 
         limit=limit,
         academic_year=academic_year,
         class_id=class_id,
         teacher_id=teacher_id
-    )
+    ))
 
 @router.get("/subjects/{subject_id}", response_model=Subject)
 def get_subject(
@@ -142,13 +149,19 @@ def create_grade(
             detail=str(e)
         )
 
-@router.post("/grades/bulk", response_model=List[Grade], status_code=status.HTTP_201_CREATED)
+@router.post("/grades/bulk", response_model=Union[List[Grade], BulkGradeResult], status_code=status.HTTP_201_CREATED)
 def create_bulk_grades(
     bulk_data: BulkGradeCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Create multiple grades at once. Requires admin or teacher role."""
+    """
+    Create multiple grades at once. Requires admin or teacher role.
+    
+    In the default all_or_nothing mode the created grades are returned and
+    any invalid row rejects the batch. In per_row mode the valid rows are
+    saved and the response lists the created grades and the rejected rows.
+    """
     if current_user.role not in ["admin", "teacher"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -156,13 +169,17 @@ def create_bulk_grades(
         )
     
     try:
-        return GradeService.create_bulk_grades(db, bulk_data, current_user.id)
+        result = GradeService.create_bulk_grades(db, bulk_data, current_user.id)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
 
+    if bulk_data.mode == BulkModeEnum.PER_ROW:
+        return result
+    return result.grades
+
 @router.get("/grades/{grade_id}", response_model=Grade)
 def get_grade(
     grade_id: int,
@@ -188,13 +205,13 @@ def get_student_grades(
     current_user: User = Depends(get_current_user)
 ):
     """Get grades for a specific student."""
-    return GradeService.get_student_grades(
+    return json_response(List[Grade], GradeService.get_student_grades(
         db, 
         student_id,
         subject_id=subject_id,
         academic_year=academic_year,
         academic_period=academic_period
-    )
+    ))
 
 @router.get("/classes/{class_id}/grades", response_model=List[Grade])
 def get_class_grades(
@@ -205,12 +222,12 @@ def get_class_grades(
     current_user: User = Depends(get_current_user)
 ):
     """Get grades for all students in a class."""
-    return GradeService.get_class_grades(
+    return json_response(List[Grade], GradeService.get_class_grades(
         db, 
         class_id,
         subject_id=subject_id,
         academic_period=academic_period
-    )
+    ))
 
 @router.put("/grades/{grade_id}", response_model=Grade)
 def update_grade(
@@ -263,6 +280,136 @@ def get_grade_statistics(
     """Get grade statistics for a student."""
     return GradeService.get_grade_statistics(db, student_id, subject_id)
 
+@router.get("/students/{student_id}/grade-stats/subjects", response_model=List[SubjectGradeStats])
+def get_grade_breakdown(
+    student_id: int,
+    academic_year: Optional[str] = Query(None, description="Filter by academic year"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get a student's grade statistics for each subject and academic period."""
+    return GradeService.get_grade_breakdown(db, student_id, academic_year=academic_year)
+
+@router.get("/classes/{class_id}/grade-stats", response_model=List[StudentGradeStats])
+def get_class_grade_statistics(
+    class_id: int,
+    subject_id: Optional[int] = Query(None, description="Filter by subject ID"),
+    academic_period: Optional[AcademicPeriodEnum] = Query(None, description="Filter by academic period"),
+    academic_year: Optional[str] = Query(None, description="Filter by academic year"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get grade statistics for every student of a class."""
+    return GradeService.get_class_grade_statistics(
+        db,
+        class_id,
+        subject_id=subject_id,
+        academic_period=academic_period,
+        academic_year=academic_year
+    )
+
+@router.get("/classes/{class_id}/rankings", response_model=ClassRankings)
+def get_class_rankings(
+    class_id: int,
+    academic_year: Optional[str] = Query(None, description="Filter by academic year"),
+    academic_period: Optional[AcademicPeriodEnum] = Query(None, description="Filter by academic period"),
+    weights: Optional[str] = Query(None, description="Grade type weights, e.g. exam:4,quiz:0.5"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Rank the students of a class by their average grade, weighted by grade type."""
+    try:
+        return GradeAnalyticsService.get_class_rankings(
+            db,
+            class_id,
+            academic_year=academic_year,
+            academic_period=academic_period,
+            type_weights=parse_type_weights(weights)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.get("/classes/{class_id}/distribution", response_model=GradeDistribution)
+def get_grade_distribution(
+    class_id: int,
+    academic_year: Optional[str] = Query(None, description="Filter by academic year"),
+    academic_period: Optional[AcademicPeriodEnum] = Query(None, description="Filter by academic period"),
+    bins: int = Query(10, description="Number of histogram bins over 0-100%"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the distribution of a class's grades per subject, with histograms."""
+    try:
+        return GradeAnalyticsService.get_grade_distribution(
+            db,
+            class_id,
+            academic_year=academic_year,
+            academic_period=academic_period,
+            bins=bins
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.get("/classes/{class_id}/report-cards", response_class=StreamingResponse)
+def get_class_report_cards(
+    class_id: int,
+    academic_year: Optional[str] = Query(None, description="Filter grades by academic year"),
+    academic_period: Optional[AcademicPeriodEnum] = Query(None, description="Filter grades by academic period"),
+    start_date: Optional[date] = Query(None, description="Count attendance from this day"),
+    end_date: Optional[date] = Query(None, description="Count attendance up to this day"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Download the report cards of a class as a zip of PDFs.
+    
+    Cards whose data did not change since they were last rendered come
+    from the cache; the others are rendered in parallel first.
+    """
+    try:
+        bundle = ReportCardService.get_class_bundle(
+            db, class_id, academic_year, academic_period, start_date, end_date
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    filename = f"report_cards_class_{class_id}_{academic_period.value if academic_period else 'year'}.zip"
+    return StreamingResponse(
+        bundle,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/students/{student_id}/report-card", response_class=FileResponse)
+def get_student_report_card(
+    student_id: int,
+    academic_year: Optional[str] = Query(None, description="Filter grades by academic year"),
+    academic_period: Optional[AcademicPeriodEnum] = Query(None, description="Filter grades by academic period"),
+    start_date: Optional[date] = Query(None, description="Count attendance from this day"),
+    end_date: Optional[date] = Query(None, description="Count attendance up to this day"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Download one student's report card as a PDF."""
+    report_card = ReportCardService.get_student_report_card(
+        db, student_id, academic_year, academic_period, start_date, end_date
+    )
+    if not report_card:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Student not found"
+        )
+    filename, path = report_card
+    return FileResponse(path, media_type="application/pdf", filename=filename)
+
 # Attendance endpoints
 @router.post("/attendance/", response_model=Attendance, status_code=status.HTTP_201_CREATED)
 def create_attendance(
@@ -290,13 +437,19 @@ def create_attendance(
             detail=str(e)
         )
 
-@router.post("/attendance/bulk", response_model=List[Attendance], status_code=status.HTTP_201_CREATED)
+@router.post("/attendance/bulk", response_model=BulkAttendanceResult, status_code=status.HTTP_201_CREATED)
 def create_bulk_attendance(
     bulk_data: BulkAttendanceCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Create attendance records for multiple students. Requires admin or teacher role."""
+    """
+    Record or correct a class's roll call for one day. Requires admin or teacher role.
+    
+    Students already marked that day are updated rather than skipped, and
+    the response tells for each student whether their record was inserted,
+    updated or left unchanged.
+    """
     if current_user.role not in ["admin", "teacher"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -311,6 +464,26 @@ def create_bulk_attendance(
             detail=str(e)
         )
 
+@router.get("/attendance/heatmap", response_model=AttendanceHeatmap)
+def get_attendance_heatmap(
+    group_by: HeatmapGroupingEnum = Query(HeatmapGroupingEnum.WEEKDAY, description="Group the days by weekday or by month"),
+    class_id: Optional[int] = Query(None, description="Filter by class"),
+    academic_year: Optional[str] = Query(None, description="Filter by academic year of the class"),
+    start_date: Optional[date] = Query(None, description="First day to include"),
+    end_date: Optional[date] = Query(None, description="Last day to include"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get attendance counts and rates by weekday or by month."""
+    return AttendanceService.get_attendance_heatmap(
+        db,
+        group_by,
+        class_id=class_id,
+        academic_year=academic_year,
+        start_date=start_date,
+        end_date=end_date
+    )
+
 @router.get("/attendance/{attendance_id}", response_model=Attendance)
 def get_attendance(
     attendance_id: int,
@@ -336,13 +509,13 @@ def get_student_attendance(
     current_user: User = Depends(get_current_user)
 ):
     """Get attendance records for a specific student."""
-    return AttendanceService.get_student_attendance(
+    return json_response(List[Attendance], AttendanceService.get_student_attendance(
         db, 
         student_id,
         start_date=start_date,
         end_date=end_date,
         class_id=class_id
-    )
+    ))
 
 @router.get("/classes/{class_id}/attendance", response_model=List[Attendance])
 def get_class_attendance(
@@ -352,7 +525,7 @@ def get_class_attendance(
     current_user: User = Depends(get_current_user)
 ):
     """Get attendance for all students in a class on a specific date."""
-    return AttendanceService.get_class_attendance(db, class_id, attendance_date)
+    return json_response(List[Attendance], AttendanceService.get_class_attendance(db, class_id, attendance_date))
 
 @router.put("/attendance/{attendance_id}", response_model=Attendance)
 def update_attendance(
@@ -391,3 +564,79 @@ def get_attendance_statistics(
         start_date=start_date,
         end_date=end_date
     )
+
+@router.get("/classes/{class_id}/attendance-matrix", response_model=AttendanceMatrix)
+def get_class_attendance_matrix(
+    class_id: int,
+    start_date: date = Query(..., description="First day of the register"),
+    end_date: date = Query(..., description="Last day of the register"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the attendance register of a class: one status per student and day."""
+    try:
+        return AttendanceService.get_class_attendance_matrix(db, class_id, start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.get("/students/{student_id}/attendance-summary", response_model=AttendanceSummary)
+def get_attendance_summary(
+    student_id: int,
+    academic_year: str = Query(..., description="Academic year of the calendar"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get a student's attendance rate and absence streaks for a year, from their attendance bitmap."""
+    return AttendanceBitmapService.get_attendance_summary(db, student_id, academic_year)
+
+@router.get("/classes/{class_id}/chronic-absence", response_model=List[AttendanceSummary])
+def get_chronic_absences(
+    class_id: int,
+    academic_year: str = Query(..., description="Academic year of the calendar"),
+    threshold: float = Query(CHRONIC_ABSENCE_RATE, gt=0, le=1, description="Share of marked days missed"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the students of a class who are chronically absent, worst first."""
+    return AttendanceBitmapService.get_chronic_absences(db, class_id, academic_year, threshold)
+
+# School calendar endpoints
+@router.put("/calendars/{academic_year}", response_model=SchoolCalendar)
+def set_school_calendar(
+    academic_year: str,
+    calendar_data: SchoolCalendarCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Set the school days and holidays of an academic year. Requires admin role."""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can set the school calendar"
+        )
+    
+    try:
+        return SchoolCalendarService.set_calendar(db, academic_year, calendar_data)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.get("/calendars/{academic_year}", response_model=SchoolCalendar)
+def get_school_calendar(
+    academic_year: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the calendar of an academic year."""
+    calendar = SchoolCalendarService.get_calendar(db, academic_year)
+    if not calendar:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Calendar not found"
+        )
+    return calendar
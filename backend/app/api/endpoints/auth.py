@@ -1,13 +1,13 @@
-from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List
 
 from ...database.session import get_db
-from ...schemas.user import UserCreate, UserLogin, UserResponse, Token, PasswordChange
-from ...services.auth_service import AuthService, ACCESS_TOKEN_EXPIRE_MINUTES
-from ...api.dependencies import get_current_user, require_admin
+from ...schemas.user import UserCreate, UserLogin, UserResponse, Token, PasswordChange, RefreshRequest
+from ...services.auth_service import AuthService
+from ...api.dependencies import get_current_user_record, require_admin
 from ...database.models import User
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
@@ -34,14 +34,17 @@ def register_user(
     )
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     user_credentials: UserLogin,
     db: Session = Depends(get_db)
 ):
     """
     Authenticate user and return access token.
+    
+    The password check runs on the password hasher's own threads, so a
+    burst of logins does not hold up the request thread pool.
     """
-    user = AuthService.authenticate_user(
+    user = await AuthService.authenticate_user_async(
         db, 
         user_credentials.username, 
         user_credentials.password
@@ -60,20 +63,33 @@ def login(
             detail="Account is deactivated"
         )
     
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = AuthService.create_access_token(
-        data={"sub": user.username, "role": user.role},
-        expires_delta=access_token_expires
-    )
+    return await run_in_threadpool(AuthService.issue_tokens, db, user)
+
+@router.post("/refresh", response_model=Token)
+def refresh(
+    refresh_data: RefreshRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Exchange a refresh token for a new access token and refresh token.
     
-    return Token(
-        access_token=access_token,
-        token_type="bearer",
-        expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60  # Convert to seconds
-    )
+    No password check: renewing an expired access token costs one indexed
+    lookup. The refresh token given is used up, keep the new one.
+    """
+    return AuthService.refresh_tokens(db, refresh_data.refresh_token)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    refresh_data: RefreshRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Revoke a refresh token. The access token expires on its own.
+    """
+    AuthService.revoke_refresh_token(db, refresh_data.refresh_token)
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+def get_current_user_info(current_user: User = Depends(get_current_user_record)):
     """
     Get current user information.
     """
@@ -91,7 +107,7 @@ def get_current_user_info(current_user: User = Depends(get_current_user)):
 @router.put("/change-password", response_model=dict)
 def change_password(
     password_data: PasswordChange,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_record),
     db: Session = Depends(get_db)
 ):
     """
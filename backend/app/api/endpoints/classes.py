@@ -4,9 +4,9 @@ from typing import List, Optional
 from app.database.session import get_db
 from app.schemas.class_schema import Class, ClassCreate, ClassUpdate
 from app.services.class_service import (
-    create_class, get_class, update_class, delete_class
+    create_class, get_class, update_class, delete_class, get_classes_with_enrollment
 )
-from app.api.pagination import PaginatedResponse, paginate_query, create_paginated_response
+from app.api.pagination import PaginatedResponse, paginate_query, paginated_json_response
 from app.api.search import ClassSearchFilters, apply_class_filters
 from app.database.models import Class as ClassModel, User
 from app.api.dependencies import get_current_user
@@ -38,6 +38,7 @@ def read_classes(
     # Sorting
     sort_by: Optional[str] = Query("name", description="Sort by field"),
     sort_order: Optional[str] = Query("asc", pattern="^(asc|desc)$", description="Sort order"),
+    include_total: bool = Query(True, description="Count matching rows"),
     
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)  # Require authentication
@@ -70,15 +71,14 @@ def read_classes(
         query = query.order_by(ClassModel.level.asc(), ClassModel.name.asc())
     
     # Apply pagination
-    paginated_query, pagination_metadata = paginate_query(query, page, size)
+    paginated_query, pagination_metadata = paginate_query(
+        query, page, size, include_total=include_total, count_key=filters.signature()
+    )
     
     # Execute query and get results
     classes = paginated_query.all()
     
-    # Convert to response models
-    class_responses = [Class.model_validate(class_obj) for class_obj in classes]
-    
-    return create_paginated_response(class_responses, pagination_metadata)
+    return paginated_json_response(Class, get_classes_with_enrollment(db, classes), pagination_metadata)
 
 @router.get("/simple", response_model=List[Class])
 def get_classes_simple(
@@ -95,7 +95,7 @@ def get_classes_simple(
     classes = query.order_by(ClassModel.level.asc(), ClassModel.name.asc()).all()
     
     # Convert to response models
-    return [Class.model_validate(cls) for cls in classes]
+    return [Class.model_validate(cls) for cls in get_classes_with_enrollment(db, classes)]
 
 @router.get("/{class_id}", response_model=Class)
 def read_class(class_id: int, db: Session = Depends(get_db)):
@@ -1,12 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from sqlalchemy import or_, false
 from typing import List, Optional
 
 from app.schemas.parent import ParentCreate, ParentUpdate, Parent
 from app.services import parent_service
 from app.database.session import get_db
 from app.api.pagination import PaginatedResponse, paginate_query, create_paginated_response
+from app.api.utils import json_response
 from app.database.models import Parent as ParentModel, User
+from app.database.search_index import MIN_FTS_TERM_LENGTH, parent_search, fts_match
+from app.database.normalization import search_key, phone_digits, prefix_range
 from app.api.dependencies import get_current_user
 
 router = APIRouter()
@@ -45,15 +49,28 @@ def get_parents(
     """
     query = db.query(ParentModel)
     
-    # Apply search filter if provided
-    if search:
-        search_term = f"%{search.lower()}%"
-        query = query.filter(
-            ParentModel.first_name.ilike(search_term) |
-            ParentModel.last_name.ilike(search_term) |
-            ParentModel.phone.ilike(search_term) |
-            ParentModel.email.ilike(search_term)
+    # Apply search filter if provided, through the full-text index when the
+    # term is long enough
+    if search and len(search.strip()) >= MIN_FTS_TERM_LENGTH:
+        query = query.join(parent_search, parent_search.c.rowid == ParentModel.id).filter(
+            fts_match(parent_search, search.strip())
         )
+    elif search:
+        key = search_key(search)
+        digits = phone_digits(search)
+        conditions = []
+        # A term of only separators or punctuation matches no name
+        if key:
+            conditions += [
+                prefix_range(ParentModel.search_name, key),
+                prefix_range(ParentModel.search_name_reversed, key)
+            ]
+        if digits:
+            conditions += [
+                prefix_range(ParentModel.phone_digits, digits),
+                prefix_range(ParentModel.mobile_digits, digits)
+            ]
+        query = query.filter(or_(*conditions) if conditions else false())
     
     # Apply pagination and ordering
     parents = query.order_by(ParentModel.first_name.asc(), ParentModel.last_name.asc()).offset(skip).limit(limit).all()
@@ -72,7 +89,7 @@ def get_parents(
         }
         result.append(parent_dict)
     
-    return result
+    return json_response(List[Parent], result)
 
 @router.get("/{parent_id}", response_model=Parent)
 def get_parent(
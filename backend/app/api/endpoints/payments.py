@@ -1,18 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import date
 
 from app.schemas.payment import PaymentCreate, PaymentResponse
-from app.services import payment_service
+from app.services import payment_service, receipt_service
 from app.database.session import get_db
-from app.api.pagination import PaginatedResponse, paginate_query, create_paginated_response
+from app.api.pagination import (
+    PaginatedResponse, paginate_query, paginate_query_by_cursor,
+    paginated_json_response, resolve_sort_column
+)
 from app.api.search import PaymentSearchFilters, apply_payment_filters
 from app.database.models import Payment, User
 from app.api.dependencies import get_current_user
 
 router = APIRouter()
 
+# Columns the list can be sorted by - each one is backed by an index
+PAYMENT_SORT_FIELDS = ("payment_date", "amount", "id")
+
 @router.post("/", response_model=PaymentResponse)
 def make_payment(
     payment: PaymentCreate, 
@@ -38,14 +45,22 @@ def get_payments(
     amount_max: Optional[float] = Query(None, ge=0, description="Maximum payment amount"),
     
     # Sorting
-    sort_by: Optional[str] = Query("payment_date", description="Sort by field"),
+    sort_by: Optional[str] = Query("payment_date", description=f"Sort by field ({', '.join(PAYMENT_SORT_FIELDS)})"),
     sort_order: Optional[str] = Query("desc", pattern="^(asc|desc)$", description="Sort order"),
     
+    # Keyset pagination
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (replaces page)"),
+    include_total: bool = Query(True, description="Count matching rows (set to false for infinite scroll)"),
+    
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)  # Require authentication
 ):
     """
     Get paginated list of payments with search and filtering capabilities.
+    
+    Every page carries a next_cursor; passing it back as ?cursor= fetches the
+    following page at constant cost however deep it is. Free-text search
+    results are ordered by relevance and paged by page number instead.
     """
     # Create search filters
     filters = PaymentSearchFilters(
@@ -65,27 +80,30 @@ def get_payments(
     # Apply search filters
     query = apply_payment_filters(query, filters)
     
-    # Apply sorting
-    if sort_by and hasattr(Payment, sort_by):
-        sort_column = getattr(Payment, sort_by)
-        if sort_order == "desc":
-            query = query.order_by(sort_column.desc())
-        else:
-            query = query.order_by(sort_column.asc())
-    else:
-        # Default sorting by payment date (newest first)
-        query = query.order_by(Payment.payment_date.desc())
+    # Apply sorting (newest first by default), with the id as tiebreaker
+    sort_column = resolve_sort_column(Payment, sort_by, PAYMENT_SORT_FIELDS, default="payment_date")
+    descending = sort_order == "desc"
     
     # Apply pagination
-    paginated_query, pagination_metadata = paginate_query(query, page, size)
+    if cursor:
+        paginated_query, pagination_metadata = paginate_query_by_cursor(
+            query, sort_column, Payment.id, size=size, cursor=cursor, descending=descending,
+            include_total=include_total, count_key=filters.signature()
+        )
+    else:
+        if descending:
+            query = query.order_by(sort_column.desc(), Payment.id.desc())
+        else:
+            query = query.order_by(sort_column.asc(), Payment.id.asc())
+        paginated_query, pagination_metadata = paginate_query(
+            query, page, size, cursor_fields=None if filters.is_ranked() else (sort_column.key, "id"),
+            include_total=include_total, count_key=filters.signature()
+        )
     
     # Execute query and get results
     payments = paginated_query.all()
     
-    # Convert to response models
-    payment_responses = [PaymentResponse.model_validate(payment) for payment in payments]
-    
-    return create_paginated_response(payment_responses, pagination_metadata)
+    return paginated_json_response(PaymentResponse, payments, pagination_metadata)
 
 @router.get("/{payment_id}", response_model=PaymentResponse)
 def get_payment(payment_id: int, db: Session = Depends(get_db)):
@@ -93,3 +111,13 @@ def get_payment(payment_id: int, db: Session = Depends(get_db)):
     if payment is None:
         raise HTTPException(status_code=404, detail="Payment not found")
     return payment
+
+@router.get("/{payment_id}/receipt", response_class=FileResponse)
+def get_payment_receipt(
+    payment_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)  # Require authentication
+):
+    """Download the PDF receipt of a payment, rendered once and then served from the cache."""
+    filename, path = receipt_service.get_receipt(db=db, payment_id=payment_id)
+    return FileResponse(path, media_type="application/pdf", filename=filename)
@@ -1,6 +1,5 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session, selectinload
-from sqlalchemy import or_, func
 from typing import Optional, List
 
 from app.database.session import get_db
@@ -8,6 +7,7 @@ from app.database.models import Student as StudentModel, Parent as ParentModel,
 from app.api.dependencies import get_current_user
 from app.schemas.student import Student
 from app.schemas.parent import Parent
+from app.services import autocomplete_service
 
 router = APIRouter()
 
@@ -20,23 +20,23 @@ def quick_search_students(
 ):
     """
     Quick search for students - only matches student names, not parent names.
-    This is specifically for the dashboard quick search functionality.
+    This is specifically for the dashboard quick search functionality, so
+    matches come from the in-memory autocomplete index: names starting with
+    the term first, then names containing it.
     """
-    search_term = f"%{search.lower()}%"
+    student_ids = autocomplete_service.search_students(db, search, limit)
+    if not student_ids:
+        return []
     
-    query = db.query(StudentModel).options(
+    # Hydrate the few suggestions by primary key, keeping the index order
+    students = db.query(StudentModel).options(
         selectinload(StudentModel.parent),
         selectinload(StudentModel.__mapper__.relationships['class']),
         selectinload(StudentModel.flags)
-    ).filter(
-        or_(
-            func.lower(StudentModel.first_name).like(search_term),
-            func.lower(StudentModel.last_name).like(search_term),
-            func.lower(func.concat(StudentModel.first_name, ' ', StudentModel.last_name)).like(search_term)
-        )
-    ).order_by(StudentModel.first_name.asc(), StudentModel.last_name.asc()).limit(limit)
+    ).filter(StudentModel.id.in_(student_ids)).all()
+    by_id = {student.id: student for student in students}
     
-    return query.all()
+    return [by_id[student_id] for student_id in student_ids if student_id in by_id]
 
 @router.get("/parents", response_model=List[Parent])
 def quick_search_parents(
@@ -46,33 +46,8 @@ def quick_search_parents(
     current_user: User = Depends(get_current_user)
 ):
     """
-    Quick search for parents - only matches parent names.
+    Quick search for parents - matches parent names, phones and emails.
     This is specifically for the dashboard quick search functionality.
     """
-    search_term = f"%{search.lower()}%"
-    
-    query = db.query(ParentModel).filter(
-        or_(
-            func.lower(ParentModel.first_name).like(search_term),
-            func.lower(ParentModel.last_name).like(search_term),
-            func.lower(func.concat(ParentModel.first_name, ' ', ParentModel.last_name)).like(search_term),
-            func.lower(ParentModel.phone).like(search_term),
-            func.lower(ParentModel.email).like(search_term)
-        )
-    ).order_by(ParentModel.first_name.asc(), ParentModel.last_name.asc()).limit(limit)
-    
-    # Convert to response format expected by frontend
-    results = []
-    for parent in query.all():
-        parent_dict = {
-            "id": parent.id,
-            "first_name": parent.first_name,
-            "last_name": parent.last_name,
-            "phone": parent.phone,
-            "email": parent.email,
-            "address": parent.address,
-            "emergency_contact": parent.mobile  # Map mobile to emergency_contact for frontend
-        }
-        results.append(parent_dict)
-    
-    return results
+    # Answered entirely from the in-memory index, in the format expected by the frontend
+    return autocomplete_service.search_parents(db, search, limit)
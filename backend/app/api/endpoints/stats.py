@@ -1,64 +1,75 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy import func
+from collections import defaultdict
 from datetime import datetime, date
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from app.database.session import get_db
-from app.database.models import Student, User, RegistrationStatus
+from app.database.models import Student, StudentCounter, AttendanceDaily, Class, User, RegistrationStatus
 from app.api.dependencies import get_current_user
 
 router = APIRouter()
 
 @router.get("/students", response_model=Dict[str, Any])
 def get_student_statistics(
+    academic_year: Optional[str] = Query(None, description="Restrict the statistics to one academic year"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get comprehensive student statistics
-    """
-    # Total students
-    total_students = db.query(Student).count()
-    
-    # Students registered this month
-    current_month = datetime.now().month
-    current_year = datetime.now().year
-    
-    new_this_month = db.query(Student).filter(
-        extract('month', Student.registration_date) == current_month,
-        extract('year', Student.registration_date) == current_year
-    ).count()
     
-    # Students by status - use enum values
-    pending_students = db.query(Student).filter(
-        Student.registration_status == RegistrationStatus.PENDING
-    ).count()
-    
-    confirmed_students = db.query(Student).filter(
-        Student.registration_status == RegistrationStatus.CONFIRMED
-    ).count()
+    Totals by status and gender come from one grouped aggregate over the
+    student_counters table (a few rows maintained on every write) and new
+    registrations from a range on the indexed registration_date, so the
+    dashboard never counts the students table. Present today (present or
+    late) sums today's rows of the attendance_daily rollup.
+    """
+    # Totals by status and gender
+    counters = db.query(
+        StudentCounter.status, StudentCounter.gender, func.sum(StudentCounter.count)
+    ).group_by(StudentCounter.status, StudentCounter.gender)
+    if academic_year:
+        counters = counters.filter(StudentCounter.academic_year == academic_year)
     
-    cancelled_students = db.query(Student).filter(
-        Student.registration_status == RegistrationStatus.CANCELLED
-    ).count()
+    by_status = defaultdict(int)
+    by_gender = defaultdict(int)
+    for status, gender, count in counters.all():
+        by_status[status] += count
+        by_gender[gender] += count
+    total_students = sum(by_status.values())
     
-    # Students by gender
-    male_students = db.query(Student).filter(Student.gender == 'M').count()
-    female_students = db.query(Student).filter(Student.gender == 'F').count()
+    # Students registered this month, as a half-open range the index can seek
+    today = date.today()
+    month_start = datetime(today.year, today.month, 1)
+    next_month_start = datetime(today.year + today.month // 12, today.month % 12 + 1, 1)
+    new_this_month = db.query(func.count(Student.id)).filter(
+        Student.registration_date >= month_start,
+        Student.registration_date < next_month_start
+    )
+    if academic_year:
+        new_this_month = new_this_month.filter(Student.academic_year == academic_year)
+    new_this_month = new_this_month.scalar()
     
-    # For "present today" - since we don't have attendance tracking yet,
-    # we'll return 0 or could estimate based on confirmed students
-    present_today = 0  # Will be implemented when attendance feature is added
+    # Present or late today, one rollup row per class
+    present_today = db.query(
+        func.coalesce(func.sum(AttendanceDaily.present + AttendanceDaily.late), 0)
+    ).filter(AttendanceDaily.attendance_date == today)
+    if academic_year:
+        present_today = present_today.join(Class, Class.id == AttendanceDaily.class_id).filter(
+            Class.academic_year == academic_year
+        )
+    present_today = present_today.scalar()
     
     return {
         "total_students": total_students,
         "new_this_month": new_this_month,
-        "pending": pending_students,
-        "confirmed": confirmed_students,
-        "cancelled": cancelled_students,
+        "pending": by_status[RegistrationStatus.PENDING.name],
+        "confirmed": by_status[RegistrationStatus.CONFIRMED.name],
+        "cancelled": by_status[RegistrationStatus.CANCELLED.name],
         "present_today": present_today,
-        "male_students": male_students,
-        "female_students": female_students,
+        "male_students": by_gender["M"],
+        "female_students": by_gender["F"],
         "stats_date": datetime.now().isoformat()
     }
@@ -6,13 +6,19 @@ from datetime import date
 from app.schemas.student import StudentCreate, StudentUpdate, Student
 from app.services import student_service
 from app.database.session import get_db
-from app.api.pagination import PaginatedResponse, paginate_query, create_paginated_response
+from app.api.pagination import (
+    PaginatedResponse, paginate_query, paginate_query_by_cursor,
+    paginated_json_response, resolve_sort_column
+)
 from app.api.search import StudentSearchFilters, apply_student_filters
 from app.database.models import Student as StudentModel, User, Parent, Class
 from app.api.dependencies import get_current_user
 
 router = APIRouter()
 
+# Columns the list can be sorted by - each one is backed by an index
+STUDENT_SORT_FIELDS = ("first_name", "last_name", "date_of_birth", "registration_date", "id")
+
 @router.post("/", response_model=Student)
 def create_student(
     student: StudentCreate, 
@@ -37,14 +43,22 @@ def get_students(
     age_max: Optional[int] = Query(None, ge=0, le=100, description="Maximum age"),
     
     # Sorting
-    sort_by: Optional[str] = Query("first_name", description="Sort by field"),
+    sort_by: Optional[str] = Query("first_name", description=f"Sort by field ({', '.join(STUDENT_SORT_FIELDS)})"),
     sort_order: Optional[str] = Query("asc", pattern="^(asc|desc)$", description="Sort order"),
     
+    # Keyset pagination
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (replaces page)"),
+    include_total: bool = Query(True, description="Count matching rows (set to false for infinite scroll)"),
+    
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)  # Require authentication
 ):
     """
     Get paginated list of students with search and filtering capabilities.
+    
+    Every page carries a next_cursor; passing it back as ?cursor= fetches the
+    following page at constant cost however deep it is. Free-text search
+    results are ordered by relevance and paged by page number instead.
     """
     # Create search filters
     filters = StudentSearchFilters(
@@ -67,27 +81,30 @@ def get_students(
     # Apply search filters
     query = apply_student_filters(query, filters)
     
-    # Apply sorting
-    if sort_by and hasattr(StudentModel, sort_by):
-        sort_column = getattr(StudentModel, sort_by)
-        if sort_order == "desc":
-            query = query.order_by(sort_column.desc())
-        else:
-            query = query.order_by(sort_column.asc())
-    else:
-        # Default sorting
-        query = query.order_by(StudentModel.first_name.asc(), StudentModel.last_name.asc())
+    # Apply sorting, with the id as tiebreaker so cursors are unambiguous
+    sort_column = resolve_sort_column(StudentModel, sort_by, STUDENT_SORT_FIELDS, default="first_name")
+    descending = sort_order == "desc"
     
     # Apply pagination
-    paginated_query, pagination_metadata = paginate_query(query, page, size)
+    if cursor:
+        paginated_query, pagination_metadata = paginate_query_by_cursor(
+            query, sort_column, StudentModel.id, size=size, cursor=cursor, descending=descending,
+            include_total=include_total, count_key=filters.signature()
+        )
+    else:
+        if descending:
+            query = query.order_by(sort_column.desc(), StudentModel.id.desc())
+        else:
+            query = query.order_by(sort_column.asc(), StudentModel.id.asc())
+        paginated_query, pagination_metadata = paginate_query(
+            query, page, size, cursor_fields=None if filters.is_ranked() else (sort_column.key, "id"),
+            include_total=include_total, count_key=filters.signature()
+        )
     
     # Execute query and get results
     students = paginated_query.all()
     
-    # Convert to response models
-    student_responses = [Student.model_validate(student) for student in students]
-    
-    return create_paginated_response(student_responses, pagination_metadata)
+    return paginated_json_response(Student, students, pagination_metadata)
 
 @router.get("/{student_id}", response_model=Student)
 def get_student(
@@ -1,15 +1,25 @@
-from typing import Generic, TypeVar, List, Optional
+from typing import Generic, TypeVar, List, Optional, Any, Hashable
 from pydantic import BaseModel
-from sqlalchemy.orm import Query
-from sqlalchemy import func
+from fastapi import HTTPException, Response
+from sqlalchemy.orm import Query, Session
+from sqlalchemy import func, tuple_, event, inspect
+from sqlalchemy.sql.util import find_tables
+from datetime import date, datetime
 from math import ceil
+import base64
+import json
+import threading
+import time
+
+from ..database.models import Base
+from .utils import json_response
 
 T = TypeVar('T')
 
 class PaginationParams(BaseModel):
     page: int = 1
     size: int = 20
-    
+
     def __post_init__(self):
         # Ensure page is at least 1
         if self.page < 1:
@@ -22,62 +32,308 @@ class PaginationParams(BaseModel):
 
 class PaginatedResponse(BaseModel, Generic[T]):
     items: List[T]
-    total: int
-    page: int
+    total: Optional[int] = None  # None when requested with include_total=false
+    page: Optional[int] = None  # None when paginating by cursor
     size: int
-    pages: int
+    pages: Optional[int] = None
     has_next: bool
     has_previous: bool
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= to fetch the following page
+
+# How long a filtered COUNT(*) may be served from memory. Writes through
+# the ORM invalidate affected entries immediately; the TTL only bounds
+# staleness caused by other processes writing to the same database.
+COUNT_CACHE_TTL_SECONDS = 30
+
+class CountCache:
+    """
+    Short-lived cache of total counts for paginated list queries.
+
+    Entries are keyed by the database URL and a normalized filter signature
+    and remember which tables the count read, so that a write to any of
+    those tables drops them.
+    """
+
+    def __init__(self, ttl_seconds: float = COUNT_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, total, _ = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return total
+
+    def set(self, key: Hashable, total: int, tables: frozenset) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, total, tables)
+
+    def invalidate(self, table_names) -> None:
+        """Drop every entry that depends on one of the given tables."""
+        table_names = set(table_names)
+        if not table_names:
+            return
+        with self._lock:
+            stale = [key for key, (_, _, tables) in self._entries.items() if tables & table_names]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+count_cache = CountCache()
+
+def _written_tables(session: Session) -> set:
+    return {
+        inspect(obj).mapper.local_table.name
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+    }
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_counts_after_flush(session, flush_context):
+    tables = _written_tables(session)
+    count_cache.invalidate(tables)
+    # Invalidate again on commit, a concurrent reader may have re-cached
+    # the pre-commit count in between
+    session.info.setdefault("count_cache_tables", set()).update(tables)
+
+@event.listens_for(Session, "do_orm_execute")
+def _invalidate_counts_on_bulk_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table_name = orm_execute_state.statement.table.name
+        count_cache.invalidate({table_name})
+        orm_execute_state.session.info.setdefault("count_cache_tables", set()).add(table_name)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_counts_after_commit(session):
+    count_cache.invalidate(session.info.pop("count_cache_tables", set()))
+
+@event.listens_for(Base.metadata, "after_drop")
+def _clear_counts_after_drop(target, connection, **kw):
+    count_cache.clear()
+
+def count_query(query: Query, count_key: Optional[Hashable] = None) -> int:
+    """
+    Count the rows of a query, serving repeated counts from count_cache.
+
+    Args:
+        query: SQLAlchemy query object
+        count_key: Normalized filter signature identifying the query (see
+            SearchFilters.signature); None disables caching
+    """
+    if count_key is None:
+        return query.count()
+
+    key = (str(query.session.get_bind().url), count_key)
+    total = count_cache.get(key)
+    if total is None:
+        tables = frozenset(t.name for t in find_tables(query.statement, include_joins=True, include_aliases=True))
+        total = query.count()
+        count_cache.set(key, total, tables)
+    return total
+
+def resolve_sort_column(model, sort_by: Optional[str], allowed_fields: tuple, default: str):
+    """
+    Map a sort_by query parameter to a model column.
+
+    Only index-backed columns are listed in allowed_fields, so every sort
+    (and every cursor page) can be served by an index range scan.
+    """
+    field = sort_by or default
+    if field not in allowed_fields:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot sort by '{field}'. Allowed fields: {', '.join(allowed_fields)}"
+        )
+    return getattr(model, field)
+
+def encode_cursor(sort_field: str, value: Any, last_id: int) -> str:
+    """Encode the position after the last row of a page as an opaque string."""
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    payload = json.dumps([sort_field, value, last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort_column) -> tuple:
+    """Decode a cursor produced by encode_cursor for the given sort column."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_field, value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if sort_field != sort_column.key:
+            raise ValueError("cursor was issued for a different sort field")
+        python_type = sort_column.type.python_type
+        if value is not None and python_type in (date, datetime):
+            value = python_type.fromisoformat(value)
+        return value, int(last_id)
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
 
 def paginate_query(
     query: Query,
     page: int = 1,
-    size: int = 20
+    size: int = 20,
+    cursor_fields: Optional[tuple] = None,
+    include_total: bool = True,
+    count_key: Optional[Hashable] = None
 ) -> tuple[Query, dict]:
     """
     Apply pagination to a SQLAlchemy query and return pagination metadata.
-    
+
     Args:
         query: SQLAlchemy query object
         page: Page number (1-based)
         size: Items per page
-        
+        cursor_fields: (sort field, id field) the query is ordered by; when
+            given, the response carries a next_cursor to continue with
+            paginate_query_by_cursor
+        include_total: Whether to count the matching rows; without the
+            count a page costs a single query
+        count_key: Filter signature under which the count may be cached
+
     Returns:
         Tuple of (paginated_query, pagination_metadata)
     """
     # Ensure valid pagination parameters
     page = max(1, page)
     size = max(1, min(100, size))
-    
-    # Get total count
-    total = query.count()
-    
-    # Calculate pagination metadata
-    pages = ceil(total / size) if total > 0 else 1
-    has_next = page < pages
-    has_previous = page > 1
-    
-    # Apply pagination to query
     offset = (page - 1) * size
-    paginated_query = query.offset(offset).limit(size)
-    
+
+    if include_total:
+        # Get total count
+        total = count_query(query, count_key)
+
+        # Calculate pagination metadata
+        pages = ceil(total / size) if total > 0 else 1
+        has_next = page < pages
+
+        # Apply pagination to query
+        paginated_query = query.offset(offset).limit(size)
+    else:
+        # Fetch one extra row to know whether another page follows
+        total = pages = has_next = None
+        paginated_query = query.offset(offset).limit(size + 1)
+
+    has_previous = page > 1
+
     pagination_metadata = {
         "total": total,
         "page": page,
         "size": size,
         "pages": pages,
         "has_next": has_next,
-        "has_previous": has_previous
+        "has_previous": has_previous,
+        "cursor_fields": cursor_fields
+    }
+
+    return paginated_query, pagination_metadata
+
+def paginate_query_by_cursor(
+    query: Query,
+    sort_column,
+    id_column,
+    size: int = 20,
+    cursor: Optional[str] = None,
+    descending: bool = False,
+    include_total: bool = True,
+    count_key: Optional[Hashable] = None
+) -> tuple[Query, dict]:
+    """
+    Apply keyset pagination to a SQLAlchemy query.
+
+    Rows are ordered by (sort_column, id_column) and each page starts right
+    after the position encoded in the cursor, so the database seeks into the
+    index instead of skipping OFFSET rows: deep pages cost the same as the
+    first one. Rows whose sort value is NULL are not reachable this way.
+
+    Args:
+        query: SQLAlchemy query object (any existing ORDER BY is replaced)
+        sort_column: Index-backed column to order by
+        id_column: Unique tiebreaker column
+        size: Items per page
+        cursor: next_cursor from the previous page, None for the first page
+        descending: Sort direction
+        include_total: Whether to count the matching rows
+        count_key: Filter signature under which the count may be cached
+
+    Returns:
+        Tuple of (paginated_query, pagination_metadata)
+    """
+    size = max(1, min(100, size))
+    query = query.order_by(None)
+
+    # Total is for the whole filtered set, not what remains after the cursor
+    total = pages = None
+    if include_total:
+        total = count_query(query, count_key)
+        pages = ceil(total / size) if total > 0 else 1
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_column)
+        position = tuple_(sort_column, id_column)
+        bound = tuple_(value, last_id)
+        query = query.filter(position < bound if descending else position > bound)
+
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    # Fetch one extra row to know whether another page follows
+    paginated_query = query.limit(size + 1)
+
+    pagination_metadata = {
+        "total": total,
+        "page": None,
+        "size": size,
+        "pages": pages,
+        "has_next": None,
+        "has_previous": cursor is not None,
+        "cursor_fields": (sort_column.key, id_column.key)
     }
-    
+
     return paginated_query, pagination_metadata
 
+def _page(items: List[Any], pagination_metadata: dict) -> dict:
+    """The page's items and metadata, as the fields of a PaginatedResponse."""
+    metadata = dict(pagination_metadata)
+    cursor_fields = metadata.pop("cursor_fields", None)
+
+    # Cursor and count-less pages over-fetch by one row to detect the next page
+    if metadata["has_next"] is None:
+        metadata["has_next"] = len(items) > metadata["size"]
+        items = items[:metadata["size"]]
+
+    if cursor_fields and metadata["has_next"] and items:
+        sort_field, id_field = cursor_fields
+        last = items[-1]
+        metadata["next_cursor"] = encode_cursor(sort_field, getattr(last, sort_field), getattr(last, id_field))
+
+    return {"items": items, **metadata}
+
 def create_paginated_response(
     items: List[T],
     pagination_metadata: dict
 ) -> PaginatedResponse[T]:
     """Create a paginated response object."""
-    return PaginatedResponse(
-        items=items,
-        **pagination_metadata
-    )
+    return PaginatedResponse(**_page(items, pagination_metadata))
+
+def paginated_json_response(
+    item_type: Any,
+    items: List[Any],
+    pagination_metadata: dict
+) -> Response:
+    """
+    Send a page of ORM rows as PaginatedResponse[item_type] JSON.
+
+    The rows are validated once, straight into the page, and encoded to bytes
+    (see json_response) instead of being validated into models here and
+    again by FastAPI against the response_model.
+    """
+    return json_response(PaginatedResponse[item_type], _page(items, pagination_metadata))
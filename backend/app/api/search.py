@@ -1,11 +1,38 @@
 from typing import Optional, List
 from sqlalchemy.orm import Query
-from sqlalchemy import or_, and_, func
-from datetime import datetime, date
+from sqlalchemy import or_, and_, func, select, false
+from datetime import datetime, date, time, timedelta
+
+from ..database.normalization import search_key, prefix_range
+from ..database.search_index import (
+    MIN_FTS_TERM_LENGTH, student_search, payment_search, fts_match
+)
 
 class SearchFilters:
     """Base class for search filters."""
-    pass
+    
+    def signature(self) -> tuple:
+        """
+        Normalized, hashable description of the active filters.
+        
+        Used as the cache key of list counts: unset filters are dropped and
+        the free-text search term is trimmed and lowercased, as matching
+        ignores case anyway.
+        """
+        active = []
+        for name, value in sorted(vars(self).items()):
+            if value is None:
+                continue
+            if isinstance(value, str):
+                value = value.strip()
+                if name == "search":
+                    value = value.lower()
+            active.append((name, value))
+        return (type(self).__name__, tuple(active))
+    
+    def is_ranked(self) -> bool:
+        """Whether the search goes through the full-text index and is ordered by relevance."""
+        return bool(self.search) and len(self.search.strip()) >= MIN_FTS_TERM_LENGTH
 
 class StudentSearchFilters(SearchFilters):
     """Search filters for students."""
@@ -69,22 +96,41 @@ class ClassSearchFilters(SearchFilters):
         self.has_availability = has_availability
 
 def apply_student_filters(query: Query, filters: StudentSearchFilters) -> Query:
-    """Apply search filters to student query."""
+    """
+    Apply search filters to student query.
+    
+    Free-text searches of three characters or more go through the FTS5
+    index and order the results by relevance; any ordering added by the
+    caller only breaks ties. Shorter terms match name prefixes on the
+    folded search columns. Either way accents, case and separators are
+    ignored.
+    """
     from ..database.models import Student, Parent, Class
     
-    # Text search across student and parent names
+    # Text search across student and parent names, ranked by relevance
     if filters.search:
-        search_term = f"%{filters.search.lower()}%"
-        query = query.join(Parent).filter(
-            or_(
-                func.lower(Student.first_name).like(search_term),
-                func.lower(Student.last_name).like(search_term),
-                func.lower(Parent.first_name).like(search_term),
-                func.lower(Parent.last_name).like(search_term),
-                func.lower(func.concat(Student.first_name, ' ', Student.last_name)).like(search_term),
-                func.lower(func.concat(Parent.first_name, ' ', Parent.last_name)).like(search_term)
-            )
-        )
+        term = filters.search.strip()
+        if filters.is_ranked():
+            query = query.join(student_search, student_search.c.rowid == Student.id).filter(
+                fts_match(student_search, term)
+            ).order_by(student_search.c.rank)
+        else:
+            # Too short for the index: match the start of either name order
+            key = search_key(term)
+            if key:
+                parent_ids = select(Parent.id).where(
+                    or_(prefix_range(Parent.search_name, key), prefix_range(Parent.search_name_reversed, key))
+                )
+                query = query.filter(
+                    or_(
+                        prefix_range(Student.search_name, key),
+                        prefix_range(Student.search_name_reversed, key),
+                        Student.parent_id.in_(parent_ids)
+                    )
+                )
+            else:
+                # Only separators or punctuation, which names are stored without
+                query = query.filter(false())
     
     # Filter by class
     if filters.class_id:
@@ -116,40 +162,64 @@ def apply_student_filters(query: Query, filters: StudentSearchFilters) -> Query:
     
     return query
 
+def day_range(column, date_from: Optional[date], date_to: Optional[date]) -> list:
+    """
+    Conditions matching the datetimes of a column from date_from to date_to, both days included.
+    
+    Expressed as a half-open range on the raw column (`column >= date_from
+    00:00 AND column < the day after date_to 00:00`) so SQLite answers it with
+    an index range scan, which `date(column) BETWEEN ...` does not get.
+    """
+    conditions = []
+    if date_from:
+        conditions.append(column >= datetime.combine(date_from, time.min))
+    if date_to:
+        conditions.append(column < datetime.combine(date_to + timedelta(days=1), time.min))
+    return conditions
+
 def apply_payment_filters(query: Query, filters: PaymentSearchFilters) -> Query:
-    """Apply search filters to payment query."""
-    from ..database.models import Payment, Student
+    """
+    Apply search filters to payment query.
+    
+    Free-text searches go through the FTS5 index like apply_student_filters.
+    """
+    from ..database.models import Payment, Student, PaymentType
     
-    # Text search across student names and receipt numbers
+    # Text search across student names and receipt numbers, ranked by relevance
     if filters.search:
-        search_term = f"%{filters.search.lower()}%"
-        query = query.join(Student).filter(
-            or_(
-                func.lower(Student.first_name).like(search_term),
-                func.lower(Student.last_name).like(search_term),
-                func.lower(func.concat(Student.first_name, ' ', Student.last_name)).like(search_term),
-                func.lower(Payment.receipt_number).like(search_term)
-            )
-        )
+        term = filters.search.strip()
+        if filters.is_ranked():
+            query = query.join(payment_search, payment_search.c.rowid == Payment.id).filter(
+                fts_match(payment_search, term)
+            ).order_by(payment_search.c.rank)
+        else:
+            # Too short for the index: match the start of names and receipts
+            key = search_key(term)
+            conditions = [prefix_range(Payment.receipt_number, term.upper())]
+            # A term of only separators or punctuation matches no name
+            if key:
+                student_ids = select(Student.id).where(
+                    or_(prefix_range(Student.search_name, key), prefix_range(Student.search_name_reversed, key))
+                )
+                conditions.append(Payment.student_id.in_(student_ids))
+            query = query.filter(or_(*conditions))
     
     # Filter by student
     if filters.student_id:
         query = query.filter(Payment.student_id == filters.student_id)
     
-    # Filter by payment type
+    # Filter by payment type, given by value ("inscription") or name
     if filters.payment_type:
-        query = query.filter(Payment.payment_type == filters.payment_type)
+        key = filters.payment_type.strip().lower()
+        payment_type = next((member for member in PaymentType if key in (member.value, member.name.lower())), None)
+        query = query.filter(Payment.payment_type == payment_type if payment_type else false())
     
     # Filter by payment method
     if filters.payment_method:
         query = query.filter(Payment.payment_method.ilike(filters.payment_method))
     
     # Filter by date range
-    if filters.date_from:
-        query = query.filter(func.date(Payment.payment_date) >= filters.date_from)
-    
-    if filters.date_to:
-        query = query.filter(func.date(Payment.payment_date) <= filters.date_to)
+    query = query.filter(*day_range(Payment.payment_date, filters.date_from, filters.date_to))
     
     # Filter by amount range
     if filters.amount_min is not None:
@@ -162,8 +232,7 @@ def apply_payment_filters(query: Query, filters: PaymentSearchFilters) -> Query:
 
 def apply_class_filters(query: Query, filters: ClassSearchFilters) -> Query:
     """Apply search filters to class query."""
-    from ..database.models import Class, Student
-    from sqlalchemy import select, func as sql_func
+    from ..database.models import Class
     
     # Text search across class name and level
     if filters.search:
@@ -191,11 +260,9 @@ def apply_class_filters(query: Query, filters: ClassSearchFilters) -> Query:
     if filters.has_availability is not None:
         if filters.has_availability:
             # Classes that have available spots
-            subquery = select(sql_func.count(Student.id)).where(Student.class_id == Class.id).scalar_subquery()
-            query = query.filter(Class.capacity > subquery)
+            query = query.filter(Class.enrolled_count < Class.capacity)
         else:
             # Classes that are full
-            subquery = select(sql_func.count(Student.id)).where(Student.class_id == Class.id).scalar_subquery()
-            query = query.filter(Class.capacity <= subquery)
+            query = query.filter(Class.enrolled_count >= Class.capacity)
     
     return query
@@ -0,0 +1,26 @@
+from functools import lru_cache
+from typing import Any
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+@lru_cache(maxsize=None)
+def response_adapter(response_type: Any) -> TypeAdapter:
+    """One adapter per response type: building its validator and serializer is not free."""
+    return TypeAdapter(response_type)
+
+def json_response(response_type: Any, content: Any) -> Response:
+    """
+    Validate `content` against `response_type` once and send it as JSON.
+
+    `content` may hold ORM objects or dicts. A route that returns its models
+    has FastAPI validate them against its response_model a second time before
+    encoding; this validates the rows themselves and writes the JSON bytes in
+    one pass in pydantic-core. Keep the route's response_model for the API
+    docs. Field aliases are used, as FastAPI does.
+    """
+    adapter = response_adapter(response_type)
+    return Response(
+        adapter.dump_json(adapter.validate_python(content, from_attributes=True), by_alias=True),
+        media_type="application/json"
+    )
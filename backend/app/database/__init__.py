@@ -0,0 +1,3 @@
+# Registers the full-text search index and counter trigger DDL on Base.metadata
+from . import search_index  # noqa: F401
+from . import counters  # noqa: F401
@@ -0,0 +1,173 @@
+"""
+Incrementally maintained aggregate counters.
+
+`student_counters` holds the number of students per academic year,
+registration status and gender, and `classes.enrolled_count` the number of
+confirmed students of each class. Triggers on `students` adjust them in the
+same transaction as every insert, delete and status, class, year or gender
+change, so the counts stay exact whichever service (or script) writes the
+student, and a rolled back registration rolls its counter update back too.
+
+`attendance_daily` holds the present, absent, late and excused counts of
+each class per day, kept the same way by triggers on `attendance`: a single
+record, an update and a bulk upsert (whose conflicting rows fire the update
+trigger) all adjust the day they touch.
+"""
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection
+
+from .models import Base, RegistrationStatus, AttendanceStatus
+
+CONFIRMED = RegistrationStatus.CONFIRMED.name
+
+# attendance_daily column counting each status (stored by name on attendance)
+DAILY_COLUMNS = {
+    "present": AttendanceStatus.PRESENT.name,
+    "absent": AttendanceStatus.ABSENT.name,
+    "late": AttendanceStatus.LATE.name,
+    "excused": AttendanceStatus.EXCUSED.name,
+}
+
+# NULLs would defeat the primary key's conflict detection, store '' instead
+_KEY_SQL = "coalesce({row}.academic_year, ''), coalesce({row}.registration_status, ''), coalesce({row}.gender, '')"
+_MATCH_SQL = (
+    "academic_year = coalesce({row}.academic_year, '') "
+    "AND status = coalesce({row}.registration_status, '') "
+    "AND gender = coalesce({row}.gender, '')"
+)
+
+def _increment(row: str) -> str:
+    return (
+        f"INSERT INTO student_counters (academic_year, status, gender, count) VALUES ({_KEY_SQL.format(row=row)}, 1) "
+        "ON CONFLICT (academic_year, status, gender) DO UPDATE SET count = count + 1;"
+    )
+
+def _decrement(row: str) -> str:
+    return f"UPDATE student_counters SET count = count - 1 WHERE {_MATCH_SQL.format(row=row)};"
+
+def _daily_increment(row: str) -> str:
+    columns = ", ".join(DAILY_COLUMNS)
+    flags = ", ".join(f"{row}.status = '{status}'" for status in DAILY_COLUMNS.values())
+    updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in DAILY_COLUMNS)
+    return (
+        f"INSERT INTO attendance_daily (class_id, attendance_date, {columns}) "
+        f"VALUES ({row}.class_id, {row}.attendance_date, {flags}) "
+        f"ON CONFLICT (class_id, attendance_date) DO UPDATE SET {updates};"
+    )
+
+def _daily_decrement(row: str) -> str:
+    updates = ", ".join(f"{column} = {column} - ({row}.status = '{status}')" for column, status in DAILY_COLUMNS.items())
+    match = f"class_id = {row}.class_id AND attendance_date = {row}.attendance_date"
+    # Days left without any record disappear, so they are not counted as school days
+    return (
+        f"UPDATE attendance_daily SET {updates} WHERE {match}; "
+        f"DELETE FROM attendance_daily WHERE {match} AND {' + '.join(DAILY_COLUMNS)} = 0;"
+    )
+
+TRIGGERS = {
+    "students_counters_ai": f"""
+        CREATE TRIGGER students_counters_ai AFTER INSERT ON students BEGIN
+            {_increment('NEW')}
+        END
+    """,
+    "students_counters_au": f"""
+        CREATE TRIGGER students_counters_au AFTER UPDATE OF academic_year, registration_status, gender ON students
+        WHEN OLD.academic_year IS NOT NEW.academic_year
+            OR OLD.registration_status IS NOT NEW.registration_status
+            OR OLD.gender IS NOT NEW.gender BEGIN
+            {_decrement('OLD')}
+            {_increment('NEW')}
+        END
+    """,
+    "students_counters_ad": f"""
+        CREATE TRIGGER students_counters_ad AFTER DELETE ON students BEGIN
+            {_decrement('OLD')}
+        END
+    """,
+    # Seats taken in each class
+    "students_enrollment_ai": f"""
+        CREATE TRIGGER students_enrollment_ai AFTER INSERT ON students
+        WHEN NEW.registration_status = '{CONFIRMED}' BEGIN
+            UPDATE classes SET enrolled_count = enrolled_count + 1 WHERE id = NEW.class_id;
+        END
+    """,
+    "students_enrollment_au": f"""
+        CREATE TRIGGER students_enrollment_au AFTER UPDATE OF registration_status, class_id ON students
+        WHEN OLD.registration_status = '{CONFIRMED}' OR NEW.registration_status = '{CONFIRMED}' BEGIN
+            UPDATE classes SET enrolled_count = enrolled_count - 1
+            WHERE id = OLD.class_id AND OLD.registration_status = '{CONFIRMED}';
+            UPDATE classes SET enrolled_count = enrolled_count + 1
+            WHERE id = NEW.class_id AND NEW.registration_status = '{CONFIRMED}';
+        END
+    """,
+    "students_enrollment_ad": f"""
+        CREATE TRIGGER students_enrollment_ad AFTER DELETE ON students
+        WHEN OLD.registration_status = '{CONFIRMED}' BEGIN
+            UPDATE classes SET enrolled_count = enrolled_count - 1 WHERE id = OLD.class_id;
+        END
+    """,
+    # Attendance per class and day
+    "attendance_daily_ai": f"""
+        CREATE TRIGGER attendance_daily_ai AFTER INSERT ON attendance BEGIN
+            {_daily_increment('NEW')}
+        END
+    """,
+    "attendance_daily_au": f"""
+        CREATE TRIGGER attendance_daily_au AFTER UPDATE OF status, class_id, attendance_date ON attendance
+        WHEN OLD.status IS NOT NEW.status
+            OR OLD.class_id IS NOT NEW.class_id
+            OR OLD.attendance_date IS NOT NEW.attendance_date BEGIN
+            {_daily_decrement('OLD')}
+            {_daily_increment('NEW')}
+        END
+    """,
+    "attendance_daily_ad": f"""
+        CREATE TRIGGER attendance_daily_ad AFTER DELETE ON attendance BEGIN
+            {_daily_decrement('OLD')}
+        END
+    """,
+}
+
+def rebuild_student_counters(connection: Connection) -> None:
+    """Recompute student_counters from the students table."""
+    connection.execute(text("DELETE FROM student_counters"))
+    connection.execute(text(
+        f"INSERT INTO student_counters (academic_year, status, gender, count) "
+        f"SELECT {_KEY_SQL.format(row='students')}, COUNT(*) FROM students "
+        f"GROUP BY 1, 2, 3"
+    ))
+
+def rebuild_class_enrollment(connection: Connection) -> None:
+    """Recompute classes.enrolled_count from the students table."""
+    connection.execute(text(
+        "UPDATE classes SET enrolled_count = ("
+        "SELECT COUNT(*) FROM students "
+        f"WHERE students.class_id = classes.id AND students.registration_status = '{CONFIRMED}')"
+    ))
+
+def rebuild_attendance_daily(connection: Connection) -> None:
+    """Recompute attendance_daily from the attendance table."""
+    columns = ", ".join(DAILY_COLUMNS)
+    sums = ", ".join(f"SUM(status = '{status}')" for status in DAILY_COLUMNS.values())
+    connection.execute(text("DELETE FROM attendance_daily"))
+    connection.execute(text(
+        f"INSERT INTO attendance_daily (class_id, attendance_date, {columns}) "
+        f"SELECT class_id, attendance_date, {sums} FROM attendance "
+        f"GROUP BY class_id, attendance_date"
+    ))
+
+def create_counter_triggers(connection: Connection) -> None:
+    """(Re)create the triggers that maintain the counters."""
+    for name, ddl in TRIGGERS.items():
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        connection.execute(text(ddl))
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_counter_triggers(target, connection, tables=(), **kw):
+    # Existing databases get their triggers (and initial counts) from migrations
+    if connection.dialect.name == "sqlite" and "students" in {table.name for table in tables}:
+        create_counter_triggers(connection)
+        rebuild_student_counters(connection)
+        rebuild_class_enrollment(connection)
+        rebuild_attendance_daily(connection)
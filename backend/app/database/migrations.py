@@ -0,0 +1,157 @@
+"""
+Schema migrations for existing databases.
+
+`Base.metadata.create_all` only creates tables that do not exist yet, so
+indexes and columns added to tables that are already in production are
+applied here: columns declared on the models are added (as nullable
+columns) before any migration runs, then each migration backfills data and
+builds indexes. Every migration is idempotent and recorded in the
+`schema_migrations` table once it has run.
+"""
+
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import text, inspect, select, update, bindparam
+from sqlalchemy.engine import Connection, Engine
+
+from .models import Base, Student, Parent
+from .normalization import search_key, phone_digits
+from .search_index import create_search_index, rebuild_search_index
+from .counters import create_counter_triggers, rebuild_student_counters, rebuild_class_enrollment, rebuild_attendance_daily
+
+MIGRATIONS: List[Tuple[str, str, Callable[[Connection], None]]] = []
+
+def migration(version: str, description: str):
+    """Register a migration function under the given version."""
+    def decorator(func: Callable[[Connection], None]):
+        MIGRATIONS.append((version, description, func))
+        return func
+    return decorator
+
+def create_missing_indexes(connection: Connection, table_name: str) -> None:
+    """Create the indexes declared on a model table that the database lacks."""
+    table = Base.metadata.tables[table_name]
+    existing = {index["name"] for index in inspect(connection).get_indexes(table_name)}
+    for index in table.indexes:
+        if index.name not in existing:
+            index.create(connection)
+
+def add_missing_columns(connection: Connection, table_name: str) -> None:
+    """Add the columns declared on a model table that the database lacks."""
+    table = Base.metadata.tables[table_name]
+    existing = {column["name"] for column in inspect(connection).get_columns(table_name)}
+    for column in table.columns:
+        if column.name not in existing:
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column.name} {column_type}"))
+
+@migration("0001", "Composite and unique indexes for hot query paths")
+def add_hot_query_indexes(connection: Connection) -> None:
+    # Keep the most recent record when a student was marked twice on the same
+    # day, otherwise the unique attendance index cannot be built
+    connection.execute(text("""
+        DELETE FROM attendance
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM attendance
+            GROUP BY student_id, class_id, attendance_date
+        )
+    """))
+    for table_name in ("students", "payments", "student_flags", "grades", "attendance"):
+        create_missing_indexes(connection, table_name)
+
+@migration("0002", "Indexes on sortable list columns")
+def add_sort_column_indexes(connection: Connection) -> None:
+    for table_name in ("students", "payments"):
+        create_missing_indexes(connection, table_name)
+
+@migration("0003", "FTS5 search index for students, parents and payments")
+def add_search_index(connection: Connection) -> None:
+    create_search_index(connection)
+    rebuild_search_index(connection)
+
+@migration("0004", "Accent- and case-folded name and phone search columns")
+def add_search_columns(connection: Connection) -> None:
+    students = connection.execute(select(Student.id, Student.first_name, Student.last_name)).all()
+    if students:
+        connection.execute(update(Student.__table__).where(Student.__table__.c.id == bindparam("sid")), [
+            {
+                "sid": row.id,
+                "search_name": search_key(f"{row.first_name} {row.last_name}"),
+                "search_name_reversed": search_key(f"{row.last_name} {row.first_name}"),
+            }
+            for row in students
+        ])
+    parents = connection.execute(select(Parent.id, Parent.first_name, Parent.last_name, Parent.phone, Parent.mobile)).all()
+    if parents:
+        connection.execute(update(Parent.__table__).where(Parent.__table__.c.id == bindparam("pid")), [
+            {
+                "pid": row.id,
+                "search_name": search_key(f"{row.first_name} {row.last_name}"),
+                "search_name_reversed": search_key(f"{row.last_name} {row.first_name}"),
+                "phone_digits": phone_digits(row.phone),
+                "mobile_digits": phone_digits(row.mobile),
+            }
+            for row in parents
+        ])
+    for table_name in ("students", "parents"):
+        create_missing_indexes(connection, table_name)
+    # The index now covers the folded names as well
+    create_search_index(connection)
+    rebuild_search_index(connection)
+
+@migration("0005", "Student counters maintained by triggers")
+def add_student_counters(connection: Connection) -> None:
+    create_counter_triggers(connection)
+    rebuild_student_counters(connection)
+
+@migration("0006", "Confirmed enrollment counter on classes")
+def add_class_enrollment_counter(connection: Connection) -> None:
+    create_counter_triggers(connection)
+    rebuild_class_enrollment(connection)
+
+@migration("0007", "Daily attendance rollup per class")
+def add_attendance_daily(connection: Connection) -> None:
+    create_counter_triggers(connection)
+    rebuild_attendance_daily(connection)
+
+@migration("0008", "Payment date index covering the payment type")
+def add_payment_date_type_index(connection: Connection) -> None:
+    create_missing_indexes(connection, "payments")
+
+@migration("0009", "Token version of users")
+def add_user_token_version(connection: Connection) -> None:
+    # Added as a nullable column without default to existing databases
+    connection.execute(text("UPDATE users SET token_version = 0 WHERE token_version IS NULL"))
+
+def run_migrations(engine: Engine) -> List[str]:
+    """
+    Apply pending migrations in order.
+
+    Returns:
+        List of versions applied by this call
+    """
+    Base.metadata.create_all(bind=engine)
+    applied_now = []
+
+    with engine.begin() as connection:
+        for table_name in Base.metadata.tables:
+            add_missing_columns(connection, table_name)
+
+        connection.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version VARCHAR PRIMARY KEY, description VARCHAR, applied_at DATETIME)"
+        ))
+        applied = set(connection.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+        for version, description, upgrade in MIGRATIONS:
+            if version in applied:
+                continue
+            upgrade(connection)
+            connection.execute(
+                text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {"v": version, "d": description, "t": datetime.now()}
+            )
+            applied_now.append(version)
+
+    return applied_now
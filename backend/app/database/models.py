@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Boolean, ForeignKey, Enum, Text
+from sqlalchemy import (
+    Column, Integer, String, Date, DateTime, Float, Boolean, ForeignKey, Enum, Text, Index, LargeBinary, event
+)
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 import enum
 
+from .normalization import search_key, phone_digits
+
 Base = declarative_base()
 
 class RegistrationStatus(enum.Enum):
@@ -49,6 +53,28 @@ class Student(Base):
     registration_date = Column(DateTime, default=datetime.now)
     academic_year = Column(String, nullable=False)  # e.g., "2024-2025"
     registered_by = Column(Integer, ForeignKey('users.id'))  # Staff who registered
+    
+    # Folded names for search (see normalization.search_key), set on every write
+    search_name = Column(String)  # "first last"
+    search_name_reversed = Column(String)  # "last first"
+    
+    __table_args__ = (
+        # Capacity checks and class rosters filter on both columns
+        Index('ix_students_class_status', 'class_id', 'registration_status'),
+        Index('ix_students_parent_id', 'parent_id'),
+        # Sortable list columns (see STUDENT_SORT_FIELDS)
+        Index('ix_students_first_name', 'first_name'),
+        Index('ix_students_last_name', 'last_name'),
+        Index('ix_students_date_of_birth', 'date_of_birth'),
+        Index('ix_students_registration_date', 'registration_date'),
+        # Prefix searches on either name order
+        Index('ix_students_search_name', 'search_name'),
+        Index('ix_students_search_name_reversed', 'search_name_reversed'),
+    )
+    
+    def update_search_columns(self):
+        self.search_name = search_key(f"{self.first_name} {self.last_name}")
+        self.search_name_reversed = search_key(f"{self.last_name} {self.first_name}")
 
 class Parent(Base):
     __tablename__ = 'parents'
@@ -61,6 +87,48 @@ class Parent(Base):
     mobile = Column(String)
     email = Column(String)
     students = relationship("Student", backref="parent")
+    
+    # Normalized copies for search, set on every write
+    search_name = Column(String)  # folded "first last"
+    search_name_reversed = Column(String)  # folded "last first"
+    phone_digits = Column(String)
+    mobile_digits = Column(String)
+    
+    __table_args__ = (
+        Index('ix_parents_search_name', 'search_name'),
+        Index('ix_parents_search_name_reversed', 'search_name_reversed'),
+        Index('ix_parents_phone_digits', 'phone_digits'),
+        Index('ix_parents_mobile_digits', 'mobile_digits'),
+    )
+    
+    def update_search_columns(self):
+        self.search_name = search_key(f"{self.first_name} {self.last_name}")
+        self.search_name_reversed = search_key(f"{self.last_name} {self.first_name}")
+        self.phone_digits = phone_digits(self.phone)
+        self.mobile_digits = phone_digits(self.mobile)
+
+# Keep the search columns in step with the names however the row is written
+# (services, registration flow, seed scripts)
+@event.listens_for(Student, "before_insert")
+@event.listens_for(Student, "before_update")
+@event.listens_for(Parent, "before_insert")
+@event.listens_for(Parent, "before_update")
+def _update_search_columns(mapper, connection, target):
+    target.update_search_columns()
+
+class StudentCounter(Base):
+    """
+    Number of students per academic year, registration status and gender.
+    
+    Maintained by triggers on `students` (see counters.py) inside the same
+    transaction as the write, so dashboards can read totals from a handful
+    of rows instead of counting the students table.
+    """
+    __tablename__ = 'student_counters'
+    academic_year = Column(String, primary_key=True)
+    status = Column(String, primary_key=True)  # RegistrationStatus name, as stored on students
+    gender = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
 
 class Class(Base):
     __tablename__ = 'classes'
@@ -71,6 +139,8 @@ class Class(Base):
     capacity = Column(Integer, nullable=False)
     academic_year = Column(String, nullable=False)
     created_date = Column(DateTime, default=datetime.now)
+    # Confirmed students, maintained by triggers on students (see counters.py)
+    enrolled_count = Column(Integer, nullable=False, default=0, server_default="0")
     students = relationship("Student", backref="class")
 
 class Payment(Base):
@@ -84,6 +154,23 @@ class Payment(Base):
     receipt_number = Column(String, unique=True)  # Auto-generated receipt number
     notes = Column(String)
     processed_by = Column(Integer, ForeignKey('users.id'))  # Staff who processed payment
+    
+    __table_args__ = (
+        # Payment history of a student, newest first
+        Index('ix_payments_student_date', 'student_id', 'payment_date'),
+        # Sortable list columns (see PAYMENT_SORT_FIELDS)
+        Index('ix_payments_payment_date', 'payment_date'),
+        # Date range reports of one payment type, the type is checked in the index
+        Index('ix_payments_date_type', 'payment_date', 'payment_type'),
+        Index('ix_payments_amount', 'amount'),
+    )
+
+class ReceiptSequence(Base):
+    __tablename__ = 'receipt_sequences'
+    # Receipt numbers restart every year ("2024-000001"), one row per year prefix
+    prefix = Column(String, primary_key=True)
+    # First number not yet handed out in a block (see receipt_service)
+    next_value = Column(Integer, nullable=False, default=1)
 
 class StudentFlag(Base):
     __tablename__ = 'student_flags'
@@ -101,6 +188,10 @@ class StudentFlag(Base):
     student = relationship("Student", backref="flags")
     flagged_by_user = relationship("User", foreign_keys=[flagged_by])
     resolved_by_user = relationship("User", foreign_keys=[resolved_by])
+    
+    __table_args__ = (
+        Index('ix_student_flags_student_id', 'student_id'),
+    )
 
 class User(Base):
     __tablename__ = 'users'
@@ -113,6 +204,19 @@ class User(Base):
     role = Column(String, nullable=False)  # "admin", "registration", "teacher"
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.now)
+    # Signed into access tokens; bumped to revoke every token issued so far
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+
+class RefreshToken(Base):
+    __tablename__ = 'refresh_tokens'
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    # SHA-256 of the token, the token itself is only known to the client
+    token_hash = Column(String, unique=True, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+    # Set when the token is used (rotated) or revoked
+    revoked_at = Column(DateTime, nullable=True)
 
 class Subject(Base):
     __tablename__ = 'subjects'
@@ -149,6 +253,11 @@ class Grade(Base):
     # Relationships
     student = relationship("Student", backref="grades")
     recorded_by_user = relationship("User", backref="grades_recorded")
+    
+    __table_args__ = (
+        Index('ix_grades_student_subject_period', 'student_id', 'subject_id', 'academic_period'),
+        Index('ix_grades_subject_id', 'subject_id'),
+    )
 
 class Attendance(Base):
     __tablename__ = 'attendance'
@@ -170,5 +279,60 @@ class Attendance(Base):
     
     # Ensure one attendance record per student per day per class
     __table_args__ = (
+        Index('uq_attendance_student_class_date', 'student_id', 'class_id', 'attendance_date', unique=True),
+        # Class roll call for a given day
+        Index('ix_attendance_class_date', 'class_id', 'attendance_date'),
         {'extend_existing': True}
     )
+
+class AttendanceDaily(Base):
+    """
+    Attendance counts of one class on one day, by status.
+    
+    Maintained by triggers on `attendance` (see counters.py) for single
+    records, updates and bulk upserts alike, so "present today" and the
+    attendance heatmaps read one row per class and day instead of the
+    attendance records.
+    """
+    __tablename__ = 'attendance_daily'
+    class_id = Column(Integer, ForeignKey('classes.id'), primary_key=True)
+    attendance_date = Column(Date, primary_key=True)
+    present = Column(Integer, nullable=False, default=0)
+    absent = Column(Integer, nullable=False, default=0)
+    late = Column(Integer, nullable=False, default=0)
+    excused = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        # Whole-school lookups for one day ("present today") and date ranges
+        Index('ix_attendance_daily_date', 'attendance_date'),
+    )
+
+class SchoolCalendarDay(Base):
+    """
+    One day of an academic year's calendar, a school day or a holiday.
+    
+    School days are numbered from 0 in `day_index`, the position of the day
+    in the attendance bitmaps (see AttendanceBitmap).
+    """
+    __tablename__ = 'school_calendar'
+    calendar_date = Column(Date, primary_key=True)
+    academic_year = Column(String, nullable=False, index=True)
+    is_school_day = Column(Boolean, nullable=False, default=True)
+    day_index = Column(Integer)  # Position among the year's school days, NULL on holidays
+    description = Column(String)  # Holiday name, etc.
+
+class AttendanceBitmap(Base):
+    """
+    Attendance of one student over one academic year, one bit per school day.
+    
+    `status_high` and `status_low` hold the 2-bit status code of every school
+    day (present 00, late 01, absent 10, excused 11) and `marked` which days
+    have a record at all. Bit i is school day i of the calendar; the planes
+    are little-endian integers, see attendance_bitmap_service.
+    """
+    __tablename__ = 'attendance_bitmaps'
+    student_id = Column(Integer, ForeignKey('students.id'), primary_key=True)
+    academic_year = Column(String, primary_key=True)
+    marked = Column(LargeBinary, nullable=False, default=b"")
+    status_high = Column(LargeBinary, nullable=False, default=b"")
+    status_low = Column(LargeBinary, nullable=False, default=b"")
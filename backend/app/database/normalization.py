@@ -0,0 +1,42 @@
+"""
+Text normalization for name and phone search.
+
+Families spell the same transliterated name in several ways ("Benaïssa" and
+"Benaissa", "Abd el Kader" and "Abdelkader"), so names are compared in a
+folded form: accents stripped, case folded and separators (spaces, hyphens,
+apostrophes) removed. The folded values are stored in indexed columns so
+searches compare plain strings instead of transforming every row.
+"""
+
+import re
+import unicodedata
+from typing import Optional
+
+_SEPARATORS = re.compile(r"[\W_]+")
+_NON_DIGITS = re.compile(r"\D+")
+
+def fold(value: Optional[str]) -> str:
+    """Strip accents, fold case and turn runs of separators into single spaces."""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _SEPARATORS.sub(" ", stripped.casefold()).strip()
+
+def search_key(value: Optional[str]) -> str:
+    """Folded value without separators: "Abd-el Kader" -> "abdelkader"."""
+    return fold(value).replace(" ", "")
+
+def phone_digits(value: Optional[str]) -> Optional[str]:
+    """Digits of a phone number, None when it has none."""
+    return _NON_DIGITS.sub("", value or "") or None
+
+def prefix_range(column, prefix: str):
+    """
+    Condition matching the values of a column that start with a prefix.
+
+    Expressed as a range (`column >= prefix AND column < prefix + U+10FFFF`)
+    so SQLite answers it with an index seek, which `LIKE 'prefix%'` does not
+    get under the default case-insensitive LIKE.
+    """
+    return (column >= prefix) & (column < prefix + "\U0010ffff")
@@ -0,0 +1,223 @@
+"""
+Full-text search index for students, parents and payment receipts.
+
+The index lives in SQLite FTS5 virtual tables using the trigram tokenizer,
+so any substring of three characters or more can be looked up through the
+index instead of scanning `LIKE '%term%'` over every row. Triggers on the
+source tables keep the index in sync however rows are written (services,
+bulk statements or tests talking to the ORM directly), including the
+denormalized names: renaming a parent updates the students' entries and
+renaming a student updates their payments' entries.
+
+Each virtual table uses the id of its source row as rowid, so results are
+joined back with `<table>.rowid = <source>.id`. Names are indexed both as
+written and in their folded form (the search_name columns), so a term
+matches with or without accents and separators.
+"""
+
+from sqlalchemy import Table, Column, Integer, String, Float, MetaData, event, literal_column, text
+from sqlalchemy.engine import Connection
+
+from .models import Base
+from .normalization import search_key
+
+# Trigram matching needs at least this many characters; shorter terms fall
+# back to LIKE
+MIN_FTS_TERM_LENGTH = 3
+
+# Table objects used to query the index. They live in their own MetaData so
+# that create_all/drop_all never treat them as regular tables.
+search_metadata = MetaData()
+
+student_search = Table(
+    "student_search", search_metadata,
+    Column("rowid", Integer, primary_key=True),
+    Column("student_name", String),
+    Column("parent_name", String),
+    Column("rank", Float),
+)
+
+parent_search = Table(
+    "parent_search", search_metadata,
+    Column("rowid", Integer, primary_key=True),
+    Column("parent_name", String),
+    Column("phone", String),
+    Column("email", String),
+    Column("rank", Float),
+)
+
+payment_search = Table(
+    "payment_search", search_metadata,
+    Column("rowid", Integer, primary_key=True),
+    Column("receipt_number", String),
+    Column("student_name", String),
+    Column("rank", Float),
+)
+
+SEARCH_TABLES = {
+    "student_search": "student_name, parent_name",
+    "parent_search": "parent_name, phone, email",
+    "payment_search": "receipt_number, student_name",
+}
+
+# Text indexed for each source row, as SQL expressions over the row alias
+STUDENT_NAME_SQL = "{row}.first_name || ' ' || {row}.last_name || ' ' || coalesce({row}.search_name, '')"
+PARENT_NAME_SQL = "{row}.first_name || ' ' || {row}.last_name || ' ' || coalesce({row}.search_name, '')"
+PARENT_PHONE_SQL = (
+    "coalesce({row}.phone, '') || ' ' || coalesce({row}.mobile, '') || ' ' || "
+    "coalesce({row}.phone_digits, '') || ' ' || coalesce({row}.mobile_digits, '')"
+)
+
+def _student_entry(row: str) -> str:
+    return (
+        f"SELECT {row}.id, {STUDENT_NAME_SQL.format(row=row)}, "
+        f"(SELECT {PARENT_NAME_SQL.format(row='p')} FROM parents p WHERE p.id = {row}.parent_id)"
+    )
+
+def _parent_entry(row: str) -> str:
+    return (
+        f"SELECT {row}.id, {PARENT_NAME_SQL.format(row=row)}, "
+        f"{PARENT_PHONE_SQL.format(row=row)}, coalesce({row}.email, '')"
+    )
+
+def _payment_entry(row: str) -> str:
+    return (
+        f"SELECT {row}.id, coalesce({row}.receipt_number, ''), "
+        f"(SELECT {STUDENT_NAME_SQL.format(row='s')} FROM students s WHERE s.id = {row}.student_id)"
+    )
+
+TRIGGERS = [
+    # Students
+    f"""
+    CREATE TRIGGER students_search_ai AFTER INSERT ON students BEGIN
+        INSERT INTO student_search (rowid, student_name, parent_name) {_student_entry('NEW')};
+    END
+    """,
+    f"""
+    CREATE TRIGGER students_search_au AFTER UPDATE OF first_name, last_name, search_name, parent_id ON students BEGIN
+        DELETE FROM student_search WHERE rowid = OLD.id;
+        INSERT INTO student_search (rowid, student_name, parent_name) {_student_entry('NEW')};
+        UPDATE payment_search SET student_name = {STUDENT_NAME_SQL.format(row='NEW')}
+        WHERE rowid IN (SELECT id FROM payments WHERE student_id = NEW.id);
+    END
+    """,
+    """
+    CREATE TRIGGER students_search_ad AFTER DELETE ON students BEGIN
+        DELETE FROM student_search WHERE rowid = OLD.id;
+    END
+    """,
+    # Parents
+    f"""
+    CREATE TRIGGER parents_search_ai AFTER INSERT ON parents BEGIN
+        INSERT INTO parent_search (rowid, parent_name, phone, email) {_parent_entry('NEW')};
+    END
+    """,
+    f"""
+    CREATE TRIGGER parents_search_au AFTER UPDATE OF first_name, last_name, search_name, phone, mobile, email ON parents BEGIN
+        DELETE FROM parent_search WHERE rowid = OLD.id;
+        INSERT INTO parent_search (rowid, parent_name, phone, email) {_parent_entry('NEW')};
+        UPDATE student_search SET parent_name = {PARENT_NAME_SQL.format(row='NEW')}
+        WHERE rowid IN (SELECT id FROM students WHERE parent_id = NEW.id);
+    END
+    """,
+    """
+    CREATE TRIGGER parents_search_ad AFTER DELETE ON parents BEGIN
+        DELETE FROM parent_search WHERE rowid = OLD.id;
+    END
+    """,
+    # Payments
+    f"""
+    CREATE TRIGGER payments_search_ai AFTER INSERT ON payments BEGIN
+        INSERT INTO payment_search (rowid, receipt_number, student_name) {_payment_entry('NEW')};
+    END
+    """,
+    f"""
+    CREATE TRIGGER payments_search_au AFTER UPDATE OF receipt_number, student_id ON payments BEGIN
+        DELETE FROM payment_search WHERE rowid = OLD.id;
+        INSERT INTO payment_search (rowid, receipt_number, student_name) {_payment_entry('NEW')};
+    END
+    """,
+    """
+    CREATE TRIGGER payments_search_ad AFTER DELETE ON payments BEGIN
+        DELETE FROM payment_search WHERE rowid = OLD.id;
+    END
+    """,
+]
+
+TRIGGER_NAMES = [
+    f"{table}_search_{suffix}"
+    for table in ("students", "parents", "payments")
+    for suffix in ("ai", "au", "ad")
+]
+
+def rebuild_search_index(connection: Connection) -> None:
+    """Repopulate every search table from its source table."""
+    for table_name in SEARCH_TABLES:
+        connection.execute(text(f"DELETE FROM {table_name}"))
+    connection.execute(text(
+        f"INSERT INTO student_search (rowid, student_name, parent_name) {_student_entry('st')} FROM students st"
+    ))
+    connection.execute(text(
+        f"INSERT INTO parent_search (rowid, parent_name, phone, email) {_parent_entry('pa')} FROM parents pa"
+    ))
+    connection.execute(text(
+        f"INSERT INTO payment_search (rowid, receipt_number, student_name) {_payment_entry('py')} FROM payments py"
+    ))
+
+def create_search_index(connection: Connection) -> None:
+    """
+    Create the search tables if they are missing and (re)create their triggers.
+
+    A freshly created index is populated from the existing rows, so this is
+    safe to call on databases that already hold data.
+    """
+    existing = set(connection.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('student_search', 'parent_search', 'payment_search')"
+    )).scalars())
+
+    for table_name, columns in SEARCH_TABLES.items():
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table_name} USING fts5({columns}, tokenize='trigram')"
+        ))
+    for trigger_name in TRIGGER_NAMES:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger_name}"))
+    for trigger in TRIGGERS:
+        connection.execute(text(trigger))
+
+    if existing != set(SEARCH_TABLES):
+        rebuild_search_index(connection)
+
+def drop_search_index(connection: Connection) -> None:
+    """Drop the search tables and their triggers."""
+    for trigger_name in TRIGGER_NAMES:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger_name}"))
+    for table_name in SEARCH_TABLES:
+        connection.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+
+def fts_match(search_table: Table, term: str):
+    """
+    Build a `<table> MATCH` condition finding rows that contain the term.
+
+    The term is looked up as typed and in its folded form, each quoted as an
+    FTS5 phrase so operators and special characters typed by users are
+    matched literally.
+    """
+    phrases = [term]
+    folded = search_key(term)
+    if len(folded) >= MIN_FTS_TERM_LENGTH and folded != term.lower():
+        phrases.append(folded)
+    expression = " OR ".join('"' + phrase.replace('"', '""') + '"' for phrase in phrases)
+    return literal_column(search_table.name).op("MATCH")(expression)
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_search_index(target, connection, tables=(), **kw):
+    # Indexes of databases that already existed are handled by migrations,
+    # which first bring the source tables up to date
+    created = {table.name for table in tables}
+    if connection.dialect.name == "sqlite" and created & {"students", "parents", "payments"}:
+        create_search_index(connection)
+
+@event.listens_for(Base.metadata, "before_drop")
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        drop_search_index(connection)
@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 import os
 
@@ -8,9 +9,61 @@ database_path = os.path.join(backend_dir, "islam_school.db")
 
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{database_path}"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# SQLite connection profiles. "performance" lets readers and writers run
+# concurrently (WAL) and keeps hot pages in memory; "default" leaves SQLite's
+# own settings untouched (rollback journal, small cache).
+SQLITE_PROFILES = {
+    "default": {},
+    "performance": {
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        # Negative values are expressed in KiB rather than pages
+        "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536")),
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    },
+}
+
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "performance")
+
+# Number of prepared statements the sqlite3 driver keeps per connection
+SQLITE_STATEMENT_CACHE_SIZE = int(os.getenv("SQLITE_STATEMENT_CACHE_SIZE", "256"))
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: dict) -> None:
+    """Run the given PRAGMA settings on a raw sqlite3 connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+def configure_sqlite_engine(engine: Engine, profile: str = SQLITE_PROFILE) -> Engine:
+    """Apply a SQLite profile to every new connection opened by the engine."""
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLite profile '{profile}'")
+
+    pragmas = SQLITE_PROFILES[profile]
+    if pragmas:
+        @event.listens_for(engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+    return engine
+
+def create_sqlite_engine(url: str = SQLALCHEMY_DATABASE_URL, profile: str = SQLITE_PROFILE) -> Engine:
+    """Create a SQLite engine configured with the given performance profile."""
+    engine = create_engine(
+        url,
+        connect_args={
+            "check_same_thread": False,
+            "cached_statements": SQLITE_STATEMENT_CACHE_SIZE,
+        },
+    )
+    return configure_sqlite_engine(engine, profile)
+
+engine = create_sqlite_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -1,11 +1,26 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.exc import OperationalError
 from app.api.endpoints import students, payments, registrations, classes, parents, auth, academic, stats, quick_search
+from app.database.session import engine
+from app.services import autocomplete_service
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the quick-search index before the first keystroke; if the
+    # database is not initialized yet it is built on first use instead
+    try:
+        autocomplete_service.warm_up(engine)
+    except OperationalError:
+        pass
+    yield
 
 app = FastAPI(
     title="Islah School Management System",
     description="A comprehensive school management system for student registration, payments, and class management",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import date, datetime
-from typing import Optional
+from typing import Dict, List, Optional
 from enum import Enum
 
 class GradeTypeEnum(str, Enum):
@@ -24,6 +24,19 @@ class AttendanceStatusEnum(str, Enum):
     LATE = "late"
     EXCUSED = "excused"
 
+class HeatmapGroupingEnum(str, Enum):
+    WEEKDAY = "weekday"  # Monday to Sunday over the whole range
+    MONTH = "month"  # One cell per calendar month, "2024-09"
+
+class BulkModeEnum(str, Enum):
+    ALL_OR_NOTHING = "all_or_nothing"  # Any invalid row rejects the whole batch
+    PER_ROW = "per_row"  # Valid rows are saved, invalid ones reported
+
+class BulkOutcomeEnum(str, Enum):
+    INSERTED = "inserted"
+    UPDATED = "updated"
+    UNCHANGED = "unchanged"
+
 # Subject Schemas
 class SubjectBase(BaseModel):
     name: str = Field(..., description="Subject name")
@@ -121,7 +134,25 @@ class SubjectWithDetails(Subject):
 class BulkAttendanceCreate(BaseModel):
     class_id: int = Field(..., description="Class ID")
     attendance_date: date = Field(..., description="Attendance date")
-    attendance_records: list[dict] = Field(..., description="List of {student_id, status, notes}")
+    attendance_records: list[dict] = Field(..., description="List of {student_id, status, notes, arrival_time}")
+
+class BulkAttendanceEntry(BaseModel):
+    """One student of a bulk roll call"""
+    student_id: int
+    status: AttendanceStatusEnum
+    arrival_time: Optional[datetime] = None
+    notes: Optional[str] = None
+
+class BulkAttendanceOutcome(BaseModel):
+    student_id: int
+    outcome: BulkOutcomeEnum
+
+class BulkAttendanceResult(BaseModel):
+    inserted: int
+    updated: int
+    unchanged: int
+    results: List[BulkAttendanceOutcome]
+    records: List[Attendance]
 
 class BulkGradeCreate(BaseModel):
     subject_id: int = Field(..., description="Subject ID")
@@ -131,6 +162,22 @@ class BulkGradeCreate(BaseModel):
     assessment_date: date = Field(..., description="Date of assessment")
     max_grade: float = Field(20, gt=0, description="Maximum possible grade")
     grades: list[dict] = Field(..., description="List of {student_id, grade_value, comments}")
+    mode: BulkModeEnum = Field(BulkModeEnum.ALL_OR_NOTHING, description="How invalid rows are handled")
+
+class BulkGradeEntry(BaseModel):
+    """One row of a bulk grade batch"""
+    student_id: int
+    grade_value: float = Field(..., ge=0)
+    comments: Optional[str] = None
+
+class BulkRowError(BaseModel):
+    index: int = Field(..., description="Position of the row in the batch")
+    student_id: Optional[int] = None
+    error: str
+
+class BulkGradeResult(BaseModel):
+    grades: List[Grade]
+    errors: List[BulkRowError]
 
 # Statistics and Reports
 class AttendanceStats(BaseModel):
@@ -141,9 +188,159 @@ class AttendanceStats(BaseModel):
     excused_days: int
     attendance_rate: float
 
+class AttendanceMatrixRow(BaseModel):
+    student_id: int
+    first_name: str
+    last_name: str
+    statuses: str  # One character per date, see AttendanceMatrix.legend
+
+class AttendanceMatrix(BaseModel):
+    class_id: int
+    start_date: date
+    end_date: date
+    dates: List[date]
+    legend: dict[str, str]  # Status of each character, "." when not marked
+    students: List[AttendanceMatrixRow]
+
+class AttendanceHeatmapCell(BaseModel):
+    key: str  # Weekday name or "YYYY-MM", see HeatmapGroupingEnum
+    school_days: int  # Days with at least one record
+    present: int
+    absent: int
+    late: int
+    excused: int
+    total_records: int
+    attendance_rate: float  # Present or late, in percent of the records
+
+class AttendanceHeatmap(BaseModel):
+    group_by: HeatmapGroupingEnum
+    class_id: Optional[int] = None
+    academic_year: Optional[str] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    cells: List[AttendanceHeatmapCell]
+
+# School calendar and attendance bitmaps
+class SchoolHoliday(BaseModel):
+    calendar_date: date
+    description: Optional[str] = None
+
+class SchoolCalendarCreate(BaseModel):
+    start_date: date = Field(..., description="First day of the academic year")
+    end_date: date = Field(..., description="Last day of the academic year")
+    weekly_days_off: List[int] = Field([5, 6], description="Weekdays without school, Monday is 0")
+    holidays: List[SchoolHoliday] = Field([], description="Other days without school")
+
+class SchoolCalendar(BaseModel):
+    academic_year: str
+    start_date: date
+    end_date: date
+    school_days: int
+    holidays: List[SchoolHoliday]  # Days off other than the weekly ones
+
+class AttendanceSummary(BaseModel):
+    student_id: int
+    academic_year: str
+    marked_days: int  # School days with a record
+    present_days: int
+    late_days: int
+    absent_days: int
+    excused_days: int
+    attendance_rate: float  # Present or late, in percent of the marked days
+    absence_rate: float  # Absent or excused, in percent of the marked days
+    longest_absence_streak: int  # Consecutive school days absent or excused
+    current_absence_streak: int  # Streak ending on the last marked day
+    chronic_absence: bool
+
+class StudentRanking(BaseModel):
+    student_id: int
+    first_name: str
+    last_name: str
+    rank: Optional[int] = None  # Shared by ties, None when no grade carries weight
+    percentile: Optional[float] = None  # Share of ranked students below, ties counted half
+    weighted_average: Optional[float] = None  # Percentage, weighted by grade type
+    total_assessments: int
+    subject_averages: Dict[int, float]  # Weighted average percentage per subject_id
+
+class ClassRankings(BaseModel):
+    class_id: int
+    academic_year: Optional[str] = None
+    academic_period: Optional[AcademicPeriodEnum] = None
+    weights: Dict[GradeTypeEnum, float]
+    class_average: Optional[float] = None
+    median: Optional[float] = None
+    students: List[StudentRanking]
+
+class HistogramBin(BaseModel):
+    lower: float
+    upper: float
+    count: int
+
+class SubjectDistribution(BaseModel):
+    subject_id: int
+    subject_name: str
+    total_assessments: int
+    mean: float
+    median: float
+    std: float
+    lowest: float
+    highest: float
+    p25: float
+    p75: float
+    histogram: List[HistogramBin]  # Percentages of max_grade
+
+class GradeDistribution(BaseModel):
+    class_id: int
+    academic_year: Optional[str] = None
+    academic_period: Optional[AcademicPeriodEnum] = None
+    bins: int
+    subjects: List[SubjectDistribution]
+
+# Report cards
+class ReportCardSubject(BaseModel):
+    subject_name: str
+    academic_period: AcademicPeriodEnum
+    average_grade: float
+    average_percentage: float
+    total_assessments: int
+    comments: List[str]  # Teacher comments on the subject's grades
+
+class ReportCardData(BaseModel):
+    """Everything printed on one report card, the input of the renderer and of its cache key"""
+    student_id: int
+    first_name: str
+    last_name: str
+    class_name: str
+    academic_year: Optional[str] = None
+    academic_period: Optional[AcademicPeriodEnum] = None
+    average_percentage: Optional[float] = None
+    subjects: List[ReportCardSubject]
+    attendance: AttendanceStats
+
 class GradeStats(BaseModel):
     subject_name: str
     average_grade: float
     highest_grade: float
     lowest_grade: float
     total_assessments: int
+    average_percentage: float = 0  # Grades normalized by their max_grade
+
+class SubjectGradeStats(BaseModel):
+    subject_id: int
+    subject_name: str
+    academic_period: AcademicPeriodEnum
+    average_grade: float
+    highest_grade: float
+    lowest_grade: float
+    total_assessments: int
+    average_percentage: float
+    highest_percentage: float
+    lowest_percentage: float
+
+class StudentGradeStats(BaseModel):
+    student_id: int
+    first_name: str
+    last_name: str
+    total_assessments: int
+    average_percentage: Optional[float] = None  # None when the student has no grades
+    subjects: List[SubjectGradeStats]
@@ -37,6 +37,11 @@ class Token(BaseModel):
     access_token: str
     token_type: str
     expires_in: int  # seconds
+    refresh_token: Optional[str] = None  # Exchange at /auth/refresh for a new pair
+    refresh_expires_in: Optional[int] = None  # seconds
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     username: Optional[str] = None
@@ -1,14 +1,83 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, extract
+from sqlalchemy import and_, func, extract, insert, select, or_, case
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from pydantic import ValidationError
 from typing import List, Optional
+from collections import Counter
 from datetime import date, datetime
 
-from ..database.models import Subject, Grade, Attendance, Student, Class, User
+from ..database.models import (
+    Subject, Grade, Attendance, AttendanceDaily, Student, Class, User, GradeType, AcademicPeriod,
+    AttendanceStatus, RegistrationStatus
+)
 from ..schemas.academic import (
     SubjectCreate, SubjectUpdate, GradeCreate, GradeUpdate, 
     AttendanceCreate, AttendanceUpdate, BulkAttendanceCreate, BulkGradeCreate,
-    AttendanceStats, GradeStats
+    AttendanceStats, GradeStats, BulkModeEnum, BulkGradeEntry, BulkRowError, BulkGradeResult,
+    BulkOutcomeEnum, BulkAttendanceEntry, BulkAttendanceOutcome, BulkAttendanceResult,
+    AcademicPeriodEnum, SubjectGradeStats, StudentGradeStats, AttendanceMatrix, AttendanceMatrixRow,
+    HeatmapGroupingEnum, AttendanceHeatmap, AttendanceHeatmapCell
+)
+from .attendance_bitmap_service import AttendanceBitmapService
+
+# Schema enum values mapped to the database enum members
+GRADE_TYPES = {member.value: member for member in GradeType}
+ACADEMIC_PERIODS = {member.value: member for member in AcademicPeriod}
+ATTENDANCE_STATUSES = {member.value: member for member in AttendanceStatus}
+
+# One-character codes of the attendance matrix
+ATTENDANCE_CODES = {
+    AttendanceStatus.PRESENT: "P",
+    AttendanceStatus.ABSENT: "A",
+    AttendanceStatus.LATE: "L",
+    AttendanceStatus.EXCUSED: "E",
+}
+MAX_MATRIX_DAYS = 366
+
+# strftime('%w') numbers Sunday 0, the heatmap starts on Monday
+WEEKDAYS = {"1": "monday", "2": "tuesday", "3": "wednesday", "4": "thursday", "5": "friday", "6": "saturday", "0": "sunday"}
+HEATMAP_KEYS = {
+    HeatmapGroupingEnum.WEEKDAY: func.strftime('%w', AttendanceDaily.attendance_date),
+    HeatmapGroupingEnum.MONTH: func.strftime('%Y-%m', AttendanceDaily.attendance_date),
+}
+
+# A grade as a percentage of its own max_grade, so grades out of 10, 20 or
+# 100 can be averaged together
+GRADE_PERCENTAGE = Grade.grade_value * 100.0 / Grade.max_grade
+
+# Aggregates of one subject and period, see _subject_stats
+SUBJECT_STATS_COLUMNS = (
+    Grade.subject_id,
+    Subject.name.label('subject_name'),
+    Grade.academic_period,
+    func.count(Grade.id).label('total'),
+    func.avg(Grade.grade_value).label('average'),
+    func.max(Grade.grade_value).label('highest'),
+    func.min(Grade.grade_value).label('lowest'),
+    func.avg(GRADE_PERCENTAGE).label('average_percentage'),
+    func.max(GRADE_PERCENTAGE).label('highest_percentage'),
+    func.min(GRADE_PERCENTAGE).label('lowest_percentage'),
 )
+SUBJECT_STATS_GROUPING = (Grade.subject_id, Subject.name, Grade.academic_period)
+
+def _subject_stats(row) -> SubjectGradeStats:
+    return SubjectGradeStats(
+        subject_id=row.subject_id,
+        subject_name=row.subject_name,
+        academic_period=row.academic_period.value,
+        average_grade=round(row.average, 2),
+        highest_grade=row.highest,
+        lowest_grade=row.lowest,
+        total_assessments=row.total,
+        average_percentage=round(row.average_percentage, 2),
+        highest_percentage=round(row.highest_percentage, 2),
+        lowest_percentage=round(row.lowest_percentage, 2)
+    )
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()
+    )
 
 class SubjectService:
     @staticmethod
@@ -81,9 +150,6 @@ class GradeService:
     @staticmethod
     def create_grade(db: Session, grade_data: GradeCreate, recorded_by: int) -> Grade:
         """Create a new grade."""
-        # Import database enums and models
-        from ..database.models import GradeType, AcademicPeriod, Student, Subject
-        
         # Validate that student and subject exist
         student = db.query(Student).filter(Student.id == grade_data.student_id).first()
         if not student:
@@ -93,20 +159,9 @@ class GradeService:
         if not subject:
             raise ValueError(f"Subject with ID {grade_data.subject_id} not found")
         
-        # Convert Pydantic enums to database enums
-        grade_type_db = None
-        academic_period_db = None
-        
         # Map Pydantic enum values to database enum members
-        for db_enum in GradeType:
-            if db_enum.value == grade_data.grade_type.value:
-                grade_type_db = db_enum
-                break
-        
-        for db_enum in AcademicPeriod:
-            if db_enum.value == grade_data.academic_period.value:
-                academic_period_db = db_enum
-                break
+        grade_type_db = GRADE_TYPES[grade_data.grade_type.value]
+        academic_period_db = ACADEMIC_PERIODS[grade_data.academic_period.value]
         
         # Convert Pydantic model to dict with database enum objects
         grade_dict = {
@@ -129,27 +184,74 @@ class GradeService:
         return db_grade
     
     @staticmethod
-    def create_bulk_grades(db: Session, bulk_data: BulkGradeCreate, recorded_by: int) -> List[Grade]:
-        """Create multiple grades at once."""
-        grades = []
+    def create_bulk_grades(db: Session, bulk_data: BulkGradeCreate, recorded_by: int) -> BulkGradeResult:
+        """
+        Create multiple grades at once.
+        
+        The whole batch is validated up front, with one query for the subject
+        and one for every student ID, then inserted with a single executemany
+        in one transaction. In all-or-nothing mode an invalid row raises a
+        ValueError listing every problem and nothing is saved; in per-row mode
+        the valid rows are saved and the invalid ones reported in `errors`.
+        """
+        if db.query(Subject.id).filter(Subject.id == bulk_data.subject_id).first() is None:
+            raise ValueError(f"Subject with ID {bulk_data.subject_id} not found")
         
-        for grade_info in bulk_data.grades:
-            grade_data = GradeCreate(
-                student_id=grade_info['student_id'],
-                subject_id=bulk_data.subject_id,
-                grade_value=grade_info['grade_value'],
-                max_grade=bulk_data.max_grade,
-                grade_type=bulk_data.grade_type,
-                academic_period=bulk_data.academic_period,
-                academic_year=bulk_data.academic_year,
-                assessment_date=bulk_data.assessment_date,
-                comments=grade_info.get('comments')
+        entries = []
+        errors = []
+        for index, row in enumerate(bulk_data.grades):
+            try:
+                entries.append((index, BulkGradeEntry.model_validate(row)))
+            except ValidationError as e:
+                errors.append(BulkRowError(index=index, error=_validation_message(e)))
+        
+        student_ids = {entry.student_id for _, entry in entries}
+        known_students = set(db.scalars(select(Student.id).where(Student.id.in_(student_ids)))) if student_ids else set()
+        
+        valid_entries = []
+        for index, entry in entries:
+            if entry.student_id in known_students:
+                valid_entries.append(entry)
+            else:
+                errors.append(BulkRowError(
+                    index=index, student_id=entry.student_id,
+                    error=f"Student with ID {entry.student_id} not found"
+                ))
+        errors.sort(key=lambda error: error.index)
+        
+        if errors and bulk_data.mode == BulkModeEnum.ALL_OR_NOTHING:
+            raise ValueError(
+                f"{len(errors)} invalid grade rows, nothing was saved: "
+                + "; ".join(f"row {error.index}: {error.error}" for error in errors)
             )
-            
-            grade = GradeService.create_grade(db, grade_data, recorded_by)
-            grades.append(grade)
-            
-        return grades
+        
+        # Values shared by every row of the batch
+        shared = {
+            'subject_id': bulk_data.subject_id,
+            'max_grade': bulk_data.max_grade,
+            'grade_type': GRADE_TYPES[bulk_data.grade_type.value],
+            'academic_period': ACADEMIC_PERIODS[bulk_data.academic_period.value],
+            'academic_year': bulk_data.academic_year,
+            'assessment_date': bulk_data.assessment_date,
+            'recorded_by': recorded_by
+        }
+        rows = [
+            {**shared, 'student_id': entry.student_id, 'grade_value': entry.grade_value, 'comments': entry.comments}
+            for entry in valid_entries
+        ]
+        
+        grades = []
+        if rows:
+            # render_nulls keeps rows with and without comments in the same
+            # multi-row INSERT. Ids are handed out in row order, which is
+            # cheaper to restore than asking for sort_by_parameter_order
+            # (one statement per row on SQLite).
+            statement = insert(Grade).returning(Grade).execution_options(render_nulls=True)
+            grades = sorted(db.scalars(statement, rows).all(), key=lambda grade: grade.id)
+        # Serialize before committing, which would expire the new rows
+        result = BulkGradeResult(grades=grades, errors=errors)
+        db.commit()
+        return result
     
     @staticmethod
     def get_grade(db: Session, grade_id: int) -> Optional[Grade]:
@@ -222,15 +324,29 @@ class GradeService:
     
     @staticmethod
     def get_grade_statistics(db: Session, student_id: int, subject_id: Optional[int] = None) -> GradeStats:
-        """Get grade statistics for a student."""
-        query = db.query(Grade).filter(Grade.student_id == student_id)
+        """
+        Get grade statistics for a student, computed by one SQL aggregate.
+        
+        Without subject_id every subject is included and subject_name is only
+        set when the student has grades in a single subject; use
+        get_grade_breakdown for per-subject figures.
+        """
+        query = db.query(
+            func.count(Grade.id).label('total'),
+            func.avg(Grade.grade_value).label('average'),
+            func.max(Grade.grade_value).label('highest'),
+            func.min(Grade.grade_value).label('lowest'),
+            func.avg(GRADE_PERCENTAGE).label('average_percentage'),
+            func.count(func.distinct(Grade.subject_id)).label('subjects'),
+            func.min(Subject.name).label('subject_name')
+        ).outerjoin(Subject, Subject.id == Grade.subject_id).filter(Grade.student_id == student_id)
         
         if subject_id:
             query = query.filter(Grade.subject_id == subject_id)
             
-        grades = query.all()
+        stats = query.one()
         
-        if not grades:
+        if not stats.total:
             return GradeStats(
                 subject_name="",
                 average_grade=0,
@@ -239,15 +355,94 @@ class GradeService:
                 total_assessments=0
             )
         
-        grade_values = [g.grade_value for g in grades]
-        
         return GradeStats(
-            subject_name=grades[0].subject.name if grades else "",
-            average_grade=sum(grade_values) / len(grade_values),
-            highest_grade=max(grade_values),
-            lowest_grade=min(grade_values),
-            total_assessments=len(grades)
+            subject_name=(stats.subject_name or "") if stats.subjects == 1 else "",
+            average_grade=round(stats.average, 2),
+            highest_grade=stats.highest,
+            lowest_grade=stats.lowest,
+            total_assessments=stats.total,
+            average_percentage=round(stats.average_percentage, 2)
+        )
+    
+    @staticmethod
+    def get_grade_breakdown(
+        db: Session,
+        student_id: int,
+        academic_year: Optional[str] = None
+    ) -> List[SubjectGradeStats]:
+        """Get a student's grade statistics per subject and period in one query."""
+        query = db.query(*SUBJECT_STATS_COLUMNS).join(Subject, Subject.id == Grade.subject_id).filter(
+            Grade.student_id == student_id
         )
+        
+        if academic_year:
+            query = query.filter(Grade.academic_year == academic_year)
+            
+        rows = query.group_by(*SUBJECT_STATS_GROUPING).order_by(Subject.name, Grade.academic_period).all()
+        return [_subject_stats(row) for row in rows]
+    
+    @staticmethod
+    def get_class_grade_statistics(
+        db: Session,
+        class_id: int,
+        subject_id: Optional[int] = None,
+        academic_period: Optional[AcademicPeriodEnum] = None,
+        academic_year: Optional[str] = None,
+        student_id: Optional[int] = None
+    ) -> List[StudentGradeStats]:
+        """
+        Get grade statistics for every student of a class in one query.
+        
+        Each student gets their per-subject, per-period figures and an overall
+        average percentage; students without grades are listed with none.
+        With student_id, only that student of the class is aggregated.
+        """
+        grade_filter = [Grade.student_id == Student.id]
+        if subject_id:
+            grade_filter.append(Grade.subject_id == subject_id)
+        if academic_period:
+            grade_filter.append(Grade.academic_period == ACADEMIC_PERIODS[academic_period.value])
+        if academic_year:
+            grade_filter.append(Grade.academic_year == academic_year)
+        
+        rows = db.query(
+            Student.id.label('student_id'), Student.first_name, Student.last_name, *SUBJECT_STATS_COLUMNS
+        ).select_from(Student).outerjoin(
+            Grade, and_(*grade_filter)
+        ).outerjoin(
+            Subject, Subject.id == Grade.subject_id
+        ).filter(
+            Student.class_id == class_id,
+            *([Student.id == student_id] if student_id is not None else [])
+        ).group_by(
+            Student.id, *SUBJECT_STATS_GROUPING
+        ).order_by(
+            Student.last_name, Student.first_name, Student.id, Subject.name, Grade.academic_period
+        ).all()
+        
+        students = {}
+        percentage_sums = {}
+        for row in rows:
+            student = students.get(row.student_id)
+            if student is None:
+                student = students[row.student_id] = StudentGradeStats(
+                    student_id=row.student_id,
+                    first_name=row.first_name,
+                    last_name=row.last_name,
+                    total_assessments=0,
+                    subjects=[]
+                )
+            if row.total:
+                student.subjects.append(_subject_stats(row))
+                student.total_assessments += row.total
+                percentage_sums[row.student_id] = percentage_sums.get(row.student_id, 0) + row.average_percentage * row.total
+        
+        # Overall average over every grade of the student
+        for student_id, percentage_sum in percentage_sums.items():
+            student = students[student_id]
+            student.average_percentage = round(percentage_sum / student.total_assessments, 2)
+        
+        return list(students.values())
 
 class AttendanceService:
     @staticmethod
@@ -265,49 +460,126 @@ class AttendanceService:
         if existing:
             raise ValueError("Attendance already recorded for this student on this date")
         
-        # Import database enum
-        from ..database.models import AttendanceStatus
-        
         attendance_dict = attendance_data.model_dump()
         attendance_dict['recorded_by'] = recorded_by
         
         # Convert Pydantic enum to database enum
-        if 'status' in attendance_dict:
-            status_db = None
-            for db_enum in AttendanceStatus:
-                if db_enum.value == attendance_dict['status'].value:
-                    status_db = db_enum
-                    break
-            attendance_dict['status'] = status_db
+        attendance_dict['status'] = ATTENDANCE_STATUSES[attendance_dict['status'].value]
         
         db_attendance = Attendance(**attendance_dict)
         db.add(db_attendance)
+        AttendanceBitmapService.record_attendance(
+            db, [(db_attendance.student_id, db_attendance.attendance_date, db_attendance.status)]
+        )
         db.commit()
         db.refresh(db_attendance)
         return db_attendance
     
     @staticmethod
-    def create_bulk_attendance(db: Session, bulk_data: BulkAttendanceCreate, recorded_by: int) -> List[Attendance]:
-        """Create attendance records for multiple students."""
-        attendance_records = []
-        
-        for record in bulk_data.attendance_records:
-            attendance_data = AttendanceCreate(
-                student_id=record['student_id'],
-                class_id=bulk_data.class_id,
-                attendance_date=bulk_data.attendance_date,
-                status=record['status'],
-                notes=record.get('notes')
-            )
-            
+    def create_bulk_attendance(db: Session, bulk_data: BulkAttendanceCreate, recorded_by: int) -> BulkAttendanceResult:
+        """
+        Record a class's roll call for one day, inserting or correcting records.
+        
+        The whole roll call is written by a single INSERT ... ON CONFLICT DO
+        UPDATE on the (student_id, class_id, attendance_date) unique key and
+        committed once. Existing records are only rewritten when their status,
+        arrival time or notes differ, so every student is reported as
+        inserted, updated or unchanged. Any invalid row rejects the roll call.
+        """
+        entries = []
+        problems = []
+        for index, row in enumerate(bulk_data.attendance_records):
             try:
-                attendance = AttendanceService.create_attendance(db, attendance_data, recorded_by)
-                attendance_records.append(attendance)
-            except ValueError:
-                # Skip if already exists
-                continue
-                
-        return attendance_records
+                entries.append(BulkAttendanceEntry.model_validate(row))
+            except ValidationError as e:
+                problems.append(f"row {index}: {_validation_message(e)}")
+        
+        student_ids = [entry.student_id for entry in entries]
+        duplicates = sorted(student_id for student_id, count in Counter(student_ids).items() if count > 1)
+        if duplicates:
+            problems.append(f"students listed more than once: {', '.join(map(str, duplicates))}")
+        unknown = set(student_ids) - set(db.scalars(select(Student.id).where(Student.id.in_(student_ids))))
+        if unknown:
+            problems.append(f"unknown students: {', '.join(map(str, sorted(unknown)))}")
+        if problems:
+            raise ValueError("Invalid roll call, nothing was saved: " + "; ".join(problems))
+        
+        if not entries:
+            return BulkAttendanceResult(inserted=0, updated=0, unchanged=0, results=[], records=[])
+        
+        # New records get created_at == updated_at == now, updated ones keep
+        # their original created_at, which tells them apart in RETURNING
+        now = datetime.now()
+        rows = [
+            {
+                'student_id': entry.student_id,
+                'class_id': bulk_data.class_id,
+                'attendance_date': bulk_data.attendance_date,
+                'status': ATTENDANCE_STATUSES[entry.status.value],
+                'arrival_time': entry.arrival_time,
+                'notes': entry.notes,
+                'recorded_by': recorded_by,
+                'created_at': now,
+                'updated_at': now
+            }
+            for entry in entries
+        ]
+        
+        # A Core insert on the table, the ORM bulk path would split the batch
+        # on NULL columns
+        table = Attendance.__table__
+        statement = sqlite_insert(table)
+        excluded = statement.excluded
+        statement = statement.on_conflict_do_update(
+            index_elements=['student_id', 'class_id', 'attendance_date'],
+            set_={
+                'status': excluded.status,
+                'arrival_time': excluded.arrival_time,
+                'notes': excluded.notes,
+                'recorded_by': excluded.recorded_by,
+                'updated_at': excluded.updated_at
+            },
+            where=or_(
+                table.c.status.is_distinct_from(excluded.status),
+                table.c.arrival_time.is_distinct_from(excluded.arrival_time),
+                table.c.notes.is_distinct_from(excluded.notes)
+            )
+        ).returning(table.c.student_id, table.c.created_at)
+        
+        # Rows skipped by the WHERE clause are not returned
+        written = {student_id: created_at for student_id, created_at in db.execute(statement, rows)}
+        AttendanceBitmapService.record_attendance(
+            db, [(row['student_id'], row['attendance_date'], row['status']) for row in rows if row['student_id'] in written]
+        )
+        
+        results = []
+        for entry in entries:
+            if entry.student_id not in written:
+                outcome = BulkOutcomeEnum.UNCHANGED
+            elif written[entry.student_id] == now:
+                outcome = BulkOutcomeEnum.INSERTED
+            else:
+                outcome = BulkOutcomeEnum.UPDATED
+            results.append(BulkAttendanceOutcome(student_id=entry.student_id, outcome=outcome))
+        
+        records = db.query(Attendance).filter(
+            Attendance.class_id == bulk_data.class_id,
+            Attendance.attendance_date == bulk_data.attendance_date,
+            Attendance.student_id.in_(student_ids)
+        ).populate_existing().all()
+        position = {student_id: index for index, student_id in enumerate(student_ids)}
+        records.sort(key=lambda record: position[record.student_id])
+        
+        # Serialize before committing, which would expire the records
+        result = BulkAttendanceResult(
+            inserted=sum(r.outcome == BulkOutcomeEnum.INSERTED for r in results),
+            updated=sum(r.outcome == BulkOutcomeEnum.UPDATED for r in results),
+            unchanged=sum(r.outcome == BulkOutcomeEnum.UNCHANGED for r in results),
+            results=results,
+            records=records
+        )
+        db.commit()
+        return result
     
     @staticmethod
     def get_attendance(db: Session, attendance_id: int) -> Optional[Attendance]:
@@ -355,22 +627,18 @@ class AttendanceService:
         if not db_attendance:
             return None
             
-        # Import database enum
-        from ..database.models import AttendanceStatus
-        
         update_data = attendance_data.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             if field == 'status' and value is not None:
                 # Convert Pydantic enum to database enum
-                status_db = None
-                for db_enum in AttendanceStatus:
-                    if db_enum.value == value.value:
-                        status_db = db_enum
-                        break
-                setattr(db_attendance, field, status_db)
+                setattr(db_attendance, field, ATTENDANCE_STATUSES[value.value])
             else:
                 setattr(db_attendance, field, value)
             
+        if update_data.get('status') is not None:
+            AttendanceBitmapService.record_attendance(
+                db, [(db_attendance.student_id, db_attendance.attendance_date, db_attendance.status)]
+            )
         db_attendance.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(db_attendance)
@@ -383,39 +651,154 @@ class AttendanceService:
         start_date: Optional[date] = None,
         end_date: Optional[date] = None
     ) -> AttendanceStats:
-        """Get attendance statistics for a student."""
-        query = db.query(Attendance).filter(Attendance.student_id == student_id)
+        """Get attendance statistics for a student, counted by one SQL aggregate."""
+        def days(status: AttendanceStatus):
+            return func.coalesce(func.sum(case((Attendance.status == status, 1), else_=0)), 0)
+        
+        query = db.query(
+            func.count(Attendance.id).label('total'),
+            days(AttendanceStatus.PRESENT).label('present'),
+            days(AttendanceStatus.ABSENT).label('absent'),
+            days(AttendanceStatus.LATE).label('late'),
+            days(AttendanceStatus.EXCUSED).label('excused')
+        ).filter(Attendance.student_id == student_id)
         
         if start_date:
             query = query.filter(Attendance.attendance_date >= start_date)
         if end_date:
             query = query.filter(Attendance.attendance_date <= end_date)
             
-        records = query.all()
-        
-        if not records:
-            return AttendanceStats(
-                total_days=0,
-                present_days=0,
-                absent_days=0,
-                late_days=0,
-                excused_days=0,
-                attendance_rate=0.0
-            )
-        
-        total_days = len(records)
-        present_days = len([r for r in records if r.status.value == "present"])
-        absent_days = len([r for r in records if r.status.value == "absent"])
-        late_days = len([r for r in records if r.status.value == "late"])
-        excused_days = len([r for r in records if r.status.value == "excused"])
+        counts = query.one()
         
-        attendance_rate = (present_days + late_days) / total_days * 100 if total_days > 0 else 0
+        attendance_rate = (counts.present + counts.late) / counts.total * 100 if counts.total else 0
         
         return AttendanceStats(
-            total_days=total_days,
-            present_days=present_days,
-            absent_days=absent_days,
-            late_days=late_days,
-            excused_days=excused_days,
+            total_days=counts.total,
+            present_days=counts.present,
+            absent_days=counts.absent,
+            late_days=counts.late,
+            excused_days=counts.excused,
             attendance_rate=round(attendance_rate, 2)
         )
+    
+    @staticmethod
+    def get_class_attendance_matrix(
+        db: Session,
+        class_id: int,
+        start_date: date,
+        end_date: date
+    ) -> AttendanceMatrix:
+        """
+        Get a class register: the status of every student on every day in range.
+        
+        One query reads the class's students with their records of the
+        range. The dates are the days on which the class has records, and
+        each student's statuses are a string with one character per date
+        (see ATTENDANCE_CODES, "." when the student was not marked).
+        """
+        if end_date < start_date:
+            raise ValueError("end_date must not be before start_date")
+        if (end_date - start_date).days >= MAX_MATRIX_DAYS:
+            raise ValueError(f"The date range cannot exceed {MAX_MATRIX_DAYS} days")
+        
+        rows = db.query(
+            Student.id, Student.first_name, Student.last_name, Attendance.attendance_date, Attendance.status
+        ).outerjoin(
+            Attendance,
+            and_(
+                Attendance.student_id == Student.id,
+                Attendance.class_id == class_id,
+                Attendance.attendance_date >= start_date,
+                Attendance.attendance_date <= end_date
+            )
+        ).filter(
+            Student.class_id == class_id,
+            Student.registration_status != RegistrationStatus.CANCELLED
+        ).order_by(Student.last_name, Student.first_name, Student.id).all()
+        
+        dates = sorted({row.attendance_date for row in rows if row.attendance_date is not None})
+        column = {attendance_date: index for index, attendance_date in enumerate(dates)}
+        
+        students = {}
+        for row in rows:
+            if row.id not in students:
+                students[row.id] = (row, ["."] * len(dates))
+            if row.attendance_date is not None:
+                students[row.id][1][column[row.attendance_date]] = ATTENDANCE_CODES[row.status]
+        
+        return AttendanceMatrix(
+            class_id=class_id,
+            start_date=start_date,
+            end_date=end_date,
+            dates=dates,
+            legend={code: status.value for status, code in ATTENDANCE_CODES.items()},
+            students=[
+                AttendanceMatrixRow(
+                    student_id=student.id,
+                    first_name=student.first_name,
+                    last_name=student.last_name,
+                    statuses="".join(statuses)
+                )
+                for student, statuses in students.values()
+            ]
+        )
+    
+    @staticmethod
+    def get_attendance_heatmap(
+        db: Session,
+        group_by: HeatmapGroupingEnum,
+        class_id: Optional[int] = None,
+        academic_year: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> AttendanceHeatmap:
+        """
+        Get attendance counts by weekday or by month.
+        
+        Reads the attendance_daily rollup (one row per class and day), never
+        the attendance records themselves.
+        """
+        key = HEATMAP_KEYS[group_by].label('key')
+        query = db.query(
+            key,
+            func.count(func.distinct(AttendanceDaily.attendance_date)).label('school_days'),
+            func.sum(AttendanceDaily.present).label('present'),
+            func.sum(AttendanceDaily.absent).label('absent'),
+            func.sum(AttendanceDaily.late).label('late'),
+            func.sum(AttendanceDaily.excused).label('excused')
+        )
+        if class_id:
+            query = query.filter(AttendanceDaily.class_id == class_id)
+        if academic_year:
+            query = query.join(Class, Class.id == AttendanceDaily.class_id).filter(Class.academic_year == academic_year)
+        if start_date:
+            query = query.filter(AttendanceDaily.attendance_date >= start_date)
+        if end_date:
+            query = query.filter(AttendanceDaily.attendance_date <= end_date)
+        
+        rows = {row.key: row for row in query.group_by(key).all()}
+        keys = [day for day in WEEKDAYS if day in rows] if group_by == HeatmapGroupingEnum.WEEKDAY else sorted(rows)
+        
+        cells = []
+        for row_key in keys:
+            row = rows[row_key]
+            total = row.present + row.absent + row.late + row.excused
+            cells.append(AttendanceHeatmapCell(
+                key=WEEKDAYS[row_key] if group_by == HeatmapGroupingEnum.WEEKDAY else row_key,
+                school_days=row.school_days,
+                present=row.present,
+                absent=row.absent,
+                late=row.late,
+                excused=row.excused,
+                total_records=total,
+                attendance_rate=round((row.present + row.late) / total * 100, 2) if total else 0
+            ))
+        
+        return AttendanceHeatmap(
+            group_by=group_by,
+            class_id=class_id,
+            academic_year=academic_year,
+            start_date=start_date,
+            end_date=end_date,
+            cells=cells
+        )
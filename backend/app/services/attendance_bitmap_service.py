@@ -0,0 +1,282 @@
+"""
+School calendar and per-student attendance bitmaps.
+
+Every school day of an academic year has a position (`day_index`) in the
+calendar, and every student one AttendanceBitmap row per year holding the
+2-bit status code of each school day in two bit planes, plus a plane of the
+days that have a record. Attendance rate, absence streaks and chronic
+absence are then a few integer bit operations on a single row instead of a
+scan of the student's attendance records.
+
+AttendanceService keeps the bitmaps in step in the same transaction as every
+attendance write. Days missing from the calendar (or holidays) are not
+tracked. After the calendar of a year changes its bitmaps are rebuilt from
+the attendance rows; `python rebuild_attendance_bitmaps.py` does the same for
+every year.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, delete, select
+from typing import Iterable, List, Optional, Tuple
+from collections import defaultdict
+from datetime import date, timedelta
+
+from ..database.models import (
+    SchoolCalendarDay, AttendanceBitmap, Attendance, Student, AttendanceStatus, RegistrationStatus
+)
+from ..schemas.academic import SchoolCalendarCreate, SchoolCalendar, SchoolHoliday, AttendanceSummary
+
+# 2-bit status code of a day as (high bit, low bit): the high bit marks a
+# missed day, the low bit a late arrival or an excuse
+STATUS_CODES = {
+    AttendanceStatus.PRESENT: (0, 0),
+    AttendanceStatus.LATE: (0, 1),
+    AttendanceStatus.ABSENT: (1, 0),
+    AttendanceStatus.EXCUSED: (1, 1),
+}
+
+# Missing at least this share of the marked school days is chronic absence
+CHRONIC_ABSENCE_RATE = 0.10
+MAX_CALENDAR_DAYS = 366
+
+def to_bits(blob: Optional[bytes]) -> int:
+    return int.from_bytes(blob or b"", "little")
+
+def to_blob(bits: int) -> bytes:
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+def set_day(planes: Tuple[int, int, int], index: int, status: AttendanceStatus) -> Tuple[int, int, int]:
+    """Return (marked, high, low) with school day `index` set to `status`."""
+    marked, high, low = planes
+    bit = 1 << index
+    high_bit, low_bit = STATUS_CODES[status]
+    return (
+        marked | bit,
+        (high & ~bit) | (bit if high_bit else 0),
+        (low & ~bit) | (bit if low_bit else 0)
+    )
+
+def longest_run(bits: int) -> int:
+    """Length of the longest run of consecutive set bits."""
+    run = 0
+    while bits:
+        bits &= bits >> 1
+        run += 1
+    return run
+
+def trailing_run(bits: int, last: int) -> int:
+    """Length of the run of set bits ending at bit `last`."""
+    if last < 0:
+        return 0
+    gaps = ~bits & ((1 << (last + 1)) - 1)
+    return last + 1 - gaps.bit_length()
+
+def summarize(
+    student_id: int,
+    academic_year: str,
+    planes: Tuple[int, int, int],
+    threshold: float = CHRONIC_ABSENCE_RATE
+) -> AttendanceSummary:
+    """Attendance figures of one student and year, from the bit planes."""
+    marked, high, low = planes
+    present = marked & ~high & ~low
+    late = marked & ~high & low
+    absent = high & ~low
+    excused = high & low
+
+    marked_days = marked.bit_count()
+    missed_days = high.bit_count()
+    attended_days = marked_days - missed_days
+
+    return AttendanceSummary(
+        student_id=student_id,
+        academic_year=academic_year,
+        marked_days=marked_days,
+        present_days=present.bit_count(),
+        late_days=late.bit_count(),
+        absent_days=absent.bit_count(),
+        excused_days=excused.bit_count(),
+        attendance_rate=round(attended_days / marked_days * 100, 2) if marked_days else 0,
+        absence_rate=round(missed_days / marked_days * 100, 2) if marked_days else 0,
+        # Unmarked days are 0 in the high plane, so they break a streak
+        longest_absence_streak=longest_run(high),
+        current_absence_streak=trailing_run(high, marked.bit_length() - 1),
+        chronic_absence=bool(marked_days) and missed_days / marked_days >= threshold
+    )
+
+def _planes(bitmap: AttendanceBitmap) -> Tuple[int, int, int]:
+    return to_bits(bitmap.marked), to_bits(bitmap.status_high), to_bits(bitmap.status_low)
+
+class SchoolCalendarService:
+    @staticmethod
+    def set_calendar(db: Session, academic_year: str, calendar_data: SchoolCalendarCreate) -> SchoolCalendar:
+        """
+        Replace the calendar of an academic year and rebuild its bitmaps.
+
+        Every day from start_date to end_date is stored, as a school day
+        unless it falls on a weekly day off or a holiday.
+        """
+        start_date, end_date = calendar_data.start_date, calendar_data.end_date
+        if end_date < start_date:
+            raise ValueError("end_date must not be before start_date")
+        if (end_date - start_date).days >= MAX_CALENDAR_DAYS:
+            raise ValueError(f"A calendar cannot exceed {MAX_CALENDAR_DAYS} days")
+        if any(weekday not in range(7) for weekday in calendar_data.weekly_days_off):
+            raise ValueError("weekly_days_off must be weekdays from 0 (Monday) to 6 (Sunday)")
+        holidays = {holiday.calendar_date: holiday.description for holiday in calendar_data.holidays}
+        outside = sorted(day for day in holidays if not start_date <= day <= end_date)
+        if outside:
+            raise ValueError(f"Holiday {outside[0]} is outside the calendar")
+
+        overlap = db.query(SchoolCalendarDay.academic_year).filter(
+            SchoolCalendarDay.calendar_date >= start_date,
+            SchoolCalendarDay.calendar_date <= end_date,
+            SchoolCalendarDay.academic_year != academic_year
+        ).first()
+        if overlap:
+            raise ValueError(f"The dates overlap the calendar of {overlap.academic_year}")
+
+        rows = []
+        day_index = 0
+        for offset in range((end_date - start_date).days + 1):
+            day = start_date + timedelta(days=offset)
+            is_school_day = day not in holidays and day.weekday() not in calendar_data.weekly_days_off
+            rows.append({
+                "calendar_date": day,
+                "academic_year": academic_year,
+                "is_school_day": is_school_day,
+                "day_index": day_index if is_school_day else None,
+                "description": holidays.get(day)
+            })
+            day_index += is_school_day
+
+        db.execute(delete(SchoolCalendarDay).where(SchoolCalendarDay.academic_year == academic_year))
+        db.execute(insert(SchoolCalendarDay), rows)
+        # Day positions may have moved
+        AttendanceBitmapService.rebuild_bitmaps(db, academic_year)
+        db.commit()
+        return SchoolCalendarService.get_calendar(db, academic_year)
+
+    @staticmethod
+    def get_calendar(db: Session, academic_year: str) -> Optional[SchoolCalendar]:
+        """Get the calendar of an academic year."""
+        days = db.query(SchoolCalendarDay).filter(
+            SchoolCalendarDay.academic_year == academic_year
+        ).order_by(SchoolCalendarDay.calendar_date).all()
+        if not days:
+            return None
+
+        return SchoolCalendar(
+            academic_year=academic_year,
+            start_date=days[0].calendar_date,
+            end_date=days[-1].calendar_date,
+            school_days=sum(day.is_school_day for day in days),
+            holidays=[
+                SchoolHoliday(calendar_date=day.calendar_date, description=day.description)
+                for day in days if not day.is_school_day and day.description
+            ]
+        )
+
+class AttendanceBitmapService:
+    @staticmethod
+    def record_attendance(db: Session, entries: Iterable[Tuple[int, date, AttendanceStatus]]) -> None:
+        """
+        Set the status of (student_id, attendance_date, status) entries in the bitmaps.
+
+        Two queries whatever the number of entries: the calendar days and the
+        students' bitmaps. Changes are flushed with the caller's transaction.
+        """
+        entries = list(entries)
+        calendar = {
+            day.calendar_date: day
+            for day in db.query(SchoolCalendarDay).filter(
+                SchoolCalendarDay.calendar_date.in_({attendance_date for _, attendance_date, _ in entries}),
+                SchoolCalendarDay.is_school_day.is_(True)
+            )
+        }
+        entries = [entry for entry in entries if entry[1] in calendar]
+        if not entries:
+            return
+
+        bitmaps = {
+            (bitmap.student_id, bitmap.academic_year): bitmap
+            for bitmap in db.query(AttendanceBitmap).filter(
+                AttendanceBitmap.student_id.in_({student_id for student_id, _, _ in entries}),
+                AttendanceBitmap.academic_year.in_({day.academic_year for day in calendar.values()})
+            )
+        }
+        for student_id, attendance_date, status in entries:
+            day = calendar[attendance_date]
+            bitmap = bitmaps.get((student_id, day.academic_year))
+            if bitmap is None:
+                bitmap = AttendanceBitmap(student_id=student_id, academic_year=day.academic_year)
+                db.add(bitmap)
+                bitmaps[(student_id, day.academic_year)] = bitmap
+            marked, high, low = set_day(_planes(bitmap), day.day_index, status)
+            bitmap.marked, bitmap.status_high, bitmap.status_low = to_blob(marked), to_blob(high), to_blob(low)
+
+    @staticmethod
+    def rebuild_bitmaps(db: Session, academic_year: Optional[str] = None) -> int:
+        """
+        Recompute the bitmaps of one academic year (or all) from the attendance rows.
+
+        When a student has records in two classes on the same day the most
+        recently updated one wins. Does not commit.
+
+        Returns:
+            Number of bitmaps written
+        """
+        deletion = delete(AttendanceBitmap)
+        query = select(
+            Attendance.student_id, SchoolCalendarDay.academic_year, SchoolCalendarDay.day_index, Attendance.status
+        ).join(
+            SchoolCalendarDay, SchoolCalendarDay.calendar_date == Attendance.attendance_date
+        ).where(SchoolCalendarDay.is_school_day.is_(True)).order_by(Attendance.updated_at, Attendance.id)
+        if academic_year:
+            deletion = deletion.where(AttendanceBitmap.academic_year == academic_year)
+            query = query.where(SchoolCalendarDay.academic_year == academic_year)
+        db.execute(deletion)
+
+        planes = defaultdict(lambda: (0, 0, 0))
+        for student_id, year, day_index, status in db.execute(query):
+            planes[(student_id, year)] = set_day(planes[(student_id, year)], day_index, status)
+
+        if planes:
+            db.execute(insert(AttendanceBitmap), [
+                {
+                    "student_id": student_id,
+                    "academic_year": year,
+                    "marked": to_blob(marked),
+                    "status_high": to_blob(high),
+                    "status_low": to_blob(low)
+                }
+                for (student_id, year), (marked, high, low) in planes.items()
+            ])
+        return len(planes)
+
+    @staticmethod
+    def get_attendance_summary(db: Session, student_id: int, academic_year: str) -> AttendanceSummary:
+        """Get a student's attendance figures for a year from their bitmap."""
+        bitmap = db.get(AttendanceBitmap, (student_id, academic_year))
+        return summarize(student_id, academic_year, _planes(bitmap) if bitmap else (0, 0, 0))
+
+    @staticmethod
+    def get_chronic_absences(
+        db: Session,
+        class_id: int,
+        academic_year: str,
+        threshold: float = CHRONIC_ABSENCE_RATE
+    ) -> List[AttendanceSummary]:
+        """Get the students of a class who missed at least `threshold` of their marked days, worst first."""
+        bitmaps = db.query(AttendanceBitmap).join(Student, Student.id == AttendanceBitmap.student_id).filter(
+            Student.class_id == class_id,
+            Student.registration_status != RegistrationStatus.CANCELLED,
+            AttendanceBitmap.academic_year == academic_year
+        ).all()
+
+        summaries = [
+            summarize(bitmap.student_id, academic_year, _planes(bitmap), threshold) for bitmap in bitmaps
+        ]
+        chronic = [summary for summary in summaries if summary.chronic_absence]
+        chronic.sort(key=lambda summary: (-summary.absence_rate, summary.student_id))
+        return chronic
@@ -1,31 +1,223 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Dict, Hashable, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import hashlib
+import os
+import secrets
+import threading
+import time
 
-from ..database.models import User
-from ..schemas.user import UserCreate, UserLogin
+from ..database.models import Base, User, RefreshToken
+from ..schemas.user import UserCreate, UserLogin, Token
 
-# Password hashing configuration
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing configuration. Hashes made with another cost factor are
+# upgraded (or downgraded) on the next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt runs on its own threads rather than the request thread pool: at
+# most PASSWORD_HASH_WORKERS hashes at a time, PASSWORD_HASH_QUEUE more
+# waiting, and further requests are turned away instead of piling up.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "64"))
+
+class PasswordHasher:
+    """Bounded executor for password hashing and verification"""
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, queue_size: int = PASSWORD_HASH_QUEUE):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def submit(self, function: Callable, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many logins in progress, please retry",
+                headers={"Retry-After": "1"}
+            )
+        def call():
+            # Released before the result is handed back
+            try:
+                return function(*args)
+            finally:
+                self._slots.release()
+        try:
+            return self.executor.submit(call)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def run(self, function: Callable, *args):
+        """Run on the executor, blocking the calling thread."""
+        return self.submit(function, *args).result()
+
+    async def run_async(self, function: Callable, *args):
+        """Run on the executor without holding the event loop or a request thread."""
+        return await asyncio.wrap_future(self.submit(function, *args))
+
+password_hasher = PasswordHasher()
 
 # JWT configuration
 SECRET_KEY = "your-secret-key-here"  # In production, use environment variable
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Refresh tokens renew short-lived access tokens without a password check
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+
+# Authenticated users are kept in memory for a short while, so the parallel
+# calls of a dashboard do not each load the same row. Deactivation and
+# password changes drop the entry at once; the TTL only bounds staleness
+# caused by other processes writing to the same database.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+
+class UserCache:
+    """
+    TTL and LRU bounded cache of active users.
+
+    Entries are keyed by the database URL, the user id and the token
+    version, and hold detached copies of the User rows, safe to share
+    between requests. A size of 0 disables the cache.
+    """
+
+    def __init__(self, ttl_seconds: float = USER_CACHE_TTL_SECONDS, max_size: int = USER_CACHE_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[User]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user
+
+    def set(self, key: Hashable, user: User) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        """Drop every entry of a user, whatever the database and token version."""
+        with self._lock:
+            stale = [key for key in self._entries if key[1] == user_id]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+user_cache = UserCache()
+
+# "database" loads the user of every request (through the user cache);
+# "claims" trusts the role and id signed into the token and only checks its
+# version against the in-memory TokenVersionTable, no query per request.
+AUTH_MODES = ("database", "claims")
+AUTH_MODE = os.getenv("AUTH_MODE", "database")
+if AUTH_MODE not in AUTH_MODES:
+    raise ValueError(f"Unknown AUTH_MODE '{AUTH_MODE}'")
+
+# How often the version table is reloaded, to see writes of other processes
+TOKEN_VERSIONS_REFRESH_SECONDS = float(os.getenv("TOKEN_VERSIONS_REFRESH_SECONDS", "30"))
+
+class TokenVersionTable:
+    """
+    Current token version of every user, None for deactivated users.
+
+    Loaded with one query on all users and reloaded every
+    TOKEN_VERSIONS_REFRESH_SECONDS; this process's own deactivations and
+    password changes are applied at once. Users created since the last load
+    are looked up on their first request.
+    """
+
+    def __init__(self, refresh_seconds: float = TOKEN_VERSIONS_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        # Per database URL: (loaded at, {user_id: version or None})
+        self._tables: Dict[str, Tuple[float, Dict[int, Optional[int]]]] = {}
+        self._lock = threading.Lock()
+
+    def _versions(self, db: Session) -> Dict[int, Optional[int]]:
+        url = str(db.get_bind().url)
+        with self._lock:
+            loaded_at, versions = self._tables.get(url, (None, None))
+            if loaded_at is None or time.monotonic() - loaded_at > self.refresh_seconds:
+                rows = db.query(User.id, User.token_version, User.is_active).all()
+                versions = {user_id: version if is_active else None for user_id, version, is_active in rows}
+                self._tables[url] = (time.monotonic(), versions)
+            return versions
+
+    def is_current(self, db: Session, user_id: int, token_version: int) -> bool:
+        """Whether a token of this version is still valid for the user."""
+        versions = self._versions(db)
+        if user_id not in versions:
+            row = db.query(User.token_version, User.is_active).filter(User.id == user_id).first()
+            versions[user_id] = row.token_version if row and row.is_active else None
+        return versions[user_id] == token_version
+
+    def update(self, db: Session, user: User) -> None:
+        """Record a user's new version or deactivation, once committed."""
+        with self._lock:
+            entry = self._tables.get(str(db.get_bind().url))
+            if entry is not None:
+                entry[1][user.id] = user.token_version if user.is_active else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tables.clear()
+
+token_versions = TokenVersionTable()
+
+@event.listens_for(Base.metadata, "after_drop")
+def _clear_users_after_drop(target, connection, **kw):
+    user_cache.clear()
+    token_versions.clear()
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _detached_copy(user: User) -> User:
+    return User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
 
 class AuthService:
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verify a plain password against its hash."""
-        return pwd_context.verify(plain_password, hashed_password)
+        return password_hasher.run(pwd_context.verify, plain_password, hashed_password)
     
     @staticmethod
     def get_password_hash(password: str) -> str:
         """Hash a password."""
-        return pwd_context.hash(password)
+        return password_hasher.run(pwd_context.hash, password)
+    
+    @staticmethod
+    async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password off the event loop.
+        
+        Returns:
+            Whether it matches, and a new hash when the stored one was made
+            with another cost factor
+        """
+        return await password_hasher.run_async(pwd_context.verify_and_update, plain_password, hashed_password)
     
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -40,6 +232,86 @@ class AuthService:
         encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
         return encoded_jwt
     
+    @staticmethod
+    def issue_tokens(db: Session, user: User) -> Token:
+        """
+        Create an access token and a new refresh token for a user.
+        
+        Refresh tokens are random strings; only their SHA-256 is stored, a
+        cheap lookup that needs no bcrypt since they cannot be guessed.
+        """
+        access_token = AuthService.create_access_token(
+            data={"sub": user.username, "role": user.role, "uid": user.id, "ver": user.token_version},
+            expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        )
+        refresh_token = secrets.token_urlsafe(32)
+        now = datetime.utcnow()
+        # The user's expired tokens are of no use anymore, even to detect reuse
+        db.query(RefreshToken).filter(
+            RefreshToken.user_id == user.id, RefreshToken.expires_at <= now
+        ).delete(synchronize_session=False)
+        db.add(RefreshToken(
+            user_id=user.id,
+            token_hash=_token_hash(refresh_token),
+            expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+            created_at=now
+        ))
+        db.commit()
+        return Token(
+            access_token=access_token,
+            token_type="bearer",
+            expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+            refresh_token=refresh_token,
+            refresh_expires_in=REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600
+        )
+    
+    @staticmethod
+    def refresh_tokens(db: Session, refresh_token: str) -> Token:
+        """
+        Exchange a refresh token for a new access token and refresh token.
+        
+        Each refresh token works once. Presenting one that was already used
+        means it leaked, so every refresh token of the user is revoked.
+        """
+        invalid_token = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+        now = datetime.utcnow()
+        record = db.query(RefreshToken).filter(RefreshToken.token_hash == _token_hash(refresh_token)).first()
+        if not record or record.expires_at <= now:
+            raise invalid_token
+        if record.revoked_at is not None:
+            AuthService.revoke_refresh_tokens(db, record.user_id)
+            db.commit()
+            raise invalid_token
+        
+        # Only one of two simultaneous exchanges of the same token wins
+        claimed = db.query(RefreshToken).filter(
+            RefreshToken.id == record.id, RefreshToken.revoked_at.is_(None)
+        ).update({RefreshToken.revoked_at: now}, synchronize_session=False)
+        user = AuthService.get_user_by_id(db, record.user_id)
+        if not claimed or user is None or not user.is_active:
+            db.commit()
+            raise invalid_token
+        return AuthService.issue_tokens(db, user)
+    
+    @staticmethod
+    def revoke_refresh_token(db: Session, refresh_token: str) -> None:
+        """Revoke one refresh token (logout); unknown tokens are ignored."""
+        db.query(RefreshToken).filter(
+            RefreshToken.token_hash == _token_hash(refresh_token), RefreshToken.revoked_at.is_(None)
+        ).update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+        db.commit()
+    
+    @staticmethod
+    def revoke_refresh_tokens(db: Session, user_id: int) -> None:
+        """Revoke every refresh token of a user, committed by the caller."""
+        db.query(RefreshToken).filter(
+            RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None)
+        ).update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+    
     @staticmethod
     def verify_token(token: str) -> Optional[dict]:
         """Verify and decode a JWT token."""
@@ -59,6 +331,30 @@ class AuthService:
             return None
         return user
     
+    @staticmethod
+    async def authenticate_user_async(db: Session, username: str, password: str) -> Optional[User]:
+        """
+        Authenticate a user without tying up a request thread during bcrypt.
+        
+        The queries run in the request thread pool, the password check on the
+        password hasher. A hash made with another cost factor is replaced.
+        """
+        user = await run_in_threadpool(AuthService.get_user_by_username, db, username)
+        if not user:
+            return None
+        valid, new_hash = await AuthService.verify_and_update_password(password, user.password_hash)
+        if not valid:
+            return None
+        if new_hash:
+            await run_in_threadpool(AuthService._save_password_hash, db, user, new_hash)
+        return user
+    
+    @staticmethod
+    def _save_password_hash(db: Session, user: User, password_hash: str) -> None:
+        user.password_hash = password_hash
+        db.commit()
+        db.refresh(user)
+    
     @staticmethod
     def create_user(db: Session, user_data: UserCreate) -> User:
         """Create a new user."""
@@ -106,6 +402,28 @@ class AuthService:
         """Get user by ID."""
         return db.query(User).filter(User.id == user_id).first()
     
+    @staticmethod
+    def get_token_user(db: Session, user_id: int, token_version: int) -> Optional[User]:
+        """
+        Get the user a token was issued to, from the user cache when possible.
+        
+        Returns None when the user does not exist or the token version is no
+        longer the user's (a revoked token). Inactive users are returned but
+        never cached.
+        """
+        key = (str(db.get_bind().url), user_id, token_version)
+        user = user_cache.get(key)
+        if user is not None:
+            return user
+        
+        user = AuthService.get_user_by_id(db, user_id)
+        if user is None or user.token_version != token_version:
+            return None
+        if user.is_active:
+            user = _detached_copy(user)
+            user_cache.set(key, user)
+        return user
+    
     @staticmethod
     def update_user_password(db: Session, user_id: int, new_password: str) -> User:
         """Update user password."""
@@ -117,8 +435,13 @@ class AuthService:
             )
         
         user.password_hash = AuthService.get_password_hash(new_password)
+        # Tokens issued with the old password stop working
+        user.token_version += 1
+        AuthService.revoke_refresh_tokens(db, user.id)
         db.commit()
+        user_cache.invalidate(user.id)
         db.refresh(user)
+        token_versions.update(db, user)
         return user
     
     @staticmethod
@@ -132,6 +455,10 @@ class AuthService:
             )
         
         user.is_active = False
+        user.token_version += 1
+        AuthService.revoke_refresh_tokens(db, user.id)
         db.commit()
+        user_cache.invalidate(user.id)
         db.refresh(user)
+        token_versions.update(db, user)
         return user
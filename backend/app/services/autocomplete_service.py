@@ -0,0 +1,314 @@
+"""
+In-process autocomplete index for the dashboard quick search.
+
+Student names and parent names, phones and emails are kept in memory per
+database engine, so a keystroke is answered with a binary search and a few
+set intersections instead of a LIKE scan:
+
+- every word-start suffix of an entry ("benali" for "Ahmed Ben Ali") is
+  kept in a sorted list, so prefixes are found with bisect;
+- every trigram maps to the set of entries containing it, so substrings of
+  three characters or more are found by intersecting a few sets.
+
+Entries and terms are compared in the folded form of the search columns
+(normalization.search_key), so "benais" finds "Benaïssa" and "abdel" finds
+"Abd el Kader".
+
+The index is built from the database on first use (or at application
+startup via `warm_up`) and then maintained incrementally: ORM flushes that
+create, update or delete students and parents are recorded on the session
+and applied to the index when the transaction commits, so changes made
+through the services are visible to the next keystroke. Rows written with
+raw SQL are only picked up by `rebuild`.
+"""
+
+import heapq
+import threading
+import weakref
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.database.models import Base, Student, Parent
+from app.database.normalization import fold, search_key
+
+def trigrams(value: str) -> set:
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+# Substring candidates are sorted directly up to this many per requested
+# result; larger sets are filtered while walking the entries in sort order
+SMALL_CANDIDATE_SET = 64
+
+class AutocompleteIndex:
+    """Prefix and trigram index over a set of entries identified by id."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._texts: Dict[int, Tuple[str, ...]] = {}
+        self._keys: Dict[int, set] = {}
+        self._sort_keys: Dict[int, tuple] = {}
+        self._payloads: Dict[int, object] = {}
+        self._prefixes: List[Tuple[str, tuple, int]] = []
+        self._ordered: List[Tuple[tuple, int]] = []
+        self._trigrams: Dict[str, set] = {}
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def add(self, entry_id: int, texts: Tuple[str, ...], sort_key: tuple, payload: object = None) -> None:
+        """Index an entry under the given texts, replacing any previous version."""
+        with self._lock:
+            self.remove(entry_id)
+            for key in self._store(entry_id, texts, sort_key, payload):
+                insort(self._prefixes, key)
+            insort(self._ordered, (sort_key, entry_id))
+
+    def add_many(self, entries) -> None:
+        """
+        Index new entries given as (entry_id, texts, sort_key, payload) tuples.
+
+        Used for the initial load: the prefix list is sorted once at the end
+        rather than kept sorted entry by entry.
+        """
+        with self._lock:
+            for entry_id, texts, sort_key, payload in entries:
+                self.remove(entry_id)
+                self._prefixes.extend(self._store(entry_id, texts, sort_key, payload))
+                self._ordered.append((sort_key, entry_id))
+            self._prefixes.sort()
+            self._ordered.sort()
+
+    def _store(self, entry_id: int, texts: Tuple[str, ...], sort_key: tuple, payload: object) -> list:
+        """Record an entry and its trigrams, returning its prefix list items."""
+        folded = [fold(text) for text in texts]
+        texts = tuple(text.replace(" ", "") for text in folded if text)
+        keys = self._prefix_keys(folded)
+        self._texts[entry_id] = texts
+        self._keys[entry_id] = keys
+        self._sort_keys[entry_id] = sort_key
+        self._payloads[entry_id] = payload
+        for gram in set().union(*(trigrams(text) for text in texts)):
+            self._trigrams.setdefault(gram, set()).add(entry_id)
+        return [(key, sort_key, entry_id) for key in keys]
+
+    def remove(self, entry_id: int) -> None:
+        with self._lock:
+            texts = self._texts.pop(entry_id, None)
+            if texts is None:
+                return
+            sort_key = self._sort_keys.pop(entry_id)
+            del self._payloads[entry_id]
+            for key in self._keys.pop(entry_id):
+                self._discard(self._prefixes, (key, sort_key, entry_id))
+            self._discard(self._ordered, (sort_key, entry_id))
+            for gram in set().union(*(trigrams(text) for text in texts)):
+                ids = self._trigrams.get(gram)
+                if ids is not None:
+                    ids.discard(entry_id)
+                    if not ids:
+                        del self._trigrams[gram]
+
+    def payload(self, entry_id: int):
+        return self._payloads.get(entry_id)
+
+    def search(self, term: str, limit: int = 5) -> List[int]:
+        """
+        Return up to `limit` entry ids matching the term.
+
+        Entries where a word starts with the term come first, in alphabetical
+        order of the matched text (then of their sort key); other entries
+        containing the term follow, ordered by their sort key.
+        """
+        term = search_key(term)
+        if not term:
+            return []
+
+        with self._lock:
+            results = []
+            seen = set()
+            position = bisect_left(self._prefixes, (term,))
+            while position < len(self._prefixes) and len(results) < limit:
+                key, _, entry_id = self._prefixes[position]
+                if not key.startswith(term):
+                    break
+                if entry_id not in seen:
+                    seen.add(entry_id)
+                    results.append(entry_id)
+                position += 1
+
+            if len(results) < limit and len(term) >= 3:
+                postings = sorted((self._trigrams.get(gram, set()) for gram in trigrams(term)), key=len)
+                candidates = postings[0].intersection(*postings[1:]) - seen
+                texts = self._texts
+                wanted = limit - len(results)
+                if len(candidates) <= SMALL_CANDIDATE_SET * wanted:
+                    matches = (
+                        entry_id for entry_id in candidates
+                        if any(term in text for text in texts[entry_id])
+                    )
+                    results.extend(heapq.nsmallest(wanted, matches, key=self._sort_keys.__getitem__))
+                else:
+                    # Common substrings: walk entries in sort order until enough
+                    # of them match, which takes about len/len(candidates) steps
+                    # per result instead of checking every candidate
+                    for _, entry_id in self._ordered:
+                        if entry_id in candidates and any(term in text for text in texts[entry_id]):
+                            results.append(entry_id)
+                            if len(results) == limit:
+                                break
+
+            return results
+
+    @staticmethod
+    def _discard(items: list, item: tuple) -> None:
+        position = bisect_left(items, item)
+        if position < len(items) and items[position] == item:
+            del items[position]
+
+    @staticmethod
+    def _prefix_keys(folded_texts: List[str]) -> set:
+        """Separator-free suffixes of each text starting at a word boundary."""
+        keys = set()
+        for text in folded_texts:
+            words = text.split(" ")
+            for start in range(len(words)):
+                keys.add("".join(words[start:]))
+        keys.discard("")
+        return keys
+
+class QuickSearchIndexes:
+    """The student and parent indexes of one database."""
+
+    def __init__(self):
+        self.students = AutocompleteIndex()
+        self.parents = AutocompleteIndex()
+
+    @staticmethod
+    def student_entry(row) -> tuple:
+        return (
+            row.id,
+            (f"{row.first_name} {row.last_name}", row.last_name),
+            (search_key(row.first_name), search_key(row.last_name), row.id),
+            None,
+        )
+
+    @staticmethod
+    def parent_entry(row) -> tuple:
+        return (
+            row.id,
+            (f"{row.first_name} {row.last_name}", row.last_name, row.phone, row.mobile, row.email),
+            (search_key(row.first_name), search_key(row.last_name), row.id),
+            {
+                "id": row.id,
+                "first_name": row.first_name,
+                "last_name": row.last_name,
+                "phone": row.phone,
+                "email": row.email,
+                "address": row.address,
+                "emergency_contact": row.mobile  # Map mobile to emergency_contact for frontend
+            },
+        )
+
+    def load(self, connection: Connection) -> None:
+        self.students.add_many(self.student_entry(row) for row in connection.execute(select(*STUDENT_COLUMNS)))
+        self.parents.add_many(self.parent_entry(row) for row in connection.execute(select(*PARENT_COLUMNS)))
+
+STUDENT_COLUMNS = (Student.id, Student.first_name, Student.last_name)
+PARENT_COLUMNS = (
+    Parent.id, Parent.first_name, Parent.last_name, Parent.phone,
+    Parent.mobile, Parent.email, Parent.address
+)
+
+_indexes: "weakref.WeakKeyDictionary[Engine, QuickSearchIndexes]" = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+def get_indexes(engine: Engine) -> QuickSearchIndexes:
+    """Return the indexes of a database, building them on first use."""
+    indexes = _indexes.get(engine)
+    if indexes is None:
+        with _indexes_lock:
+            indexes = _indexes.get(engine)
+            if indexes is None:
+                indexes = QuickSearchIndexes()
+                with engine.connect() as connection:
+                    indexes.load(connection)
+                _indexes[engine] = indexes
+    return indexes
+
+def warm_up(engine: Engine) -> QuickSearchIndexes:
+    """Build the indexes of a database ahead of the first search."""
+    return get_indexes(engine)
+
+def rebuild(engine: Engine) -> QuickSearchIndexes:
+    """Discard and rebuild the indexes of a database."""
+    with _indexes_lock:
+        _indexes.pop(engine, None)
+    return get_indexes(engine)
+
+def search_students(db: Session, term: str, limit: int = 5) -> List[int]:
+    """Ids of the students matching a quick-search term, best matches first."""
+    return get_indexes(db.get_bind()).students.search(term, limit)
+
+def search_parents(db: Session, term: str, limit: int = 5) -> List[dict]:
+    """Parents matching a quick-search term, in the shape the frontend expects."""
+    index = get_indexes(db.get_bind()).parents
+    return [index.payload(parent_id) for parent_id in index.search(term, limit)]
+
+# Incremental maintenance
+
+_PENDING_KEY = "autocomplete_changes"
+
+@event.listens_for(Session, "after_flush")
+def _record_changes(session, flush_context):
+    engine = session.get_bind()
+    if engine not in _indexes:
+        return
+
+    changed = {Student: set(), Parent: set()}
+    deleted = {Student: set(), Parent: set()}
+    for obj in list(session.new) + list(session.dirty):
+        if type(obj) in changed:
+            changed[type(obj)].add(obj.id)
+    for obj in session.deleted:
+        if type(obj) in deleted:
+            deleted[type(obj)].add(inspect(obj).identity[0])
+    if not any(changed.values()) and not any(deleted.values()):
+        return
+
+    # Read the rows back within the flush, they are applied on commit
+    connection = session.connection()
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for model, kind, columns in ((Student, "student", STUDENT_COLUMNS), (Parent, "parent", PARENT_COLUMNS)):
+        rows = []
+        if changed[model]:
+            rows = connection.execute(select(*columns).where(model.id.in_(changed[model]))).all()
+        if rows or deleted[model]:
+            pending.append((kind, rows, deleted[model]))
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    indexes = _indexes.get(session.get_bind())
+    if indexes is None:
+        return
+    for kind, rows, deleted_ids in pending:
+        index = indexes.students if kind == "student" else indexes.parents
+        entry = indexes.student_entry if kind == "student" else indexes.parent_entry
+        for row in rows:
+            index.add(*entry(row))
+        for entry_id in deleted_ids:
+            index.remove(entry_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(_PENDING_KEY, None)
+
+@event.listens_for(Base.metadata, "after_drop")
+def _forget_dropped_database(target, connection, **kw):
+    with _indexes_lock:
+        _indexes.pop(connection.engine, None)
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, select, update
+from typing import List
 from app.database.models import Class, Student, RegistrationStatus
 from app.schemas.class_schema import ClassCreate, ClassUpdate
 from fastapi import HTTPException
@@ -49,7 +50,7 @@ def get_classes(db: Session, academic_year: str = None, level: str = None, skip:
     
     classes = query.offset(skip).limit(limit).all()
     
-    return [_get_class_with_enrollment(db, class_obj) for class_obj in classes]
+    return get_classes_with_enrollment(db, classes)
 
 def update_class(db: Session, class_id: int, class_update: ClassUpdate):
     """Update a class"""
@@ -59,12 +60,7 @@ def update_class(db: Session, class_id: int, class_update: ClassUpdate):
     
     # Check if there are confirmed students and capacity is being reduced
     if class_update.capacity is not None and class_update.capacity < db_class.capacity:
-        confirmed_students = db.query(Student).filter(
-            and_(
-                Student.class_id == class_id,
-                Student.registration_status == RegistrationStatus.CONFIRMED
-            )
-        ).count()
+        confirmed_students = db_class.enrolled_count
         
         if confirmed_students > class_update.capacity:
             raise HTTPException(
@@ -101,15 +97,50 @@ def delete_class(db: Session, class_id: int):
     
     return {"message": f"Class '{db_class.name}' deleted successfully"}
 
+def get_classes_with_enrollment(db: Session, classes: List[Class]) -> List[dict]:
+    """
+    Add enrollment data to a list of classes.
+    
+    Confirmed students are counted in the enrolled_count column, which
+    triggers keep up to date, so listings need no count query at all.
+    """
+    return [_class_with_enrollment(class_obj, class_obj.enrolled_count) for class_obj in classes]
+
+def allocate_seat(db: Session, student_id: int) -> bool:
+    """
+    Confirm a student if their class still has a free seat.
+    
+    The capacity check and the confirmation are a single conditional UPDATE
+    that reads the class's enrolled_count, and the trigger bumping that
+    counter runs inside the same statement, so concurrent confirmations for
+    the same class can never overbook it. Nothing is committed here.
+    
+    Returns:
+        True when the student was confirmed, False when the class is full or
+        the student was already confirmed
+    """
+    seat_available = select(Class.id).where(
+        Class.id == Student.class_id,
+        Class.enrolled_count < Class.capacity
+    ).exists()
+    result = db.execute(
+        update(Student)
+        .where(
+            Student.id == student_id,
+            Student.registration_status != RegistrationStatus.CONFIRMED,
+            seat_available
+        )
+        .values(registration_status=RegistrationStatus.CONFIRMED)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
 def _get_class_with_enrollment(db: Session, class_obj: Class):
     """Helper function to add enrollment data to class object"""
-    confirmed_students = db.query(Student).filter(
-        and_(
-            Student.class_id == class_obj.id,
-            Student.registration_status == RegistrationStatus.CONFIRMED
-        )
-    ).count()
-    
+    return _class_with_enrollment(class_obj, class_obj.enrolled_count)
+
+def _class_with_enrollment(class_obj: Class, confirmed_students: int):
+    """Convert a class to a dict carrying its enrollment data"""
     available_spots = class_obj.capacity - confirmed_students
     
     # Convert to dict and add enrollment data
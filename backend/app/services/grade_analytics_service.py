@@ -0,0 +1,241 @@
+"""
+Class rankings and grade distributions computed with NumPy.
+
+The grades of a class (optionally one academic year and period) are loaded
+with one query into parallel arrays, normalized by their max_grade to
+percentages and weighted by grade type. Averages, ranks, percentiles and
+histograms are then array operations (bincount, sort, searchsorted) rather
+than Python loops over Grade objects.
+"""
+
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy import select, case, type_coerce, String
+from typing import Dict, Optional
+
+from ..database.models import Grade, Student, Subject, GradeType
+from ..schemas.academic import (
+    AcademicPeriodEnum, ClassRankings, StudentRanking, GradeDistribution, SubjectDistribution, HistogramBin
+)
+from .academic_service import ACADEMIC_PERIODS
+
+# Weight of each grade type in a weighted average, see parse_type_weights
+DEFAULT_TYPE_WEIGHTS = {
+    GradeType.QUIZ: 1.0,
+    GradeType.TEST: 2.0,
+    GradeType.EXAM: 3.0,
+    GradeType.HOMEWORK: 1.0,
+    GradeType.PROJECT: 2.0,
+    GradeType.PARTICIPATION: 0.5,
+}
+GRADE_TYPE_INDEX = {grade_type: index for index, grade_type in enumerate(GradeType)}
+MAX_HISTOGRAM_BINS = 100
+
+def parse_type_weights(text: Optional[str]) -> Dict[GradeType, float]:
+    """
+    Parse "exam:4,quiz:0.5" into type weights; unlisted types keep their default.
+
+    Raises:
+        ValueError: on an unknown grade type or a negative weight
+    """
+    weights = dict(DEFAULT_TYPE_WEIGHTS)
+    if not text:
+        return weights
+
+    types = {grade_type.value: grade_type for grade_type in GradeType}
+    for item in text.split(","):
+        name, _, value = item.partition(":")
+        name = name.strip()
+        if name not in types:
+            raise ValueError(f"Unknown grade type '{name}' in weights")
+        try:
+            weight = float(value)
+        except ValueError:
+            raise ValueError(f"Invalid weight '{value}' for {name}")
+        if not weight >= 0:
+            raise ValueError(f"The weight of {name} cannot be negative")
+        weights[types[name]] = weight
+    return weights
+
+def _load_grades(
+    db: Session,
+    class_id: int,
+    academic_year: Optional[str],
+    academic_period: Optional[AcademicPeriodEnum]
+):
+    """One query for the class's grades, as (student_id, subject_id, type index, percentage) arrays."""
+    # Plain numeric columns only (the type as its index, the percentage
+    # computed by SQLite) so rows need no per-value conversion
+    type_index = case(
+        {grade_type.name: index for grade_type, index in GRADE_TYPE_INDEX.items()},
+        value=type_coerce(Grade.grade_type, String)
+    )
+    query = select(
+        Grade.student_id, Grade.subject_id, type_index, Grade.grade_value * 100.0 / Grade.max_grade
+    ).join(Student, Student.id == Grade.student_id).where(Student.class_id == class_id)
+    if academic_year:
+        query = query.where(Grade.academic_year == academic_year)
+    if academic_period:
+        query = query.where(Grade.academic_period == ACADEMIC_PERIODS[academic_period.value])
+
+    # Core execution, the ORM would build an entity row per grade
+    rows = db.connection().execute(query).all()
+    if not rows:
+        return None
+
+    student_ids, subject_ids, grade_types, percentages = zip(*rows)
+    return (
+        np.array(student_ids, dtype=np.int64),
+        np.array(subject_ids, dtype=np.int64),
+        np.array(grade_types, dtype=np.int64),
+        np.array(percentages, dtype=np.float64)
+    )
+
+def _grouped_means(groups: np.ndarray, values: np.ndarray, weights: np.ndarray, size: int) -> np.ndarray:
+    """Weighted mean of values per group index, NaN for groups with no weight."""
+    totals = np.bincount(groups, weights=values * weights, minlength=size)
+    weight_sums = np.bincount(groups, weights=weights, minlength=size)
+    means = np.full(size, np.nan)
+    np.divide(totals, weight_sums, out=means, where=weight_sums > 0)
+    return means
+
+def _round(value) -> Optional[float]:
+    return None if value is None or np.isnan(value) else round(float(value), 2)
+
+class GradeAnalyticsService:
+    @staticmethod
+    def get_class_rankings(
+        db: Session,
+        class_id: int,
+        academic_year: Optional[str] = None,
+        academic_period: Optional[AcademicPeriodEnum] = None,
+        type_weights: Optional[Dict[GradeType, float]] = None
+    ) -> ClassRankings:
+        """
+        Rank the students of a class by their weighted average percentage.
+
+        Each grade counts with the weight of its type. Ties share a rank
+        (1, 2, 2, 4) and the percentile is the share of ranked students
+        below, counting ties as half. Students whose grades all weigh 0 are
+        listed last, unranked.
+        """
+        weights = type_weights or DEFAULT_TYPE_WEIGHTS
+        result = ClassRankings(
+            class_id=class_id,
+            academic_year=academic_year,
+            academic_period=academic_period,
+            weights={grade_type.value: weight for grade_type, weight in weights.items()},
+            students=[]
+        )
+        grades = _load_grades(db, class_id, academic_year, academic_period)
+        if grades is None:
+            return result
+        student_ids, subject_ids, grade_types, percentages = grades
+
+        students, student_index = np.unique(student_ids, return_inverse=True)
+        subjects, subject_index = np.unique(subject_ids, return_inverse=True)
+        grade_weights = np.array([weights.get(grade_type, 0.0) for grade_type in GradeType])[grade_types]
+
+        # Rounded first, so students shown with the same average share a rank
+        averages = np.round(_grouped_means(student_index, percentages, grade_weights, len(students)), 2)
+        subject_averages = _grouped_means(
+            student_index * len(subjects) + subject_index, percentages, grade_weights, len(students) * len(subjects)
+        ).reshape(len(students), len(subjects))
+        counts = np.bincount(student_index, minlength=len(students))
+
+        ranked = ~np.isnan(averages)
+        ordered = np.sort(averages[ranked])
+        below = np.searchsorted(ordered, averages, side="left")
+        not_above = np.searchsorted(ordered, averages, side="right")
+        ranks = len(ordered) - not_above + 1
+        percentiles = (below + (not_above - below) / 2) / max(len(ordered), 1) * 100
+
+        names = {
+            row.id: row for row in db.query(Student.id, Student.first_name, Student.last_name).filter(
+                Student.id.in_(students.tolist())
+            )
+        }
+        order = np.lexsort((students, np.where(ranked, -np.nan_to_num(averages), np.inf)))
+        for i in order.tolist():
+            student = names[int(students[i])]
+            result.students.append(StudentRanking(
+                student_id=student.id,
+                first_name=student.first_name,
+                last_name=student.last_name,
+                rank=int(ranks[i]) if ranked[i] else None,
+                percentile=_round(percentiles[i]) if ranked[i] else None,
+                weighted_average=_round(averages[i]),
+                total_assessments=int(counts[i]),
+                subject_averages={
+                    int(subject_id): _round(average)
+                    for subject_id, average in zip(subjects.tolist(), subject_averages[i])
+                    if not np.isnan(average)
+                }
+            ))
+
+        if len(ordered):
+            result.class_average = _round(ordered.mean())
+            result.median = _round(np.median(ordered))
+        return result
+
+    @staticmethod
+    def get_grade_distribution(
+        db: Session,
+        class_id: int,
+        academic_year: Optional[str] = None,
+        academic_period: Optional[AcademicPeriodEnum] = None,
+        bins: int = 10
+    ) -> GradeDistribution:
+        """
+        Get the distribution of a class's grades (as percentages) per subject.
+
+        The histogram splits 0-100% into `bins` equal bins; the last one
+        includes 100% and grades above the maximum.
+        """
+        if not 1 <= bins <= MAX_HISTOGRAM_BINS:
+            raise ValueError(f"bins must be between 1 and {MAX_HISTOGRAM_BINS}")
+
+        result = GradeDistribution(
+            class_id=class_id,
+            academic_year=academic_year,
+            academic_period=academic_period,
+            bins=bins,
+            subjects=[]
+        )
+        grades = _load_grades(db, class_id, academic_year, academic_period)
+        if grades is None:
+            return result
+        _, subject_ids, _, percentages = grades
+
+        subjects, subject_index = np.unique(subject_ids, return_inverse=True)
+        bin_index = np.clip((percentages * bins / 100).astype(np.int64), 0, bins - 1)
+        histograms = np.bincount(
+            subject_index * bins + bin_index, minlength=len(subjects) * bins
+        ).reshape(len(subjects), bins)
+
+        # Sorted by subject then value, each subject's grades are one slice
+        order = np.lexsort((percentages, subject_index))
+        bounds = np.searchsorted(subject_index[order], np.arange(len(subjects) + 1))
+        edges = np.linspace(0, 100, bins + 1)
+
+        names = dict(db.query(Subject.id, Subject.name).filter(Subject.id.in_(subjects.tolist())).all())
+        for i, subject_id in enumerate(subjects.tolist()):
+            values = percentages[order[bounds[i]:bounds[i + 1]]]
+            p25, median, p75 = np.percentile(values, [25, 50, 75])
+            result.subjects.append(SubjectDistribution(
+                subject_id=subject_id,
+                subject_name=names.get(subject_id, ""),
+                total_assessments=len(values),
+                mean=_round(values.mean()),
+                median=_round(median),
+                std=_round(values.std()),
+                lowest=_round(values[0]),
+                highest=_round(values[-1]),
+                p25=_round(p25),
+                p75=_round(p75),
+                histogram=[
+                    HistogramBin(lower=_round(edges[b]), upper=_round(edges[b + 1]), count=int(histograms[i, b]))
+                    for b in range(bins)
+                ]
+            ))
+        return result
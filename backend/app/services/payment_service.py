@@ -2,12 +2,18 @@ from app.database.models import Payment, PaymentType
 from datetime import datetime
 from fastapi import HTTPException
 
+from app.services.receipt_service import allocate_receipt_number
+
 def make_payment(db, payment):
     payment_data = payment.model_dump()
     # Convert string payment_type to enum
     payment_data['payment_type'] = PaymentType(payment_data['payment_type'])
     
-    db_payment = Payment(**payment_data, payment_date=datetime.now())
+    payment_date = datetime.now()
+    # Numbered before the insert, a new block is reserved on its own connection
+    db_payment = Payment(
+        **payment_data, payment_date=payment_date, receipt_number=allocate_receipt_number(db, payment_date)
+    )
     db.add(db_payment)
     db.commit()
     db.refresh(db_payment)
@@ -0,0 +1,181 @@
+"""
+Payment receipts: receipt numbers and cached PDF receipts.
+
+Receipt numbers carry the year of the payment ("2024-000123") and come from
+one counter row per year in receipt_sequences. A process does not touch that
+row for every payment: it reserves a block of RECEIPT_BLOCK_SIZE numbers in
+one short transaction of its own and hands them out from memory, so desks
+recording payments at the same time do not queue on the counter. Numbers
+are unique but not gapless: the unused part of a block is lost when the
+process stops, and two processes interleave their blocks.
+
+A payment never changes once recorded, so its receipt is rendered once and
+cached on disk by payment ID; reprints are served as static bytes.
+"""
+
+import io
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from weakref import WeakKeyDictionary
+from xml.sax.saxutils import escape
+
+from fastapi import HTTPException
+from sqlalchemy.engine import Engine
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..database.session import backend_dir
+from ..database.models import Payment, PaymentType, ReceiptSequence, Student, Class, User
+from .report_card_service import write_atomically
+
+RECEIPT_BLOCK_SIZE = int(os.getenv("RECEIPT_BLOCK_SIZE", "50"))
+RECEIPT_CACHE_DIR = os.getenv("RECEIPT_CACHE_DIR", os.path.join(backend_dir, "cache", "receipts"))
+
+PAYMENT_TYPE_LABELS = {
+    PaymentType.INSCRIPTION: "Inscription fee",
+    PaymentType.QUARTERLY: "Quarterly fee",
+}
+
+def receipt_prefix(when: datetime) -> str:
+    return str(when.year)
+
+def format_receipt_number(prefix: str, number: int) -> str:
+    return f"{prefix}-{number:06d}"
+
+class ReceiptNumberAllocator:
+    """Hands out receipt numbers from blocks reserved in the database"""
+    def __init__(self, engine: Engine, block_size: int = RECEIPT_BLOCK_SIZE):
+        if block_size < 1:
+            raise ValueError("The block size must be at least 1")
+        self.engine = engine
+        self.block_size = block_size
+        # Per prefix, the next number to hand out and the end of its block
+        self.blocks: Dict[str, Tuple[int, int]] = {}
+        self.lock = threading.Lock()
+
+    def reserve_block(self, prefix: str) -> Tuple[int, int]:
+        """Move the prefix's counter a block ahead; returns the block as (first, end)."""
+        table = ReceiptSequence.__table__
+        statement = sqlite_insert(table).values(prefix=prefix, next_value=1 + self.block_size)
+        statement = statement.on_conflict_do_update(
+            index_elements=['prefix'],
+            set_={'next_value': table.c.next_value + self.block_size}
+        ).returning(table.c.next_value)
+        # Its own transaction, committed at once: the counter row is locked
+        # for one statement, never for the rest of a payment
+        with self.engine.begin() as connection:
+            end = connection.execute(statement).scalar_one()
+        return end - self.block_size, end
+
+    def allocate(self, prefix: str) -> int:
+        with self.lock:
+            number, end = self.blocks.get(prefix, (0, 0))
+            if number >= end:
+                number, end = self.reserve_block(prefix)
+            self.blocks[prefix] = (number + 1, end)
+            return number
+
+# One allocator per engine, shared by the threads of the process
+_allocators: "WeakKeyDictionary[Engine, ReceiptNumberAllocator]" = WeakKeyDictionary()
+_allocators_lock = threading.Lock()
+
+def get_allocator(engine: Engine) -> ReceiptNumberAllocator:
+    with _allocators_lock:
+        allocator = _allocators.get(engine)
+        if allocator is None:
+            allocator = _allocators[engine] = ReceiptNumberAllocator(engine)
+        return allocator
+
+def allocate_receipt_number(db: Session, when: datetime) -> str:
+    """
+    Next receipt number for a payment made at `when`.
+
+    A new block is reserved on another connection, so call this before
+    writing anything in the session: SQLite has a single writer.
+    """
+    prefix = receipt_prefix(when)
+    return format_receipt_number(prefix, get_allocator(db.get_bind()).allocate(prefix))
+
+def render_receipt(receipt: dict) -> bytes:
+    """Render one receipt (see _receipt_data) to PDF bytes."""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A5
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    buffer = io.BytesIO()
+    # Invariant output: the same payment always renders to the same bytes
+    document = SimpleDocTemplate(
+        buffer, pagesize=A5, invariant=1, leftMargin=1.5 * cm, rightMargin=1.5 * cm,
+        title=f"Receipt {receipt['receipt_number']}"
+    )
+
+    rows = [
+        ["Receipt", receipt["receipt_number"]],
+        ["Date", receipt["payment_date"]],
+        ["Student", receipt["student_name"]],
+        ["Class", receipt["class_name"]],
+        ["Payment", receipt["payment_type"]],
+        ["Method", receipt["payment_method"]],
+        ["Amount", receipt["amount"]],
+    ]
+    if receipt["processed_by"]:
+        rows.append(["Received by", receipt["processed_by"]])
+    table = Table(rows, colWidths=[3.5 * cm, 8 * cm])
+    table.setStyle(TableStyle([
+        ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
+        ("FONTNAME", (1, 6), (1, 6), "Helvetica-Bold"),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+        ("BACKGROUND", (0, 0), (0, -1), colors.HexColor("#e8eef4")),
+    ]))
+
+    story = [Paragraph("Payment receipt", styles["Title"]), Spacer(1, 0.4 * cm), table]
+    if receipt["notes"]:
+        story += [Spacer(1, 0.4 * cm), Paragraph(f"<b>Notes:</b> {escape(receipt['notes'])}", styles["Normal"])]
+    document.build(story)
+    return buffer.getvalue()
+
+def _receipt_data(db: Session, payment: Payment) -> dict:
+    student = db.query(Student.first_name, Student.last_name, Student.academic_year, Class.name).outerjoin(
+        Class, Class.id == Student.class_id
+    ).filter(Student.id == payment.student_id).first()
+    processed_by = None
+    if payment.processed_by:
+        user = db.query(User.first_name, User.last_name).filter(User.id == payment.processed_by).first()
+        processed_by = f"{user.first_name} {user.last_name}" if user else None
+    return {
+        "receipt_number": payment.receipt_number,
+        "payment_date": payment.payment_date.strftime("%d/%m/%Y %H:%M"),
+        "student_name": f"{student.first_name} {student.last_name}" if student else f"Student #{payment.student_id}",
+        "class_name": f"{student.name or '-'} ({student.academic_year})" if student else "-",
+        "payment_type": PAYMENT_TYPE_LABELS[payment.payment_type],
+        "payment_method": payment.payment_method,
+        "amount": f"{payment.amount:.2f}",
+        "processed_by": processed_by,
+        "notes": payment.notes,
+    }
+
+def get_receipt(db: Session, payment_id: int, cache_dir: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Render (or reuse) the PDF receipt of a payment; returns (filename, path).
+
+    Payments recorded before receipt numbers existed get one on their first print.
+    """
+    payment = db.query(Payment).filter(Payment.id == payment_id).first()
+    if not payment:
+        raise HTTPException(status_code=404, detail="Payment not found")
+    if not payment.receipt_number:
+        payment.receipt_number = allocate_receipt_number(db, payment.payment_date)
+        db.commit()
+
+    cache_dir = cache_dir or RECEIPT_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    # The receipt number guards against a reused ID after the database is recreated
+    path = os.path.join(cache_dir, f"{payment.id}_{payment.receipt_number}.pdf")
+    if not os.path.exists(path):
+        write_atomically(path, render_receipt(_receipt_data(db, payment)))
+    return f"receipt_{payment.receipt_number}.pdf", path
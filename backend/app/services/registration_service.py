@@ -1,7 +1,7 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
 from app.database.models import Student, Parent, Class, RegistrationStatus
 from app.schemas.registration import RegistrationCreate
+from app.services.class_service import allocate_seat
 from datetime import datetime
 from fastapi import HTTPException
 
@@ -13,15 +13,9 @@ def register_student(db: Session, registration: RegistrationCreate):
     if not class_obj:
         raise HTTPException(status_code=404, detail="Class not found")
     
-    # Check class capacity
-    current_students = db.query(Student).filter(
-        and_(
-            Student.class_id == registration.student.class_id,
-            Student.registration_status == RegistrationStatus.CONFIRMED
-        )
-    ).count()
-    
-    if current_students >= class_obj.capacity:
+    # Check class capacity. Registrations stay pending and take no seat, the
+    # seat itself is allocated atomically on confirmation
+    if class_obj.enrolled_count >= class_obj.capacity:
         raise HTTPException(status_code=400, detail="Class is full")
     
     # Handle parent creation or lookup
@@ -94,19 +88,14 @@ def confirm_registration(db: Session, student_id: int):
     if student.registration_status == RegistrationStatus.CONFIRMED:
         raise HTTPException(status_code=400, detail="Registration already confirmed")
     
-    # Check class capacity again
-    class_obj = db.query(Class).filter(Class.id == student.class_id).first()
-    current_students = db.query(Student).filter(
-        and_(
-            Student.class_id == student.class_id,
-            Student.registration_status == RegistrationStatus.CONFIRMED
-        )
-    ).count()
-    
-    if current_students >= class_obj.capacity:
+    # Take a seat in the class, checking capacity in the same statement
+    if not allocate_seat(db, student.id):
+        db.rollback()
+        db.refresh(student)
+        if student.registration_status == RegistrationStatus.CONFIRMED:
+            raise HTTPException(status_code=400, detail="Registration already confirmed")
         raise HTTPException(status_code=400, detail="Class is now full")
     
-    student.registration_status = RegistrationStatus.CONFIRMED
     db.commit()
     db.refresh(student)
     
@@ -118,28 +107,22 @@ def confirm_registration(db: Session, student_id: int):
 
 def get_available_classes(db: Session, academic_year: str):
     """Get classes with available spots for registration"""
-    classes = db.query(Class).filter(Class.academic_year == academic_year).all()
+    classes = db.query(Class).filter(
+        Class.academic_year == academic_year,
+        Class.enrolled_count < Class.capacity
+    ).all()
     
     available_classes = []
     for class_obj in classes:
-        confirmed_students = db.query(Student).filter(
-            and_(
-                Student.class_id == class_obj.id,
-                Student.registration_status == RegistrationStatus.CONFIRMED
-            )
-        ).count()
-        
-        available_spots = class_obj.capacity - confirmed_students
-        
-        if available_spots > 0:
-            available_classes.append({
-                "id": class_obj.id,
-                "name": class_obj.name,
-                "level": class_obj.level,
-                "time_slot": class_obj.time_slot,
-                "capacity": class_obj.capacity,
-                "enrolled_students": confirmed_students,
-                "available_spots": available_spots
-            })
+        confirmed_students = class_obj.enrolled_count
+        available_classes.append({
+            "id": class_obj.id,
+            "name": class_obj.name,
+            "level": class_obj.level,
+            "time_slot": class_obj.time_slot,
+            "capacity": class_obj.capacity,
+            "enrolled_students": confirmed_students,
+            "available_spots": class_obj.capacity - confirmed_students
+        })
     
     return available_classes
@@ -0,0 +1,362 @@
+"""
+Term report cards: PDF rendering, a content-addressed cache and zip bundles.
+
+A class's report card data (grades per subject, teacher comments and
+attendance) is gathered with a few grouped queries. Each card is cached on
+disk under the SHA-256 of its data, so a student whose grades, comments and
+attendance did not change since the last run is served from the cache, and
+only new or changed cards are rendered, spread over a process pool since
+reportlab rendering is CPU bound. Bundles are streamed as zip files built
+one cached PDF at a time.
+
+Nothing in the server evicts from the cache: a card whose data changed is
+stored under a new key and its old PDF stays behind. purge_cache removes the
+PDFs rendered more than REPORT_CARD_CACHE_MAX_AGE_DAYS ago (the term-end job
+runs it); deleting the whole directory is always safe, cards are rendered
+again on demand.
+"""
+
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case
+
+from ..database.session import backend_dir
+from ..database.models import Attendance, Grade, Subject, Class, Student, AttendanceStatus
+from ..schemas.academic import (
+    AcademicPeriodEnum, ReportCardData, ReportCardSubject, AttendanceStats
+)
+from .academic_service import GradeService, ACADEMIC_PERIODS
+
+REPORT_CARD_CACHE_DIR = os.getenv("REPORT_CARD_CACHE_DIR", os.path.join(backend_dir, "cache", "report_cards"))
+REPORT_CARD_CACHE_MAX_AGE_DAYS = int(os.getenv("REPORT_CARD_CACHE_MAX_AGE_DAYS", "365"))
+REPORT_CARD_WORKERS = int(os.getenv("REPORT_CARD_WORKERS", str(os.cpu_count() or 1)))
+
+# Part of every cache key: bump it when the layout changes so cached cards are re-rendered
+RENDERER_VERSION = "1"
+
+PERIOD_LABELS = {
+    AcademicPeriodEnum.FIRST_TERM: "1st term",
+    AcademicPeriodEnum.SECOND_TERM: "2nd term",
+    AcademicPeriodEnum.THIRD_TERM: "3rd term",
+    AcademicPeriodEnum.FIRST_SEMESTER: "1st semester",
+    AcademicPeriodEnum.SECOND_SEMESTER: "2nd semester",
+}
+
+def render_report_card(card: dict) -> bytes:
+    """
+    Render one report card (ReportCardData as a dict) to PDF bytes.
+
+    A module-level function of plain data so it can run in a worker process.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+    card = ReportCardData.model_validate(card)
+    styles = getSampleStyleSheet()
+    buffer = io.BytesIO()
+    # Invariant output: the same card always renders to the same bytes
+    document = SimpleDocTemplate(
+        buffer, pagesize=A4, invariant=1, leftMargin=2 * cm, rightMargin=2 * cm,
+        title=f"Report card - {card.first_name} {card.last_name}"
+    )
+
+    # Paragraphs parse markup, names and comments are escaped
+    period = PERIOD_LABELS[card.academic_period] if card.academic_period else "Whole year"
+    story = [
+        Paragraph("Report card", styles["Title"]),
+        Paragraph(f"<b>{escape(card.first_name)} {escape(card.last_name)}</b> - {escape(card.class_name)}", styles["Heading2"]),
+        Paragraph(escape(f"{period} {card.academic_year or ''}".strip()), styles["Normal"]),
+        Spacer(1, 0.6 * cm),
+    ]
+
+    rows = [["Subject", "Period", "Assessments", "Average", "%"]]
+    comments = []
+    for subject in card.subjects:
+        rows.append([
+            subject.subject_name,
+            PERIOD_LABELS[subject.academic_period],
+            str(subject.total_assessments),
+            f"{subject.average_grade:.2f}",
+            f"{subject.average_percentage:.1f}"
+        ])
+        comments.extend(f"<b>{escape(subject.subject_name)}:</b> {escape(comment)}" for comment in subject.comments)
+    if len(rows) == 1:
+        rows.append(["No grades recorded", "", "", "", ""])
+    table = Table(rows, colWidths=[5.5 * cm, 3 * cm, 2.5 * cm, 2.5 * cm, 2 * cm], repeatRows=1)
+    table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#2f5d8a")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+        ("ALIGN", (2, 1), (-1, -1), "RIGHT"),
+    ]))
+    story.append(table)
+    if card.average_percentage is not None:
+        story.append(Spacer(1, 0.3 * cm))
+        story.append(Paragraph(f"<b>Overall average:</b> {card.average_percentage:.1f}%", styles["Normal"]))
+
+    attendance = card.attendance
+    story += [
+        Spacer(1, 0.6 * cm),
+        Paragraph("Attendance", styles["Heading3"]),
+        Paragraph(
+            f"{attendance.total_days} days recorded: {attendance.present_days} present, "
+            f"{attendance.late_days} late, {attendance.absent_days} absent, "
+            f"{attendance.excused_days} excused ({attendance.attendance_rate:.1f}% attendance)",
+            styles["Normal"]
+        ),
+    ]
+    if comments:
+        story.append(Spacer(1, 0.6 * cm))
+        story.append(Paragraph("Teacher comments", styles["Heading3"]))
+        story.extend(Paragraph(comment, styles["Normal"]) for comment in comments)
+
+    document.build(story)
+    return buffer.getvalue()
+
+def cache_key(card: ReportCardData) -> str:
+    """SHA-256 of the renderer version and the card data."""
+    payload = json.dumps(card.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{RENDERER_VERSION}:{payload}".encode()).hexdigest()
+
+def card_filename(card: ReportCardData) -> str:
+    return f"{card.last_name}_{card.first_name}_{card.student_id}.pdf".replace(" ", "_").replace("/", "-")
+
+def write_atomically(path: str, content: bytes) -> None:
+    # Another job rendering the same card writes identical bytes, the rename just wins
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(handle, "wb") as file:
+        file.write(content)
+    os.replace(temporary, path)
+
+def purge_cache(cache_dir: Optional[str] = None, max_age_days: Optional[int] = None) -> int:
+    """Delete the cached cards rendered more than max_age_days ago; returns how many."""
+    cache_dir = cache_dir or REPORT_CARD_CACHE_DIR
+    max_age_days = REPORT_CARD_CACHE_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    if not os.path.isdir(cache_dir):
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    purged = 0
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(".pdf") and entry.is_file() and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+            purged += 1
+    return purged
+
+class _ZipStream:
+    """Write-only file object for zipfile that hands out what was written so far"""
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.offset
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def zip_stream(files: Iterable[Tuple[str, str]]) -> Iterator[bytes]:
+    """
+    Stream a zip of (name in archive, path on disk) files, one file in memory at a time.
+
+    PDFs are already compressed, so entries are stored as is.
+    """
+    output = _ZipStream()
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_STORED) as archive:
+        for name, path in files:
+            with open(path, "rb") as file:
+                archive.writestr(name, file.read())
+            yield output.take()
+    yield output.take()
+
+class ReportCardService:
+    @staticmethod
+    def get_report_card_data(
+        db: Session,
+        class_id: int,
+        academic_year: Optional[str] = None,
+        academic_period: Optional[AcademicPeriodEnum] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        student_id: Optional[int] = None
+    ) -> List[ReportCardData]:
+        """
+        Gather the report card data of every student of a class, or of one
+        student of it when student_id is given.
+
+        Grades per subject come from GradeService.get_class_grade_statistics,
+        teacher comments and attendance from one grouped query each.
+        Attendance is counted between start_date and end_date.
+        """
+        class_obj = db.query(Class).filter(Class.id == class_id).first()
+        if not class_obj:
+            raise ValueError("Class not found")
+
+        statistics = GradeService.get_class_grade_statistics(
+            db, class_id, academic_period=academic_period, academic_year=academic_year, student_id=student_id
+        )
+        student_ids = [student.student_id for student in statistics]
+
+        comments = {}
+        comment_query = db.query(
+            Grade.student_id, Subject.name, Grade.academic_period, Grade.comments
+        ).join(Subject, Subject.id == Grade.subject_id).filter(
+            Grade.student_id.in_(student_ids),
+            Grade.comments.isnot(None),
+            Grade.comments != ""
+        )
+        if academic_period:
+            comment_query = comment_query.filter(Grade.academic_period == ACADEMIC_PERIODS[academic_period.value])
+        if academic_year:
+            comment_query = comment_query.filter(Grade.academic_year == academic_year)
+        for student_id, subject_name, period, comment in comment_query.order_by(Grade.assessment_date, Grade.id):
+            comments.setdefault((student_id, subject_name, period.value), []).append(comment)
+
+        def days(status: AttendanceStatus):
+            return func.coalesce(func.sum(case((Attendance.status == status, 1), else_=0)), 0)
+
+        attendance_query = db.query(
+            Attendance.student_id,
+            func.count(Attendance.id).label('total'),
+            days(AttendanceStatus.PRESENT).label('present'),
+            days(AttendanceStatus.ABSENT).label('absent'),
+            days(AttendanceStatus.LATE).label('late'),
+            days(AttendanceStatus.EXCUSED).label('excused')
+        ).filter(Attendance.student_id.in_(student_ids), Attendance.class_id == class_id)
+        if start_date:
+            attendance_query = attendance_query.filter(Attendance.attendance_date >= start_date)
+        if end_date:
+            attendance_query = attendance_query.filter(Attendance.attendance_date <= end_date)
+        attendance = {row.student_id: row for row in attendance_query.group_by(Attendance.student_id)}
+
+        cards = []
+        for student in statistics:
+            counts = attendance.get(student.student_id)
+            total = counts.total if counts else 0
+            cards.append(ReportCardData(
+                student_id=student.student_id,
+                first_name=student.first_name,
+                last_name=student.last_name,
+                class_name=class_obj.name,
+                academic_year=academic_year,
+                academic_period=academic_period,
+                average_percentage=student.average_percentage,
+                subjects=[
+                    ReportCardSubject(
+                        subject_name=subject.subject_name,
+                        academic_period=subject.academic_period,
+                        average_grade=subject.average_grade,
+                        average_percentage=subject.average_percentage,
+                        total_assessments=subject.total_assessments,
+                        comments=comments.get((student.student_id, subject.subject_name, subject.academic_period.value), [])
+                    )
+                    for subject in student.subjects
+                ],
+                attendance=AttendanceStats(
+                    total_days=total,
+                    present_days=counts.present if counts else 0,
+                    absent_days=counts.absent if counts else 0,
+                    late_days=counts.late if counts else 0,
+                    excused_days=counts.excused if counts else 0,
+                    attendance_rate=round((counts.present + counts.late) / total * 100, 2) if total else 0
+                )
+            ))
+        return cards
+
+    @staticmethod
+    def render_report_cards(
+        cards: List[ReportCardData],
+        workers: Optional[int] = None,
+        cache_dir: Optional[str] = None
+    ) -> Dict[int, str]:
+        """
+        Make sure every card has a cached PDF, rendering the missing ones.
+
+        Missing cards are rendered in a pool of `workers` processes (inline
+        for a single card or a single worker). Workers are spawned rather
+        than forked, which is safe from the server's threads.
+
+        Returns:
+            Path of each student's PDF, by student_id
+        """
+        cache_dir = cache_dir or REPORT_CARD_CACHE_DIR
+        workers = workers or REPORT_CARD_WORKERS
+        os.makedirs(cache_dir, exist_ok=True)
+
+        paths = {card.student_id: os.path.join(cache_dir, f"{cache_key(card)}.pdf") for card in cards}
+        missing = [card for card in cards if not os.path.exists(paths[card.student_id])]
+        payloads = [card.model_dump(mode="json") for card in missing]
+
+        if len(missing) > 1 and workers > 1:
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(workers, len(missing)), mp_context=context) as pool:
+                rendered = pool.map(render_report_card, payloads, chunksize=max(1, len(missing) // (workers * 4)))
+                for card, content in zip(missing, rendered):
+                    write_atomically(paths[card.student_id], content)
+        else:
+            for card, payload in zip(missing, payloads):
+                write_atomically(paths[card.student_id], render_report_card(payload))
+        return paths
+
+    @staticmethod
+    def get_class_bundle(
+        db: Session,
+        class_id: int,
+        academic_year: Optional[str] = None,
+        academic_period: Optional[AcademicPeriodEnum] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        workers: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """Render (or reuse) a class's report cards and return its zip stream."""
+        cards = ReportCardService.get_report_card_data(
+            db, class_id, academic_year, academic_period, start_date, end_date
+        )
+        paths = ReportCardService.render_report_cards(cards, workers)
+        return zip_stream((card_filename(card), paths[card.student_id]) for card in cards)
+
+    @staticmethod
+    def get_student_report_card(
+        db: Session,
+        student_id: int,
+        academic_year: Optional[str] = None,
+        academic_period: Optional[AcademicPeriodEnum] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Optional[Tuple[str, str]]:
+        """Render (or reuse) one student's report card; returns (filename, path) or None."""
+        class_id = db.query(Student.class_id).filter(Student.id == student_id).scalar()
+        if class_id is None:
+            return None
+        cards = ReportCardService.get_report_card_data(
+            db, class_id, academic_year, academic_period, start_date, end_date, student_id=student_id
+        )
+        if not cards:
+            return None
+        card = cards[0]
+        path = ReportCardService.render_report_cards([card], workers=1)[student_id]
+        return card_filename(card), path
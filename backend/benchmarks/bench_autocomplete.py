@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Keystroke latency benchmark for the quick-search autocomplete index.
+
+Fills an AutocompleteIndex with synthetic student names, then replays the
+keystrokes of typing a set of names one character at a time and prints the
+build time and per-keystroke latency percentiles.
+
+Usage:
+    python benchmarks/bench_autocomplete.py [--students 100000] [--queries 500]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.normalization import search_key
+from app.services.autocomplete_service import AutocompleteIndex
+
+FIRST_NAMES = [
+    "Adam", "Ahmed", "Aicha", "Ali", "Amine", "Amira", "Bilal", "Fatima", "Hamza", "Ibrahim",
+    "Imane", "Karim", "Khadija", "Lina", "Mariam", "Mehdi", "Mohamed", "Nour", "Omar", "Rayan",
+    "Salma", "Sara", "Sofiane", "Yasmine", "Youssef", "Zakaria", "Zineb",
+]
+LAST_NAMES = [
+    "Benali", "Benaissa", "Bouzid", "Chaoui", "El Amrani", "El Idrissi", "Haddad", "Hassan",
+    "Kaddouri", "Lahlou", "Mansouri", "Mekki", "Ouali", "Rahmani", "Saidi", "Tazi", "Zerrouki",
+]
+
+def random_name(rng: random.Random) -> tuple:
+    # A numeric suffix keeps names from collapsing onto a few hundred values
+    return rng.choice(FIRST_NAMES), f"{rng.choice(LAST_NAMES)}{rng.randint(1, 999)}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    names = [random_name(rng) for _ in range(args.students)]
+
+    index = AutocompleteIndex()
+    started = time.perf_counter()
+    index.add_many(
+        (student_id, (f"{first_name} {last_name}", last_name), (search_key(first_name), search_key(last_name), student_id), None)
+        for student_id, (first_name, last_name) in enumerate(names, start=1)
+    )
+    build_seconds = time.perf_counter() - started
+
+    latencies = []
+    for first_name, last_name in rng.sample(names, min(args.queries, len(names))):
+        typed = f"{first_name} {last_name}"
+        for length in range(1, len(typed) + 1):
+            started = time.perf_counter()
+            index.search(typed[:length], args.limit)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    latencies.sort()
+    print(f"students:   {args.students}")
+    print(f"build:      {build_seconds:.2f}s")
+    print(f"keystrokes: {len(latencies)}")
+    print(f"p50:        {statistics.median(latencies):.3f} ms")
+    print(f"p99:        {latencies[int(len(latencies) * 0.99)]:.3f} ms")
+    print(f"max:        {latencies[-1]:.3f} ms")
+
+    # Substring lookups that cannot use the prefix list
+    substring_latencies = []
+    for last_name in LAST_NAMES:
+        term = last_name[1:5].lower()
+        started = time.perf_counter()
+        index.search(term, args.limit)
+        substring_latencies.append((time.perf_counter() - started) * 1000)
+    print(f"substring:  max {max(substring_latencies):.3f} ms over {len(substring_latencies)} terms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Bulk grade ingestion benchmark.
+
+Creates a throwaway SQLite database with enough students for the largest
+batch, then records each batch size twice: once through
+GradeService.create_grade row by row (two lookups, a commit and a refresh
+per grade, the previous bulk path) and once through
+GradeService.create_bulk_grades. Prints the time and rows per second of each.
+
+Usage:
+    python benchmarks/bench_bulk_grades.py [--sizes 1000,10000] [--skip-row-by-row]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models import Base, Parent, Class, Student, Subject, Grade
+from app.database.session import create_sqlite_engine
+from app.schemas.academic import BulkGradeCreate, GradeCreate
+from app.services.academic_service import GradeService
+
+BATCH = {
+    "grade_type": "test",
+    "academic_period": "first_term",
+    "academic_year": "2024-2025",
+    "assessment_date": date(2024, 11, 4),
+}
+
+def prepare(db, students: int):
+    parent = Parent(first_name="Karim", last_name="Haddad")
+    class_obj = Class(name="CP - Matin", level="CP", time_slot="10h-13h", capacity=students, academic_year="2024-2025")
+    db.add_all([parent, class_obj])
+    db.flush()
+    subject = Subject(name="Mathématiques", code="MATH", class_id=class_obj.id, academic_year="2024-2025")
+    db.add(subject)
+    db.add_all([
+        Student(
+            first_name=f"Student{i}", last_name="Haddad", date_of_birth=date(2017, 1, 1), gender="M",
+            parent_id=parent.id, class_id=class_obj.id, academic_year="2024-2025"
+        )
+        for i in range(students)
+    ])
+    db.commit()
+    return subject.id, [student_id for (student_id,) in db.query(Student.id)]
+
+def row_by_row(db, subject_id, rows):
+    for row in rows:
+        GradeService.create_grade(db, GradeCreate(subject_id=subject_id, **row, **BATCH), recorded_by=None)
+
+def bulk(db, subject_id, rows):
+    GradeService.create_bulk_grades(db, BulkGradeCreate(subject_id=subject_id, grades=rows, **BATCH), recorded_by=None)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="1000,10000")
+    parser.add_argument("--skip-row-by-row", action="store_true", help="Only time the bulk path")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_sqlite_engine(f"sqlite:///{os.path.join(directory, 'grades.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            subject_id, student_ids = prepare(db, max(sizes))
+            methods = [("bulk", bulk)] if args.skip_row_by_row else [("row by row", row_by_row), ("bulk", bulk)]
+
+            print(f"{'rows':>8} {'method':>12} {'seconds':>9} {'rows/s':>10}")
+            for size in sizes:
+                rows = [
+                    {"student_id": student_id, "grade_value": float(i % 21), "comments": None}
+                    for i, student_id in enumerate(student_ids[:size])
+                ]
+                for name, method in methods:
+                    started = time.perf_counter()
+                    method(db, subject_id, rows)
+                    seconds = time.perf_counter() - started
+                    print(f"{size:>8} {name:>12} {seconds:>9.3f} {size / seconds:>10.0f}")
+                    db.query(Grade).delete()
+                    db.commit()
+        finally:
+            db.close()
+            engine.dispose()
+
+if __name__ == "__main__":
+    main()
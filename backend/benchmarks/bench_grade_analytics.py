@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Class ranking and grade distribution benchmark.
+
+Creates a throwaway SQLite database with one class of students, each graded
+on the same assessments across a few subjects, then times the rankings and
+distribution of the class through GradeAnalyticsService and, for
+comparison, the same weighted averages and ranks computed in Python over
+the Grade objects returned by GradeService.get_class_grades.
+
+Usage:
+    python benchmarks/bench_grade_analytics.py [--students 1000] [--assessments 200] [--skip-python]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models import Base, Parent, Class, Student, Subject, Grade, GradeType, AcademicPeriod
+from app.database.session import create_sqlite_engine
+from app.schemas.academic import AcademicPeriodEnum
+from app.services.academic_service import GradeService
+from app.services.grade_analytics_service import GradeAnalyticsService, DEFAULT_TYPE_WEIGHTS
+
+SUBJECTS = ["Mathématiques", "Arabe", "Français", "Sciences", "Histoire"]
+
+def prepare(db, students: int, assessments: int):
+    parent = Parent(first_name="Karim", last_name="Haddad")
+    class_obj = Class(name="CM2", level="CM2", time_slot="8h-12h", capacity=students, academic_year="2024-2025")
+    db.add_all([parent, class_obj])
+    db.flush()
+    subjects = [
+        Subject(name=name, code=name[:4].upper(), class_id=class_obj.id, academic_year="2024-2025") for name in SUBJECTS
+    ]
+    db.add_all(subjects)
+    db.add_all([
+        Student(
+            first_name=f"Student{i}", last_name="Haddad", date_of_birth=date(2013, 1, 1), gender="M",
+            parent_id=parent.id, class_id=class_obj.id, academic_year="2024-2025"
+        )
+        for i in range(students)
+    ])
+    db.flush()
+    student_ids = [student_id for (student_id,) in db.query(Student.id)]
+
+    random.seed(42)
+    grade_types = list(GradeType)
+    plan = [(subjects[a % len(subjects)].id, grade_types[a % len(grade_types)]) for a in range(assessments)]
+    rows = [
+        {
+            "student_id": student_id, "subject_id": subject_id, "grade_value": round(random.uniform(0, 20), 2),
+            "max_grade": 20, "grade_type": grade_type, "academic_period": AcademicPeriod.FIRST_TERM,
+            "academic_year": "2024-2025", "assessment_date": date(2024, 11, 4)
+        }
+        for student_id in student_ids
+        for subject_id, grade_type in plan
+    ]
+    db.execute(insert(Grade), rows)
+    db.commit()
+    return class_obj.id
+
+def python_rankings(db, class_id):
+    """The same weighted averages and ranks, one Grade object at a time"""
+    totals = defaultdict(float)
+    weights = defaultdict(float)
+    for grade in GradeService.get_class_grades(db, class_id, academic_period=AcademicPeriod.FIRST_TERM):
+        weight = DEFAULT_TYPE_WEIGHTS[grade.grade_type]
+        totals[grade.student_id] += weight * grade.grade_value * 100 / grade.max_grade
+        weights[grade.student_id] += weight
+    averages = {student_id: round(totals[student_id] / weights[student_id], 2) for student_id in totals}
+    ordered = sorted(averages.values(), reverse=True)
+    return {student_id: ordered.index(average) + 1 for student_id, average in averages.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--assessments", type=int, default=200)
+    parser.add_argument("--skip-python", action="store_true", help="Only time the NumPy path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_sqlite_engine(f"sqlite:///{os.path.join(directory, 'grades.db')}")
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(bind=engine)
+        try:
+            with SessionLocal() as db:
+                class_id = prepare(db, args.students, args.assessments)
+            print(f"{args.students} students x {args.assessments} assessments = {args.students * args.assessments} grades")
+
+            methods = [
+                ("rankings", lambda db: GradeAnalyticsService.get_class_rankings(
+                    db, class_id, academic_period=AcademicPeriodEnum.FIRST_TERM)),
+                ("distribution", lambda db: GradeAnalyticsService.get_grade_distribution(
+                    db, class_id, academic_period=AcademicPeriodEnum.FIRST_TERM)),
+            ]
+            if not args.skip_python:
+                methods.append(("python loop", lambda db: python_rankings(db, class_id)))
+
+            print(f"{'method':>14} {'seconds':>9}")
+            for name, method in methods:
+                # A fresh session each time, so no identity map is reused
+                with SessionLocal() as db:
+                    started = time.perf_counter()
+                    method(db)
+                    print(f"{name:>14} {time.perf_counter() - started:>9.3f}")
+        finally:
+            engine.dispose()
+
+if __name__ == "__main__":
+    main()
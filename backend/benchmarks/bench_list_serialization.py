@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+List endpoint latency, validating rows twice vs once and encoding straight to JSON.
+
+Creates a throwaway SQLite database with students (each with a parent, a
+class and a flag) and their payments, then requests 100-item pages of
+GET /students/ and GET /payments/ through the ASGI app. Each endpoint runs
+as it is, rows validated once into the page and dumped to JSON bytes by
+pydantic-core, and as it used to be: every row turned into a response model
+in the route, the page then validated again by FastAPI against the
+response_model and encoded. Checks that both return the same JSON and prints
+the mean, median and 95th percentile latency per page.
+
+Usage:
+    python benchmarks/bench_list_serialization.py [--students 1000] [--requests 300]
+"""
+
+import argparse
+import importlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.api import pagination
+from app.api.dependencies import get_current_user
+from app.api.endpoints import students as students_endpoint, payments as payments_endpoint
+from app.database.models import Base, Parent, Class, Student, StudentFlag, Payment, PaymentType, User
+from app.database.session import create_sqlite_engine, get_db
+
+PAGE_SIZE = 100
+
+def prepare(engine, students: int):
+    SessionLocal = sessionmaker(bind=engine)
+    with SessionLocal() as db:
+        classes = [
+            Class(name=f"Class {i}", level="CE1", time_slot="10h-13h", capacity=30, academic_year="2024-2025")
+            for i in range(students // 25 + 1)
+        ]
+        parents = [
+            Parent(first_name=f"Parent{i}", last_name="Family", phone=f"06{i:08d}", mobile=f"07{i:08d}", email=f"parent{i}@mail.com")
+            for i in range(students // 2 + 1)
+        ]
+        db.add_all(classes + parents)
+        db.flush()
+        rows = [
+            Student(
+                first_name=f"Student{i}", last_name="Family", date_of_birth=date(2015, 1, 1) + timedelta(days=i % 1000),
+                gender="F" if i % 2 else "M", parent_id=parents[i // 2].id, class_id=classes[i // 25].id,
+                academic_year="2024-2025"
+            )
+            for i in range(students)
+        ]
+        db.add_all(rows)
+        db.flush()
+        db.add_all([
+            StudentFlag(student_id=student.id, flag_type="late_payment", reason="Payment late", flagged_by=1)
+            for student in rows
+        ])
+        db.add_all([
+            Payment(
+                student_id=student.id, amount=150, payment_method="Cash", payment_type=PaymentType.QUARTERLY,
+                payment_date=datetime(2024, 10, 1) + timedelta(minutes=i), receipt_number=f"2024-{i + 1:06d}"
+            )
+            for i, student in enumerate(rows)
+        ])
+        db.commit()
+
+def legacy_response(item_type, items, pagination_metadata):
+    """The routes as they were: response models built here, validated again by FastAPI"""
+    return pagination.create_paginated_response(
+        [item_type.model_validate(item) for item in items], pagination_metadata
+    )
+
+@contextmanager
+def legacy_routes():
+    modules = (students_endpoint, payments_endpoint)
+    for module in modules:
+        module.paginated_json_response = legacy_response
+    try:
+        yield
+    finally:
+        for module in modules:
+            module.paginated_json_response = pagination.paginated_json_response
+
+def run(client: TestClient, url: str, requests: int):
+    latencies = []
+    body = None
+    for i in range(requests):
+        started = time.perf_counter()
+        response = client.get(url, params={"size": PAGE_SIZE, "page": i % 5 + 1, "include_total": False})
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200
+        body = body or response.json()
+    return sorted(latencies), body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=300, help="Pages requested per endpoint and path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_sqlite_engine(f"sqlite:///{os.path.join(directory, 'lists.db')}")
+        Base.metadata.create_all(bind=engine)
+        prepare(engine, args.students)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def override_get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_current_user] = lambda: User(id=1, username="admin", role="admin")
+        # The startup warm-up reads the throwaway database too
+        importlib.import_module("app.main").engine = engine
+        try:
+            with TestClient(app) as client:
+                print(f"{args.requests} pages of {PAGE_SIZE} per endpoint, {args.students} students")
+                print(f"{'endpoint':>10} {'path':>12} {'mean ms':>8} {'median':>8} {'p95':>8}")
+                for url in ("/students/", "/payments/"):
+                    bodies = []
+                    for name in ("two passes", "one pass"):
+                        if name == "two passes":
+                            with legacy_routes():
+                                run(client, url, 10)  # warm up
+                                latencies, body = run(client, url, args.requests)
+                        else:
+                            run(client, url, 10)
+                            latencies, body = run(client, url, args.requests)
+                        bodies.append(body)
+                        print(
+                            f"{url:>10} {name:>12} {statistics.mean(latencies) * 1000:>8.2f} "
+                            f"{statistics.median(latencies) * 1000:>8.2f} "
+                            f"{latencies[int(len(latencies) * 0.95)] * 1000:>8.2f}"
+                        )
+                    assert bodies[0] == bodies[1], f"{url}: the two paths returned different pages"
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            app.dependency_overrides.pop(get_current_user, None)
+            engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark, bcrypt on the request thread pool vs the password hasher.
+
+Creates a throwaway SQLite database with staff users, then fires a burst of
+logins from many client threads (the morning rush) while a probe keeps
+calling an unrelated endpoint (GET /auth/me) one request at a time. Each
+burst goes either to POST /auth/login, where bcrypt runs on the bounded
+password hasher, or to an equivalent login route that verifies passwords in
+the request thread pool like the endpoint used to. Prints logins per second
+and the probe's latency during the burst.
+
+Usage:
+    python benchmarks/bench_login.py [--logins 200] [--threads 32] [--rounds 12] [--workers 2]
+"""
+
+import argparse
+import importlib
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Depends, HTTPException
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.main import app
+from app.database.models import Base, User
+from app.database.session import create_sqlite_engine, get_db
+from app.schemas.user import UserLogin
+from app.services import auth_service
+from app.services.auth_service import AuthService, PasswordHasher
+
+USERS = 50
+
+@app.post("/bench/inline-login", include_in_schema=False)
+def inline_login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+    """The login as it was: a sync route, bcrypt in the request thread"""
+    user = AuthService.get_user_by_username(db, user_credentials.username)
+    if not user or not auth_service.pwd_context.verify(user_credentials.password, user.password_hash):
+        raise HTTPException(status_code=401)
+    return {"user_id": user.id}
+
+def prepare(engine) -> str:
+    SessionLocal = sessionmaker(bind=engine)
+    password_hash = auth_service.pwd_context.hash("desk123")
+    with SessionLocal() as db:
+        db.add_all([
+            User(
+                username=f"desk{i}", email=f"desk{i}@school.com", first_name="Front", last_name="Desk",
+                role="registration", password_hash=password_hash, is_active=True
+            )
+            for i in range(USERS)
+        ])
+        db.commit()
+        user = db.query(User).first()
+        return AuthService.create_access_token(
+            data={"sub": user.username, "role": user.role, "uid": user.id, "ver": user.token_version}
+        )
+
+def run(client: TestClient, url: str, token: str, logins: int, threads: int):
+    done = threading.Event()
+    probes = []
+
+    def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+            probes.append(time.perf_counter() - started)
+
+    def login(i):
+        response = client.post(url, json={"username": f"desk{i % USERS}", "password": "desk123"})
+        return response.status_code
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        statuses = list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    prober.join()
+    return elapsed, statuses, sorted(probes)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--rounds", type=int, default=auth_service.BCRYPT_ROUNDS, help="bcrypt cost factor")
+    parser.add_argument("--workers", type=int, default=auth_service.PASSWORD_HASH_WORKERS, help="Password hasher threads")
+    args = parser.parse_args()
+
+    auth_service.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=args.rounds)
+    # Sized for the whole burst, this measures throughput rather than refusals
+    auth_service.password_hasher = PasswordHasher(workers=args.workers, queue_size=args.logins)
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_sqlite_engine(f"sqlite:///{os.path.join(directory, 'logins.db')}")
+        Base.metadata.create_all(bind=engine)
+        token = prepare(engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def override_get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        # The startup warm-up reads the throwaway database too
+        importlib.import_module("app.main").engine = engine
+        try:
+            with TestClient(app) as client:
+                print(f"cost {args.rounds}, {args.logins} logins from {args.threads} clients, {args.workers} hasher thread(s)")
+                print(f"{'bcrypt on':>14} {'logins/s':>9} {'failed':>7} {'probe p50 ms':>13} {'probe p95 ms':>13}")
+                for name, url in (("request pool", "/bench/inline-login"), ("hasher", "/auth/login")):
+                    elapsed, statuses, probes = run(client, url, token, args.logins, args.threads)
+                    print(
+                        f"{name:>14} {args.logins / elapsed:>9.1f} {sum(s != 200 for s in statuses):>7} "
+                        f"{statistics.median(probes) * 1000:>13.1f} {probes[int(len(probes) * 0.95)] * 1000:>13.1f}"
+                    )
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for confirming registrations under concurrent load.
+
+Creates a throwaway SQLite database with one class and many pending
+registrations, then confirms all of them from a pool of threads (one session
+per confirmation, like concurrent desks) for each thread count. Prints the
+confirmations per second, how many were refused because the class was full
+and whether the class ended up overbooked.
+
+Usage:
+    python benchmarks/bench_seat_allocation.py [--students 2000] [--capacity 500] [--threads 1,4,16,32]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models import Base, Parent, Class, Student, RegistrationStatus
+from app.database.session import create_sqlite_engine
+from app.services.registration_service import confirm_registration
+
+def prepare(url: str, students: int, capacity: int):
+    engine = create_sqlite_engine(url)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine)
+    db = SessionLocal()
+    try:
+        parent = Parent(first_name="Karim", last_name="Haddad")
+        class_obj = Class(name="CP - Matin", level="CP", time_slot="10h-13h", capacity=capacity, academic_year="2024-2025")
+        db.add_all([parent, class_obj])
+        db.flush()
+        db.add_all([
+            Student(
+                first_name=f"Student{i}", last_name="Haddad", date_of_birth=date(2017, 1, 1), gender="M",
+                parent_id=parent.id, class_id=class_obj.id, academic_year="2024-2025"
+            )
+            for i in range(students)
+        ])
+        db.commit()
+        student_ids = [student_id for (student_id,) in db.query(Student.id)]
+        return engine, SessionLocal, class_obj.id, student_ids
+    finally:
+        db.close()
+
+def run(SessionLocal, student_ids, threads: int):
+    def confirm(student_id):
+        session = SessionLocal()
+        try:
+            confirm_registration(session, student_id)
+            return True
+        except HTTPException:
+            return False
+        finally:
+            session.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        outcomes = list(pool.map(confirm, student_ids))
+    return time.perf_counter() - started, outcomes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--capacity", type=int, default=500)
+    parser.add_argument("--threads", default="1,4,16,32")
+    args = parser.parse_args()
+
+    print(f"{'threads':>8} {'confirm/s':>10} {'confirmed':>10} {'refused':>8} {'in db':>6}")
+    for threads in [int(value) for value in args.threads.split(",")]:
+        with tempfile.TemporaryDirectory() as directory:
+            engine, SessionLocal, class_id, student_ids = prepare(
+                f"sqlite:///{os.path.join(directory, 'seats.db')}", args.students, args.capacity
+            )
+            try:
+                seconds, outcomes = run(SessionLocal, student_ids, threads)
+                with SessionLocal() as db:
+                    in_db = db.query(func.count(Student.id)).filter(
+                        Student.class_id == class_id, Student.registration_status == RegistrationStatus.CONFIRMED
+                    ).scalar()
+            finally:
+                engine.dispose()
+        confirmed = sum(outcomes)
+        print(f"{threads:>8} {len(outcomes) / seconds:>10.0f} {confirmed:>10} {len(outcomes) - confirmed:>8} {in_db:>6}")
+        if in_db > args.capacity:
+            print(f"         class overbooked: {in_db} confirmed for {args.capacity} seats")
+
+if __name__ == "__main__":
+    main()
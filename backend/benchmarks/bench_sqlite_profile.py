@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Mixed read/write throughput benchmark for the SQLite connection profiles.
+
+Runs the same workload (concurrent payment inserts and student lookups)
+against a fresh database file once per profile and prints operations per
+second, so the effect of the "performance" profile can be compared with
+SQLite's defaults.
+
+Usage:
+    python benchmarks/bench_sqlite_profile.py [--seconds 5] [--writers 4] [--readers 8]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models import Base, Parent, Class, Student, Payment, PaymentType
+from app.database.session import create_sqlite_engine
+
+def seed(SessionLocal, students: int):
+    """Create a parent, a class and a batch of students to read back."""
+    db = SessionLocal()
+    try:
+        parent = Parent(first_name="Bench", last_name="Parent", phone="0600000000")
+        class_obj = Class(name="Bench", level="CP", time_slot="10h-13h", capacity=students, academic_year="2024-2025")
+        db.add_all([parent, class_obj])
+        db.flush()
+        db.add_all([
+            Student(
+                first_name=f"Student{i}", last_name="Bench", date_of_birth=date(2017, 1, 1),
+                gender="M", parent_id=parent.id, class_id=class_obj.id, academic_year="2024-2025"
+            )
+            for i in range(students)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+def run_profile(profile: str, seconds: float, writers: int, readers: int, students: int) -> dict:
+    """Run the mixed workload against a fresh database using the given profile."""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_sqlite_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", profile=profile)
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        seed(SessionLocal, students)
+
+        counters = {"reads": 0, "writes": 0, "errors": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def writer():
+            db = SessionLocal()
+            done = errors = 0
+            try:
+                while time.perf_counter() < deadline:
+                    try:
+                        db.add(Payment(
+                            student_id=random.randint(1, students), amount=100.0,
+                            payment_method="Cash", payment_type=PaymentType.QUARTERLY,
+                            payment_date=datetime.now()
+                        ))
+                        db.commit()
+                        done += 1
+                    except OperationalError:
+                        db.rollback()
+                        errors += 1
+            finally:
+                db.close()
+            with lock:
+                counters["writes"] += done
+                counters["errors"] += errors
+
+        def reader():
+            db = SessionLocal()
+            done = errors = 0
+            try:
+                while time.perf_counter() < deadline:
+                    try:
+                        db.query(Student).filter(Student.id == random.randint(1, students)).first()
+                        db.query(Payment).filter(Payment.student_id == random.randint(1, students)).count()
+                        db.rollback()  # end the read transaction like a request would
+                        done += 1
+                    except OperationalError:
+                        db.rollback()
+                        errors += 1
+            finally:
+                db.close()
+            with lock:
+                counters["reads"] += done
+                counters["errors"] += errors
+
+        threads = [threading.Thread(target=writer) for _ in range(writers)]
+        threads += [threading.Thread(target=reader) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        engine.dispose()
+
+    return {
+        "profile": profile,
+        "reads_per_sec": counters["reads"] / seconds,
+        "writes_per_sec": counters["writes"] / seconds,
+        "errors": counters["errors"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--students", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'profile':<12} {'reads/s':>10} {'writes/s':>10} {'errors':>8}")
+    for profile in ("default", "performance"):
+        result = run_profile(profile, args.seconds, args.writers, args.readers, args.students)
+        print(f"{result['profile']:<12} {result['reads_per_sec']:>10.0f} {result['writes_per_sec']:>10.0f} {result['errors']:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Per-request latency of authenticated calls with and without the user cache.
+
+Creates a throwaway SQLite database with one staff user, then sends bursts
+of GET /auth/me requests (the cheapest authenticated endpoint, so the
+authentication dominates) through the ASGI app, the way a dashboard fires its
+parallel calls. Prints the mean, median and 95th percentile latency per
+request and how many times the users table was read, with the cache enabled
+and disabled.
+
+Usage:
+    python benchmarks/bench_user_cache.py [--requests 2000] [--burst 8]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database.models import Base, User
+from app.database.session import create_sqlite_engine, get_db
+from app.services import auth_service
+from app.services.auth_service import AuthService, UserCache
+
+def prepare(engine) -> str:
+    SessionLocal = sessionmaker(bind=engine)
+    with SessionLocal() as db:
+        user = User(
+            username="desk", email="desk@school.com", first_name="Front", last_name="Desk",
+            role="registration", password_hash="not used", is_active=True
+        )
+        db.add(user)
+        db.commit()
+        return AuthService.create_access_token(
+            data={"sub": user.username, "role": user.role, "uid": user.id, "ver": user.token_version}
+        )
+
+def run(client: TestClient, token: str, requests: int, burst: int):
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def call(_):
+        started = time.perf_counter()
+        response = client.get("/auth/me", headers=headers)
+        assert response.status_code == 200
+        return time.perf_counter() - started
+
+    latencies = []
+    with ThreadPoolExecutor(max_workers=burst) as pool:
+        for _ in range(requests // burst):
+            latencies.extend(pool.map(call, range(burst)))
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--burst", type=int, default=8, help="Parallel requests per burst")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_sqlite_engine(f"sqlite:///{os.path.join(directory, 'users.db')}")
+        Base.metadata.create_all(bind=engine)
+        token = prepare(engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def override_get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        lookups = []
+        event.listen(engine, "before_cursor_execute", lambda *args: lookups.append(1) if "FROM users" in args[2] else None)
+        app.dependency_overrides[get_db] = override_get_db
+        try:
+            client = TestClient(app)
+            print(f"{'cache':>8} {'mean ms':>8} {'median':>8} {'p95':>8} {'lookups':>8}")
+            for name, cache in (("off", UserCache(max_size=0)), ("on", UserCache())):
+                auth_service.user_cache = cache
+                run(client, token, args.burst * 10, args.burst)  # warm up
+                lookups.clear()
+                latencies = sorted(run(client, token, args.requests, args.burst))
+                print(
+                    f"{name:>8} {statistics.mean(latencies) * 1000:>8.3f} "
+                    f"{statistics.median(latencies) * 1000:>8.3f} "
+                    f"{latencies[int(len(latencies) * 0.95)] * 1000:>8.3f} {len(lookups):>8}"
+                )
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Term-end batch job: render the report cards of every class and write one zip per class.
+
+Cards are rendered across a process pool and cached by the hash of their
+data, so running the job again only renders the students whose grades,
+comments or attendance changed. Cached cards rendered more than
+--purge-older-than days ago are deleted at the end of the run.
+
+Usage:
+    python generate_report_cards.py --academic-year 2024-2025 [--academic-period first_term]
+        [--class-id 3 ...] [--start-date 2024-09-02] [--end-date 2024-12-20]
+        [--output report_cards] [--workers 8] [--purge-older-than 365]
+"""
+
+import argparse
+import logging
+import os
+import time
+from datetime import date
+
+from app.database.models import Class
+from app.database.session import SessionLocal
+from app.schemas.academic import AcademicPeriodEnum
+from app.services.report_card_service import (
+    ReportCardService, REPORT_CARD_CACHE_DIR, REPORT_CARD_CACHE_MAX_AGE_DAYS, cache_key, card_filename,
+    purge_cache, zip_stream
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--academic-year", required=True)
+    parser.add_argument("--academic-period", type=AcademicPeriodEnum, choices=list(AcademicPeriodEnum), metavar="PERIOD",
+                        help=", ".join(period.value for period in AcademicPeriodEnum))
+    parser.add_argument("--class-id", type=int, action="append", help="Only these classes (default: every class of the year)")
+    parser.add_argument("--start-date", type=date.fromisoformat, help="Count attendance from this day")
+    parser.add_argument("--end-date", type=date.fromisoformat, help="Count attendance up to this day")
+    parser.add_argument("--output", default="report_cards", help="Directory for the zip files")
+    parser.add_argument("--workers", type=int, help="Rendering processes (default: REPORT_CARD_WORKERS)")
+    parser.add_argument("--purge-older-than", type=int, default=REPORT_CARD_CACHE_MAX_AGE_DAYS, metavar="DAYS",
+                        help="Delete cached cards rendered more than DAYS ago (default: REPORT_CARD_CACHE_MAX_AGE_DAYS)")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    db = SessionLocal()
+    try:
+        classes = db.query(Class).filter(Class.academic_year == args.academic_year)
+        if args.class_id:
+            classes = classes.filter(Class.id.in_(args.class_id))
+
+        for class_obj in classes.order_by(Class.name).all():
+            started = time.perf_counter()
+            cards = ReportCardService.get_report_card_data(
+                db, class_obj.id, args.academic_year, args.academic_period, args.start_date, args.end_date
+            )
+            cached = sum(
+                os.path.exists(os.path.join(REPORT_CARD_CACHE_DIR, f"{cache_key(card)}.pdf")) for card in cards
+            )
+            paths = ReportCardService.render_report_cards(cards, args.workers)
+
+            period = args.academic_period.value if args.academic_period else "year"
+            bundle = os.path.join(args.output, f"report_cards_class_{class_obj.id}_{period}.zip")
+            with open(bundle, "wb") as file:
+                for chunk in zip_stream((card_filename(card), paths[card.student_id]) for card in cards):
+                    file.write(chunk)
+            logger.info(
+                f"✅ {class_obj.name}: {len(cards)} card(s), {len(cards) - cached} rendered, "
+                f"{cached} from cache in {time.perf_counter() - started:.2f}s -> {bundle}"
+            )
+        purged = purge_cache(max_age_days=args.purge_older_than)
+        logger.info(f"🧹 {purged} cached card(s) older than {args.purge_older_than} days deleted from {REPORT_CARD_CACHE_DIR}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ This script creates all database tables and sets up initial data.
 
 from app.database.models import Base, User, Student, Payment, Parent, Class
 from app.database.session import engine, SessionLocal
+from app.database.migrations import run_migrations
 from app.services.auth_service import AuthService
 from datetime import datetime
 import logging
@@ -25,6 +26,11 @@ def init_database():
         Base.metadata.create_all(bind=engine)
         logger.info("✅ Database tables created successfully!")
         
+        # Bring existing databases up to date (indexes, new columns)
+        logger.info("🔄 Applying schema migrations...")
+        applied = run_migrations(engine)
+        logger.info(f"✅ Applied {len(applied)} migration(s)")
+        
         # Create initial admin user
         db = SessionLocal()
         try:
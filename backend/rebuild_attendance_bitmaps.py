@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Rebuild the per-student attendance bitmaps from the attendance records.
+
+The bitmaps are kept in step on every attendance write and rebuilt when a
+year's calendar is set through the API. Run this after importing attendance
+or calendar rows with raw SQL, or to repair the bitmaps of every year.
+
+Usage:
+    python rebuild_attendance_bitmaps.py [--academic-year 2024-2025]
+"""
+
+import argparse
+import logging
+import time
+
+from app.database.session import SessionLocal
+from app.services.attendance_bitmap_service import AttendanceBitmapService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--academic-year", help="Only rebuild this academic year (default: all years)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        written = AttendanceBitmapService.rebuild_bitmaps(db, args.academic_year)
+        db.commit()
+        logger.info(f"✅ Rebuilt {written} attendance bitmap(s) in {time.perf_counter() - started:.2f}s")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,13 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from datetime import date, datetime
 
 from app.main import app
-from app.database.models import Base, User, Student, Class, Subject, Grade, Attendance, Parent
+from app.database.models import (
+    Base, User, Student, Class, Subject, Grade, Attendance, AttendanceDaily, Parent, GradeType, AcademicPeriod
+)
 from app.database.session import get_db
 from app.api.dependencies import get_current_user
 
@@ -249,6 +251,67 @@ class TestGrades:
         assert len(data) == 1
         assert data[0]["grade_value"] == 92.0
     
+    def test_bulk_grades_all_or_nothing(self, setup_test_data):
+        """An invalid row rejects the whole batch by default."""
+        bulk_data = {
+            "subject_id": 1,
+            "grade_type": "test",
+            "academic_period": "first_term",
+            "academic_year": "2023-2024",
+            "assessment_date": "2023-10-21",
+            "grades": [
+                {"student_id": 1, "grade_value": 15.0},
+                {"student_id": 999, "grade_value": 12.0},
+                {"student_id": 1, "grade_value": -3}
+            ]
+        }
+        
+        response = client.post("/academic/grades/bulk", json=bulk_data)
+        assert response.status_code == 400
+        assert "row 1: Student with ID 999 not found" in response.json()["detail"]
+        assert "row 2: grade_value" in response.json()["detail"]
+        
+        db = TestingSessionLocal()
+        try:
+            assert db.query(Grade).count() == 0
+        finally:
+            db.close()
+    
+    def test_bulk_grades_per_row(self, setup_test_data):
+        """Per-row mode saves the valid rows and reports the others."""
+        bulk_data = {
+            "subject_id": 1,
+            "grade_type": "test",
+            "academic_period": "first_term",
+            "academic_year": "2023-2024",
+            "assessment_date": "2023-10-21",
+            "mode": "per_row",
+            "grades": [
+                {"student_id": 1, "grade_value": 15.0, "comments": "Good"},
+                {"student_id": 999, "grade_value": 12.0},
+                {"student_id": 1, "grade_value": 17.5}
+            ]
+        }
+        
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = client.post("/academic/grades/bulk", json=bulk_data)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert response.status_code == 201
+        # Rows with and without comments share one INSERT
+        assert sum(statement.startswith("INSERT INTO grades") for statement in statements) == 1
+        
+        data = response.json()
+        assert [(g["grade_value"], g["comments"], g["grade_type"]) for g in data["grades"]] == [
+            (15.0, "Good", "test"), (17.5, None, "test")
+        ]
+        assert all(g["id"] and g["created_at"] for g in data["grades"])
+        assert data["errors"] == [{"index": 1, "student_id": 999, "error": "Student with ID 999 not found"}]
+    
     def test_get_student_grades(self, setup_test_data):
         """Test getting grades for a student."""
         # First create a grade
@@ -294,6 +357,121 @@ class TestGrades:
         assert "highest_grade" in data
         assert "lowest_grade" in data
         assert data["total_assessments"] >= 2
+    
+    def test_grade_statistics_per_subject_and_class(self, setup_test_data):
+        """Statistics are broken down by subject and period and normalized by max_grade."""
+        db = TestingSessionLocal()
+        db.add_all([
+            Subject(id=2, name="Arabic", code="AR", class_id=1, academic_year="2023-2024"),
+            Student(
+                id=2, first_name="Adam", last_name="Zerrouki", date_of_birth=date(2010, 1, 1), gender="Male",
+                parent_id=1, class_id=1, academic_year="2023-2024"
+            )
+        ])
+        db.commit()
+        db.close()
+        
+        def grade(subject_id, value, max_grade, period="first_term"):
+            return {"student_id": 1, "subject_id": subject_id, "grade_value": value, "max_grade": max_grade,
+                    "grade_type": "test", "academic_period": period, "academic_year": "2023-2024",
+                    "assessment_date": "2023-10-01"}
+        for data in (grade(1, 15, 20), grade(1, 80, 100), grade(1, 10, 20, "second_term"), grade(2, 9, 10)):
+            assert client.post("/academic/grades/", json=data).status_code == 201
+        
+        response = client.get("/academic/students/1/grade-stats")
+        data = response.json()
+        # Two subjects mixed together: no single subject name
+        assert (data["subject_name"], data["total_assessments"], data["average_percentage"]) == ("", 4, 73.75)
+        
+        response = client.get("/academic/students/1/grade-stats/subjects")
+        assert response.status_code == 200
+        assert [
+            (s["subject_name"], s["academic_period"], s["total_assessments"], s["average_percentage"], s["highest_percentage"])
+            for s in response.json()
+        ] == [
+            ("Arabic", "first_term", 1, 90.0, 90.0),
+            ("Mathematics", "first_term", 2, 77.5, 80.0),
+            ("Mathematics", "second_term", 1, 50.0, 50.0),
+        ]
+        
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = client.get("/academic/classes/1/grade-stats")
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert response.status_code == 200
+        assert len(statements) == 1
+        
+        doe, zerrouki = response.json()
+        assert (doe["student_id"], doe["total_assessments"], doe["average_percentage"]) == (1, 4, 73.75)
+        assert len(doe["subjects"]) == 3
+        assert (zerrouki["student_id"], zerrouki["average_percentage"], zerrouki["subjects"]) == (2, None, [])
+        
+        response = client.get("/academic/classes/1/grade-stats?subject_id=1&academic_period=first_term")
+        assert [(s["student_id"], s["total_assessments"]) for s in response.json()] == [(1, 2), (2, 0)]
+
+    def test_class_rankings_and_distribution(self, setup_test_data):
+        """Rankings weight grades by type and distributions bin them by percentage."""
+        db = TestingSessionLocal()
+        db.add(Subject(id=2, name="Arabic", code="AR", class_id=1, academic_year="2023-2024"))
+        db.add_all([
+            Student(
+                id=student_id, first_name=name, last_name="Zerrouki", date_of_birth=date(2010, 1, 1), gender="Male",
+                parent_id=1, class_id=1, academic_year="2023-2024"
+            )
+            for student_id, name in ((2, "Adam"), (3, "Ines"), (4, "Yanis"))
+        ])
+        db.add_all([
+            Grade(student_id=student_id, subject_id=subject_id, grade_value=value, max_grade=max_grade,
+                  grade_type=GradeType[grade_type], academic_period=AcademicPeriod[period],
+                  academic_year="2023-2024", assessment_date=date(2023, 10, 1))
+            for student_id, subject_id, value, max_grade, grade_type, period in (
+                (1, 1, 15, 20, "TEST", "FIRST_TERM"),
+                (1, 1, 18, 20, "EXAM", "FIRST_TERM"),
+                (1, 1, 0, 20, "EXAM", "SECOND_TERM"),
+                (2, 1, 90, 100, "EXAM", "FIRST_TERM"),
+                (2, 2, 6, 10, "QUIZ", "FIRST_TERM"),
+                (3, 1, 16.8, 20, "TEST", "FIRST_TERM"),
+                (4, 1, 10, 10, "PARTICIPATION", "FIRST_TERM"),
+            )
+        ])
+        db.commit()
+        db.close()
+        
+        response = client.get("/academic/classes/1/rankings?academic_period=first_term")
+        assert response.status_code == 200
+        assert [(s["student_id"], s["rank"]) for s in response.json()["students"]] == [(4, 1), (1, 2), (3, 2), (2, 4)]
+        
+        # Participation left out: Yanis is unranked, Doe and Ines tie
+        response = client.get("/academic/classes/1/rankings?academic_period=first_term&weights=participation:0")
+        data = response.json()
+        assert data["weights"]["exam"] == 3.0 and data["weights"]["participation"] == 0
+        assert [
+            (s["student_id"], s["rank"], s["weighted_average"], s["percentile"]) for s in data["students"]
+        ] == [(1, 1, 84.0, 66.67), (3, 1, 84.0, 66.67), (2, 3, 82.5, 16.67), (4, None, None, None)]
+        assert data["students"][2]["subject_averages"] == {"1": 90.0, "2": 60.0}
+        assert (data["class_average"], data["median"]) == (83.5, 84.0)
+        
+        response = client.get("/academic/classes/1/rankings?weights=exam:-1")
+        assert response.status_code == 400
+        response = client.get("/academic/classes/1/rankings?weights=essay:2")
+        assert response.status_code == 400
+        
+        response = client.get("/academic/classes/1/distribution?academic_period=first_term&bins=4")
+        assert response.status_code == 200
+        mathematics, arabic = response.json()["subjects"]
+        assert (mathematics["subject_name"], mathematics["total_assessments"]) == ("Mathematics", 5)
+        assert (mathematics["mean"], mathematics["median"], mathematics["lowest"], mathematics["highest"]) == (87.8, 90.0, 75.0, 100.0)
+        # 75% and 100% both land in the top bin
+        assert [b["count"] for b in mathematics["histogram"]] == [0, 0, 0, 5]
+        assert [(b["lower"], b["upper"], b["count"]) for b in arabic["histogram"]] == [
+            (0, 25, 0), (25, 50, 0), (50, 75, 1), (75, 100, 0)
+        ]
+        assert client.get("/academic/classes/1/distribution?bins=0").status_code == 400
+        assert client.get("/academic/classes/2/distribution").json()["subjects"] == []
 
 class TestAttendance:
     def test_create_attendance(self, setup_test_data):
@@ -331,9 +509,75 @@ class TestAttendance:
         assert response.status_code == 201
         
         data = response.json()
-        assert isinstance(data, list)
-        assert len(data) == 1
-        assert data[0]["status"] == "present"
+        assert data["inserted"] == 1
+        assert len(data["records"]) == 1
+        assert data["records"][0]["status"] == "present"
+    
+    def test_resubmitted_roll_call_updates_records(self, setup_test_data):
+        """Correcting a roll call updates the changed records in one statement."""
+        db = TestingSessionLocal()
+        db.add(Student(
+            id=2, first_name="Jane", last_name="Doe", date_of_birth=date(2010, 1, 1), gender="Female",
+            parent_id=1, class_id=1, academic_year="2023-2024"
+        ))
+        db.commit()
+        db.close()
+        
+        bulk_data = {
+            "class_id": 1,
+            "attendance_date": "2023-10-19",
+            "attendance_records": [
+                {"student_id": 1, "status": "present"},
+                {"student_id": 2, "status": "absent"}
+            ]
+        }
+        response = client.post("/academic/attendance/bulk", json=bulk_data)
+        assert response.status_code == 201
+        assert [r["outcome"] for r in response.json()["results"]] == ["inserted", "inserted"]
+        
+        # Student 2 was only late
+        bulk_data["attendance_records"][1] = {"student_id": 2, "status": "late", "notes": "10 minutes late"}
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = client.post("/academic/attendance/bulk", json=bulk_data)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert response.status_code == 201
+        
+        data = response.json()
+        assert (data["inserted"], data["updated"], data["unchanged"]) == (0, 1, 1)
+        assert data["results"] == [
+            {"student_id": 1, "outcome": "unchanged"},
+            {"student_id": 2, "outcome": "updated"}
+        ]
+        assert [(r["student_id"], r["status"], r["notes"]) for r in data["records"]] == [
+            (1, "present", None), (2, "late", "10 minutes late")
+        ]
+        assert sum(statement.startswith("INSERT INTO attendance") for statement in statements) == 1
+        
+        db = TestingSessionLocal()
+        try:
+            assert db.query(Attendance).filter(Attendance.attendance_date == date(2023, 10, 19)).count() == 2
+        finally:
+            db.close()
+    
+    def test_invalid_roll_call_saves_nothing(self, setup_test_data):
+        """Unknown or repeated students reject the whole roll call."""
+        response = client.post("/academic/attendance/bulk", json={
+            "class_id": 1,
+            "attendance_date": "2023-10-19",
+            "attendance_records": [
+                {"student_id": 1, "status": "present"},
+                {"student_id": 1, "status": "absent"},
+                {"student_id": 42, "status": "present"}
+            ]
+        })
+        assert response.status_code == 400
+        assert "more than once: 1" in response.json()["detail"]
+        assert "unknown students: 42" in response.json()["detail"]
     
     def test_get_student_attendance(self, setup_test_data):
         """Test getting attendance for a student."""
@@ -392,6 +636,102 @@ class TestAttendance:
         assert "absent_days" in data
         assert "attendance_rate" in data
         assert data["total_days"] >= 3
+        assert (data["present_days"], data["absent_days"], data["attendance_rate"]) == (2, 1, 66.67)
+        
+        response = client.get("/academic/students/1/attendance-stats?start_date=2023-10-21&end_date=2023-10-21")
+        assert (response.json()["total_days"], response.json()["attendance_rate"]) == (1, 100.0)
+        
+        response = client.get("/academic/students/1/attendance-stats?start_date=2024-01-01")
+        assert (response.json()["total_days"], response.json()["attendance_rate"]) == (0, 0.0)
+    
+    def test_class_attendance_matrix(self, setup_test_data):
+        """The class register comes back as one status string per student."""
+        db = TestingSessionLocal()
+        db.add(Student(
+            id=2, first_name="Adam", last_name="Abbas", date_of_birth=date(2010, 1, 1), gender="Male",
+            parent_id=1, class_id=1, academic_year="2023-2024"
+        ))
+        db.commit()
+        db.close()
+        
+        for student_id, day, status_value in (
+            (1, "2023-10-02", "present"), (1, "2023-10-03", "late"), (2, "2023-10-03", "absent"),
+            (2, "2023-10-05", "excused"), (1, "2023-11-06", "present")
+        ):
+            client.post("/academic/attendance/", json={
+                "student_id": student_id, "class_id": 1, "attendance_date": day, "status": status_value
+            })
+        
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = client.get("/academic/classes/1/attendance-matrix?start_date=2023-10-01&end_date=2023-10-31")
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert response.status_code == 200
+        assert len(statements) == 1
+        
+        data = response.json()
+        assert data["dates"] == ["2023-10-02", "2023-10-03", "2023-10-05"]
+        assert data["legend"]["L"] == "late"
+        assert [(s["student_id"], s["statuses"]) for s in data["students"]] == [(2, ".AE"), (1, "PL.")]
+        
+        response = client.get("/academic/classes/1/attendance-matrix?start_date=2023-10-31&end_date=2023-10-01")
+        assert response.status_code == 400
+    
+    def test_daily_rollup_and_heatmap(self, setup_test_data):
+        """Every write path keeps the daily rollup exact and the heatmap reads only the rollup."""
+        db = TestingSessionLocal()
+        db.add(Student(
+            id=2, first_name="Jane", last_name="Doe", date_of_birth=date(2010, 1, 1), gender="Female",
+            parent_id=1, class_id=1, academic_year="2023-2024"
+        ))
+        db.commit()
+        
+        first = client.post("/academic/attendance/", json={
+            "student_id": 1, "class_id": 1, "attendance_date": "2023-10-02", "status": "present"
+        }).json()
+        client.post("/academic/attendance/", json={
+            "student_id": 1, "class_id": 1, "attendance_date": "2023-11-06", "status": "absent"
+        })
+        roll_call = {
+            "class_id": 1, "attendance_date": "2023-10-03",
+            "attendance_records": [{"student_id": 1, "status": "present"}, {"student_id": 2, "status": "absent"}]
+        }
+        client.post("/academic/attendance/bulk", json=roll_call)
+        # Corrected roll call (upsert) and a corrected single record
+        roll_call["attendance_records"][1]["status"] = "late"
+        client.post("/academic/attendance/bulk", json=roll_call)
+        client.put(f"/academic/attendance/{first['id']}", json={"status": "excused"})
+        
+        rollup = {
+            (row.attendance_date.isoformat(), row.present, row.absent, row.late, row.excused)
+            for row in db.query(AttendanceDaily).all()
+        }
+        db.close()
+        assert rollup == {("2023-10-02", 0, 0, 0, 1), ("2023-10-03", 1, 0, 1, 0), ("2023-11-06", 0, 1, 0, 0)}
+        
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            weekdays = client.get("/academic/attendance/heatmap?group_by=weekday&class_id=1").json()
+            months = client.get("/academic/attendance/heatmap?group_by=month&academic_year=2023-2024").json()
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert not any("FROM attendance " in statement or "JOIN attendance " in statement for statement in statements)
+        
+        assert [(cell["key"], cell["school_days"], cell["total_records"]) for cell in weekdays["cells"]] == [
+            ("monday", 2, 2), ("tuesday", 1, 2)
+        ]
+        assert weekdays["cells"][1]["attendance_rate"] == 100.0
+        assert [(cell["key"], cell["present"], cell["late"], cell["excused"]) for cell in months["cells"]] == [
+            ("2023-10", 1, 1, 1), ("2023-11", 0, 0, 0)
+        ]
+        assert months["cells"][1]["attendance_rate"] == 0
     
     def test_update_attendance(self, setup_test_data):
         """Test updating an attendance record."""
@@ -0,0 +1,191 @@
+"""School calendar and the per-student attendance bitmaps"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from datetime import date
+
+from app.main import app
+from app.database.models import Base, Parent, Class, Student, AttendanceBitmap, User, AttendanceStatus
+from app.database.session import get_db
+from app.api.dependencies import get_current_user
+from app.services.attendance_bitmap_service import (
+    AttendanceBitmapService, set_day, longest_run, trailing_run, summarize, to_bits
+)
+
+engine = create_engine(
+    "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def client(db):
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, username="admin", role="admin")
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_current_user, None)
+
+@pytest.fixture
+def students(db):
+    parent = Parent(first_name="Karim", last_name="Haddad")
+    class_obj = Class(name="CP - Matin", level="CP", time_slot="10h-13h", capacity=30, academic_year="2023-2024")
+    db.add_all([parent, class_obj])
+    db.flush()
+    rows = [
+        Student(
+            first_name=f"Student{i}", last_name="Haddad", date_of_birth=date(2017, 1, 1), gender="M",
+            parent_id=parent.id, class_id=class_obj.id, academic_year="2023-2024"
+        )
+        for i in range(3)
+    ]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+# Two weeks of October 2023 with a holiday on Friday the 6th: 9 school days,
+# Monday 2 is day 0 and Friday 13 day 8
+CALENDAR = {
+    "start_date": "2023-10-02",
+    "end_date": "2023-10-15",
+    "holidays": [{"calendar_date": "2023-10-06", "description": "Journée pédagogique"}]
+}
+SCHOOL_DAYS = ["2023-10-02", "2023-10-03", "2023-10-04", "2023-10-05",
+               "2023-10-09", "2023-10-10", "2023-10-11", "2023-10-12", "2023-10-13"]
+
+def test_bit_operations():
+    planes = (0, 0, 0)
+    for index, status in enumerate([
+        AttendanceStatus.PRESENT, AttendanceStatus.ABSENT, AttendanceStatus.EXCUSED,
+        AttendanceStatus.ABSENT, AttendanceStatus.LATE
+    ]):
+        planes = set_day(planes, index, status)
+    assert planes == (0b11111, 0b01110, 0b10100)
+    # Overwriting a day clears its previous code
+    assert set_day(planes, 2, AttendanceStatus.PRESENT) == (0b11111, 0b01010, 0b10000)
+
+    assert longest_run(0b0111011) == 3
+    assert longest_run(0) == 0
+    assert trailing_run(0b0111011, 5) == 3
+    assert trailing_run(0b0111011, 6) == 0
+    assert trailing_run(0, -1) == 0
+
+    summary = summarize(1, "2023-2024", planes)
+    assert (summary.present_days, summary.late_days, summary.absent_days, summary.excused_days) == (1, 1, 2, 1)
+    assert (summary.attendance_rate, summary.absence_rate) == (40.0, 60.0)
+    assert (summary.longest_absence_streak, summary.current_absence_streak) == (3, 0)
+    assert summary.chronic_absence
+
+def test_calendar(client, db):
+    response = client.put("/academic/calendars/2023-2024", json=CALENDAR)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["school_days"] == 9
+    assert data["holidays"] == [{"calendar_date": "2023-10-06", "description": "Journée pédagogique"}]
+    assert client.get("/academic/calendars/2023-2024").json() == data
+    assert client.get("/academic/calendars/2022-2023").status_code == 404
+
+    overlapping = {"start_date": "2023-10-10", "end_date": "2023-10-20"}
+    response = client.put("/academic/calendars/2024-2025", json=overlapping)
+    assert response.status_code == 400
+    assert "2023-2024" in response.json()["detail"]
+    response = client.put("/academic/calendars/2023-2024", json={**CALENDAR, "end_date": "2023-09-01"})
+    assert response.status_code == 400
+
+    app.dependency_overrides[get_current_user] = lambda: User(id=2, username="teacher", role="teacher")
+    assert client.put("/academic/calendars/2023-2024", json=CALENDAR).status_code == 403
+
+def test_bitmaps_follow_attendance_writes(client, db, students):
+    client.put("/academic/calendars/2023-2024", json=CALENDAR)
+    first, second, third = (student.id for student in students)
+
+    # The first student misses the whole second week, the second is late
+    # once, the third only comes on Mondays
+    for day in SCHOOL_DAYS:
+        week_two = day >= "2023-10-09"
+        records = [
+            {"student_id": first, "status": "absent" if week_two else "present"},
+            {"student_id": second, "status": "late" if day == "2023-10-03" else "present"},
+            {"student_id": third, "status": "present" if day in ("2023-10-02", "2023-10-09") else "absent"},
+        ]
+        response = client.post("/academic/attendance/bulk", json={
+            "class_id": students[0].class_id, "attendance_date": day, "attendance_records": records
+        })
+        assert response.status_code == 201
+    # A record on the holiday is kept but not tracked
+    client.post("/academic/attendance/", json={
+        "student_id": second, "class_id": students[0].class_id, "attendance_date": "2023-10-06", "status": "absent"
+    })
+    # The last absence of the first student turns out to be excused
+    record = client.get(f"/academic/students/{first}/attendance?start_date=2023-10-13&end_date=2023-10-13").json()[0]
+    client.put(f"/academic/attendance/{record['id']}", json={"status": "excused"})
+
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        summary = client.get(f"/academic/students/{first}/attendance-summary?academic_year=2023-2024").json()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    assert len(statements) == 1 and "attendance_bitmaps" in statements[0]
+
+    assert summary["marked_days"] == 9
+    assert (summary["present_days"], summary["absent_days"], summary["excused_days"]) == (4, 4, 1)
+    assert (summary["longest_absence_streak"], summary["current_absence_streak"]) == (5, 5)
+    assert summary["chronic_absence"]
+
+    summary = client.get(f"/academic/students/{second}/attendance-summary?academic_year=2023-2024").json()
+    assert (summary["marked_days"], summary["late_days"], summary["attendance_rate"]) == (9, 1, 100.0)
+    assert not summary["chronic_absence"]
+
+    chronic = client.get(f"/academic/classes/{students[0].class_id}/chronic-absence?academic_year=2023-2024").json()
+    assert [(row["student_id"], row["longest_absence_streak"]) for row in chronic] == [(third, 4), (first, 5)]
+    assert client.get(
+        f"/academic/classes/{students[0].class_id}/chronic-absence?academic_year=2023-2024&threshold=0.6"
+    ).json()[0]["student_id"] == third
+
+    # The rebuild from the rows agrees with the maintained bitmaps
+    maintained = {
+        (bitmap.student_id, bitmap.marked, bitmap.status_high, bitmap.status_low)
+        for bitmap in db.query(AttendanceBitmap).all()
+    }
+    assert AttendanceBitmapService.rebuild_bitmaps(db) == 3
+    db.commit()
+    assert {
+        (bitmap.student_id, bitmap.marked, bitmap.status_high, bitmap.status_low)
+        for bitmap in db.query(AttendanceBitmap).populate_existing().all()
+    } == maintained
+
+def test_calendar_change_rebuilds_bitmaps(client, db, students):
+    client.put("/academic/calendars/2023-2024", json=CALENDAR)
+    client.post("/academic/attendance/", json={
+        "student_id": students[0].id, "class_id": students[0].class_id, "attendance_date": "2023-10-05", "status": "absent"
+    })
+    bitmap = db.get(AttendanceBitmap, (students[0].id, "2023-2024"))
+    assert to_bits(bitmap.status_high) == 1 << 3
+
+    # Dropping Monday the 2nd moves Thursday the 5th to position 2
+    client.put("/academic/calendars/2023-2024", json={**CALENDAR, "start_date": "2023-10-03"})
+    db.refresh(bitmap)
+    assert to_bits(bitmap.status_high) == 1 << 2
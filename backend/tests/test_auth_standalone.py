@@ -1,13 +1,18 @@
+import threading
+import time
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from passlib.context import CryptContext
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from app.main import app
-from app.database.models import Base, User
+from app.database.models import Base, User, RefreshToken
 from app.database.session import get_db
-from app.services.auth_service import AuthService
+from app.services import auth_service
+from app.services.auth_service import AuthService, UserCache, PasswordHasher
 
 # Create test database for auth tests
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_auth.db"
@@ -318,6 +323,244 @@ class TestPasswordManagement:
         assert "current password" in response.json()["detail"].lower()
 
 
+class TestUserCache:
+    """Test the authenticated-user cache and token versions."""
+
+    def _user_selects(self, client, token, calls):
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if "FROM users" in statement:
+                statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            for _ in range(calls):
+                response = client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+                assert response.status_code == 200
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        return len(statements)
+
+    def test_parallel_dashboard_calls_load_user_once(self, client, admin_token):
+        """Only the first request of a token reads the users table."""
+        assert self._user_selects(client, admin_token, 8) == 1
+        assert self._user_selects(client, admin_token, 8) == 0
+
+    def test_deactivation_takes_effect_immediately(self, client, admin_token, teacher_token, teacher_user):
+        """A cached teacher is refused as soon as an admin deactivates them."""
+        headers = {"Authorization": f"Bearer {teacher_token}"}
+        assert client.get("/auth/me", headers=headers).status_code == 200
+        client.put(f"/auth/users/{teacher_user.id}/deactivate", headers={"Authorization": f"Bearer {admin_token}"})
+        assert client.get("/auth/me", headers=headers).status_code == 401
+
+    def test_password_change_revokes_tokens(self, client, admin_token):
+        """Tokens issued before a password change stop working."""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        assert client.get("/auth/me", headers=headers).status_code == 200
+        response = client.put("/auth/change-password", headers=headers, json={
+            "current_password": "admin123", "new_password": "newpassword123"
+        })
+        assert response.status_code == 200
+        assert client.get("/auth/me", headers=headers).status_code == 401
+
+        token = client.post("/auth/login", json={"username": "admin", "password": "newpassword123"}).json()["access_token"]
+        assert AuthService.verify_token(token)["ver"] == 1
+        assert client.get("/auth/me", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+    def test_token_without_user_id(self, client, admin_user, db_session):
+        """Tokens issued before user ids were signed in work until the version changes."""
+        token = AuthService.create_access_token(data={"sub": "admin", "role": "admin"})
+        headers = {"Authorization": f"Bearer {token}"}
+        assert client.get("/auth/me", headers=headers).status_code == 200
+        admin_user.token_version = 1
+        db_session.commit()
+        assert client.get("/auth/me", headers=headers).status_code == 401
+
+    def test_cache_expiry_and_eviction(self, monkeypatch):
+        """Entries expire after the TTL and the least recently used one is evicted."""
+        cache = UserCache(ttl_seconds=30, max_size=2)
+        users = {i: User(id=i, username=f"user{i}") for i in (1, 2, 3)}
+        cache.set(("db", 1, 0), users[1])
+        cache.set(("db", 2, 0), users[2])
+        assert cache.get(("db", 1, 0)) is users[1]
+        cache.set(("db", 3, 0), users[3])
+        assert cache.get(("db", 2, 0)) is None
+        assert cache.get(("db", 1, 0)) is users[1]
+
+        cache.invalidate(1)
+        assert cache.get(("db", 1, 0)) is None
+
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 31)
+        assert cache.get(("db", 3, 0)) is None
+
+        disabled = UserCache(max_size=0)
+        disabled.set(("db", 1, 0), users[1])
+        assert disabled.get(("db", 1, 0)) is None
+
+
+class TestPasswordHasher:
+    """Test the bounded password hasher and cost factor upgrades."""
+
+    def test_login_rehashes_with_new_cost(self, client, admin_user, db_session, monkeypatch):
+        """A hash made with another cost factor is replaced on login."""
+        assert admin_user.password_hash.startswith(f"$2b${auth_service.BCRYPT_ROUNDS:02d}$")
+        monkeypatch.setattr(auth_service, "pwd_context", CryptContext(schemes=["bcrypt"], bcrypt__rounds=5))
+
+        response = client.post("/auth/login", json={"username": "admin", "password": "admin123"})
+        assert response.status_code == 200
+        db_session.refresh(admin_user)
+        assert admin_user.password_hash.startswith("$2b$05$")
+
+        # Already at the configured cost, the hash is left alone
+        current = admin_user.password_hash
+        assert client.post("/auth/login", json={"username": "admin", "password": "admin123"}).status_code == 200
+        db_session.refresh(admin_user)
+        assert admin_user.password_hash == current
+
+    def test_full_queue_is_refused(self):
+        """Work beyond the workers and the queue is turned away, not queued."""
+        hasher = PasswordHasher(workers=1, queue_size=1)
+        release = threading.Event()
+        running = hasher.submit(release.wait)
+        queued = hasher.submit(lambda: "done")
+        with pytest.raises(HTTPException) as error:
+            hasher.submit(lambda: "refused")
+        assert error.value.status_code == 503
+
+        release.set()
+        assert running.result() is True and queued.result() == "done"
+        # The slots are released once the work is done
+        assert hasher.run(lambda: "accepted") == "accepted"
+        hasher.executor.shutdown()
+
+
+class TestRefreshTokens:
+    """Test the refresh token flow."""
+
+    def _login(self, client):
+        response = client.post("/auth/login", json={"username": "admin", "password": "admin123"})
+        assert response.status_code == 200
+        return response.json()
+
+    def test_refresh_rotates_tokens_without_password_check(self, client, admin_user, db_session, monkeypatch):
+        """A refresh token buys a new pair once, without bcrypt."""
+        tokens = self._login(client)
+        assert tokens["refresh_expires_in"] == auth_service.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600
+        stored = db_session.query(RefreshToken).one()
+        assert stored.token_hash != tokens["refresh_token"]
+
+        def no_bcrypt(*args):
+            raise AssertionError("refresh must not hash passwords")
+        monkeypatch.setattr(auth_service.password_hasher, "submit", no_bcrypt)
+
+        response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == 200
+        renewed = response.json()
+        assert renewed["refresh_token"] != tokens["refresh_token"]
+        assert client.get("/auth/me", headers={"Authorization": f"Bearer {renewed['access_token']}"}).status_code == 200
+
+        # The new refresh token works in turn
+        response = client.post("/auth/refresh", json={"refresh_token": renewed["refresh_token"]})
+        assert response.status_code == 200
+
+    def test_reused_refresh_token_revokes_the_user_tokens(self, client, admin_user):
+        """Presenting a used refresh token revokes the newer one too."""
+        tokens = self._login(client)
+        renewed = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).json()
+
+        assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+        assert client.post("/auth/refresh", json={"refresh_token": renewed["refresh_token"]}).status_code == 401
+
+    def test_invalid_and_expired_refresh_tokens(self, client, admin_user, db_session):
+        """Unknown and expired refresh tokens are refused."""
+        assert client.post("/auth/refresh", json={"refresh_token": "not-a-token"}).status_code == 401
+
+        tokens = self._login(client)
+        db_session.query(RefreshToken).update({RefreshToken.expires_at: datetime.utcnow() - timedelta(seconds=1)})
+        db_session.commit()
+        assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+        # Expired tokens are dropped at the next login
+        self._login(client)
+        assert db_session.query(RefreshToken).count() == 1
+
+    def test_logout_and_password_change_revoke_refresh_tokens(self, client, admin_user):
+        """Logout revokes one refresh token, a password change all of them."""
+        tokens = self._login(client)
+        assert client.post("/auth/logout", json={"refresh_token": tokens["refresh_token"]}).status_code == 204
+        assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+        first, second = self._login(client), self._login(client)
+        response = client.put("/auth/change-password", headers={"Authorization": f"Bearer {first['access_token']}"}, json={
+            "current_password": "admin123", "new_password": "newpassword123"
+        })
+        assert response.status_code == 200
+        for tokens in (first, second):
+            assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+    def test_deactivated_user_cannot_refresh(self, client, admin_token, teacher_user):
+        """Deactivation revokes the user's refresh tokens."""
+        tokens = client.post("/auth/login", json={"username": "teacher", "password": "teacher123"}).json()
+        client.put(f"/auth/users/{teacher_user.id}/deactivate", headers={"Authorization": f"Bearer {admin_token}"})
+        assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+
+class TestClaimsMode:
+    """Test authorization from the role and version signed into the token."""
+
+    @pytest.fixture(autouse=True)
+    def claims_mode(self, monkeypatch):
+        monkeypatch.setattr(auth_service, "AUTH_MODE", "claims")
+
+    def _user_selects(self, client, token, method, url, expected_status):
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if "FROM users" in statement:
+                statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = client.request(method, url, headers={"Authorization": f"Bearer {token}"})
+            assert response.status_code == expected_status
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        return len(statements)
+
+    def test_role_checks_without_user_queries(self, client, admin_token, teacher_token):
+        """Once the version table is loaded, role checks read no user row."""
+        assert self._user_selects(client, teacher_token, "GET", "/students/", 200) == 1
+        assert self._user_selects(client, teacher_token, "GET", "/students/", 200) == 0
+        assert self._user_selects(client, teacher_token, "GET", "/auth/users", 403) == 0
+        assert self._user_selects(client, admin_token, "GET", "/students/", 200) == 0
+
+    def test_deactivation_takes_effect_immediately(self, client, admin_token, teacher_token, teacher_user):
+        """A deactivated user's token is refused at the next request."""
+        headers = {"Authorization": f"Bearer {teacher_token}"}
+        assert client.get("/students/", headers=headers).status_code == 200
+        client.put(f"/auth/users/{teacher_user.id}/deactivate", headers={"Authorization": f"Bearer {admin_token}"})
+        assert client.get("/students/", headers=headers).status_code == 401
+
+    def test_new_and_changed_users(self, client, admin_token):
+        """Users created after the table was loaded can sign in, old versions are refused."""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        assert client.get("/students/", headers=headers).status_code == 200
+        response = client.post("/auth/register", headers=headers, json={
+            "username": "desk", "email": "desk@school.com", "first_name": "Front", "last_name": "Desk",
+            "password": "desk123", "role": "registration"
+        })
+        assert response.status_code == 201
+        token = client.post("/auth/login", json={"username": "desk", "password": "desk123"}).json()["access_token"]
+        assert client.get("/students/", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+        stale = AuthService.create_access_token(data={"sub": "desk", "role": "admin", "uid": response.json()["id"], "ver": 7})
+        assert client.get("/students/", headers={"Authorization": f"Bearer {stale}"}).status_code == 401
+
+    def test_me_returns_the_full_user(self, client, admin_token):
+        """Endpoints that need the whole row still load it."""
+        response = client.get("/auth/me", headers={"Authorization": f"Bearer {admin_token}"})
+        assert response.status_code == 200
+        assert response.json()["email"] == "admin@school.com"
+
+
 class TestAuthService:
     """Test AuthService functionality."""
 
@@ -235,3 +235,45 @@ def test_delete_class_with_students(test_db):
     
     assert exc_info.value.status_code == 400
     assert "Cannot delete class" in str(exc_info.value.detail)
+
+def test_class_listings_need_no_count_queries(test_db):
+    """Listing classes costs the same number of queries whatever their number"""
+    from sqlalchemy import event
+    from app.services.registration_service import get_available_classes
+    db = test_db
+    
+    parent = Parent(first_name="Test", last_name="Parent")
+    db.add(parent)
+    db.flush()
+    for i in range(12):
+        class_obj = Class(name=f"Class {i}", level="CP", time_slot="10h-13h", capacity=2, academic_year="2023-2024")
+        db.add(class_obj)
+        db.flush()
+        # Class i has i % 3 confirmed students and one pending
+        for status in [RegistrationStatus.CONFIRMED] * (i % 3) + [RegistrationStatus.PENDING]:
+            db.add(Student(
+                first_name="Test", last_name="Student", date_of_birth=date(2010, 1, 1),
+                gender="M", parent_id=parent.id, class_id=class_obj.id,
+                registration_status=status, academic_year="2023-2024"
+            ))
+    db.commit()
+    
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        classes = get_classes(db=db, academic_year="2023-2024")
+        listing_queries = len(statements)
+        available = get_available_classes(db, "2023-2024")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    
+    # Enrollment comes with the classes themselves
+    assert listing_queries == 1
+    assert len(statements) == 2
+    
+    assert [c["enrolled_students"] for c in classes] == [i % 3 for i in range(12)]
+    assert [c["available_spots"] for c in classes] == [2 - i % 3 for i in range(12)]
+    assert [c["name"] for c in available] == [f"Class {i}" for i in range(12) if i % 3 < 2]
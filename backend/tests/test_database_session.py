@@ -0,0 +1,33 @@
+"""Test the SQLite connection profiles applied by the database session module"""
+import pytest
+from sqlalchemy import text
+
+from app.database.session import create_sqlite_engine, SQLITE_PROFILES
+
+def _pragma(engine, name):
+    with engine.connect() as connection:
+        return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+def test_performance_profile_applied_on_connect(tmp_path):
+    """Every new connection should run in WAL mode with the tuned settings"""
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'perf.db'}", profile="performance")
+    pragmas = SQLITE_PROFILES["performance"]
+    
+    assert _pragma(engine, "journal_mode").lower() == "wal"
+    assert _pragma(engine, "synchronous") == 1  # NORMAL
+    assert _pragma(engine, "cache_size") == pragmas["cache_size"]
+    assert _pragma(engine, "busy_timeout") == pragmas["busy_timeout"]
+    assert _pragma(engine, "temp_store") == 2  # MEMORY
+    engine.dispose()
+
+def test_default_profile_leaves_sqlite_settings(tmp_path):
+    """The default profile should keep SQLite's rollback journal"""
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'plain.db'}", profile="default")
+    
+    assert _pragma(engine, "journal_mode").lower() == "delete"
+    engine.dispose()
+
+def test_unknown_profile_rejected(tmp_path):
+    """Unknown profile names should fail loudly instead of silently doing nothing"""
+    with pytest.raises(ValueError):
+        create_sqlite_engine(f"sqlite:///{tmp_path / 'x.db'}", profile="turbo")
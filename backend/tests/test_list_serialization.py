@@ -0,0 +1,133 @@
+"""List endpoints validate their rows once and encode them straight to JSON"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from datetime import date, datetime
+from typing import List
+
+from app.main import app
+from app.database.models import (
+    Base, Parent, Class, Student, StudentFlag, Payment, PaymentType, Subject, Grade, GradeType, AcademicPeriod, User
+)
+from app.database.session import get_db
+from app.api.dependencies import get_current_user
+from app.api.pagination import PaginatedResponse
+from app.api.utils import json_response, response_adapter
+from app.schemas.student import Student as StudentSchema
+from app.schemas.payment import PaymentResponse
+from app.schemas.academic import Grade as GradeSchema
+
+engine = create_engine(
+    "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def client(db):
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, username="admin", role="admin")
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_current_user, None)
+
+@pytest.fixture
+def students(db):
+    parent = Parent(first_name="Karim", last_name="Haddad", phone="0612345678", mobile="0698765432")
+    class_obj = Class(name="CE1 - Matin", level="CE1", time_slot="10h-13h", capacity=30, academic_year="2024-2025")
+    db.add_all([parent, class_obj])
+    db.flush()
+    students = [
+        Student(
+            first_name=name, last_name="Haddad", date_of_birth=date(2016, 1, 1 + i), gender="F",
+            parent_id=parent.id, class_id=class_obj.id, academic_year="2024-2025"
+        )
+        for i, name in enumerate(["Amira", "Bilal", "Yasmine"])
+    ]
+    db.add_all(students)
+    db.flush()
+    db.add(StudentFlag(student_id=students[0].id, flag_type="late_payment", reason="Two months late", flagged_by=1))
+    db.add_all([
+        Payment(
+            student_id=student.id, amount=100 + i, payment_method="Cash", payment_type=PaymentType.QUARTERLY,
+            payment_date=datetime(2024, 10, 1 + i, 9, 30), receipt_number=f"2024-00000{i + 1}"
+        )
+        for i, student in enumerate(students)
+    ])
+    db.commit()
+    return students
+
+def expected_page(db, schema, model, size, next_cursor):
+    """The page as FastAPI encoded it before: validated models, dumped by alias"""
+    rows = db.query(model).order_by(model.id).all()
+    page = PaginatedResponse[schema](
+        items=[schema.model_validate(row) for row in rows[:size]], total=len(rows), page=1, size=size,
+        pages=(len(rows) + size - 1) // size, has_next=len(rows) > size, has_previous=False,
+        next_cursor=next_cursor
+    )
+    return page.model_dump(mode="json", by_alias=True)
+
+def test_students_page_matches_validated_models(client, db, students):
+    response = client.get("/students/", params={"size": 2, "sort_by": "id"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == expected_page(db, StudentSchema, Student, 2, response.json()["next_cursor"])
+    first = response.json()["items"][0]
+    # Aliased and nested fields as the response_model declares them
+    assert first["class"]["name"] == "CE1 - Matin"
+    assert first["parent"]["first_name"] == "Karim"
+    assert [flag["flag_type"] for flag in first["flags"]] == ["late_payment"]
+
+def test_payments_page_matches_validated_models(client, db, students):
+    response = client.get("/payments/", params={"size": 2, "sort_by": "id", "sort_order": "asc"})
+    assert response.status_code == 200
+    assert response.json()["next_cursor"]
+    assert response.json() == expected_page(db, PaymentResponse, Payment, 2, response.json()["next_cursor"])
+
+def test_parents_and_academic_lists(client, db, students):
+    assert client.get("/parents/").json() == [{
+        "id": students[0].parent_id, "first_name": "Karim", "last_name": "Haddad", "phone": "0612345678",
+        "email": None, "address": None, "emergency_contact": "0698765432"
+    }]
+    assert client.get("/parents/", params={"search": "-"}).json() == []
+    assert len(client.get("/parents/", params={"search": "06"}).json()) == 1
+
+    subject = Subject(name="Mathematics", code="MATH", class_id=students[0].class_id, academic_year="2024-2025")
+    db.add(subject)
+    db.flush()
+    db.add(Grade(
+        student_id=students[0].id, subject_id=subject.id, grade_value=15.5, grade_type=GradeType.EXAM,
+        academic_period=AcademicPeriod.FIRST_TERM, academic_year="2024-2025", assessment_date=date(2024, 11, 4)
+    ))
+    db.commit()
+
+    assert [item["code"] for item in client.get("/academic/subjects/").json()] == ["MATH"]
+    grades = client.get(f"/academic/students/{students[0].id}/grades").json()
+    expected = [GradeSchema.model_validate(grade).model_dump(mode="json") for grade in db.query(Grade).all()]
+    assert grades == expected
+
+def test_json_response_rejects_invalid_rows():
+    # Rows are still validated against the response type
+    with pytest.raises(ValueError):
+        json_response(List[GradeSchema], [{"id": "not a number"}])
+    assert response_adapter(List[GradeSchema]) is response_adapter(List[GradeSchema])
@@ -1,6 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime, date
 
@@ -285,6 +285,27 @@ class TestPaymentPagination:
         expected_count = 8  # First 8 payments are INSCRIPTION
         assert data["total"] == expected_count
 
+    def test_payment_filter_by_type_value(self, client, sample_data, auth_headers):
+        """The type can also be given by value, as when recording a payment."""
+        response = client.get("/payments?payment_type=quarterly&size=50", headers=auth_headers)
+        assert response.json()["total"] == 7
+        
+        response = client.get("/payments?payment_type=refund&size=50", headers=auth_headers)
+        assert response.json()["total"] == 0
+
+    def test_payment_filter_by_date_range(self, client, sample_data, auth_headers):
+        """Both ends of the date range are included."""
+        response = client.get("/payments?date_from=2024-03-15&date_to=2024-03-15&size=50", headers=auth_headers)
+        assert response.status_code == 200
+        
+        data = response.json()
+        # Payments 3 and 15 fall on March 15th
+        assert data["total"] == 2
+        assert all(payment["payment_date"].startswith("2024-03-15") for payment in data["items"])
+        
+        response = client.get("/payments?date_from=2024-03-16&date_to=2024-04-14&size=50", headers=auth_headers)
+        assert response.json()["total"] == 0
+
     def test_payment_filter_by_amount_range(self, client, sample_data, auth_headers):
         """Test filtering payments by amount range."""
         response = client.get("/payments?min_amount=100&max_amount=250&size=50", headers=auth_headers)
@@ -321,6 +342,118 @@ class TestClassPagination:
         data = response.json()
         assert data["total"] == 1  # Only one class with "Maternelle 1"
 
+class TestCursorPagination:
+    def _walk(self, client, auth_headers, url):
+        """Follow next_cursor from the first page until the last one."""
+        response = client.get(url, headers=auth_headers)
+        assert response.status_code == 200
+        pages = [response.json()]
+        while pages[-1]["next_cursor"]:
+            response = client.get(f"{url}&cursor={pages[-1]['next_cursor']}", headers=auth_headers)
+            assert response.status_code == 200
+            pages.append(response.json())
+        return pages
+
+    def test_student_cursor_walk_matches_offset_order(self, client, sample_data, auth_headers):
+        """Walking the cursor chain should visit every student once, in sort order."""
+        pages = self._walk(client, auth_headers, "/students?size=7&sort_by=last_name")
+        cursor_ids = [s["id"] for page in pages for s in page["items"]]
+        
+        offset = client.get("/students?size=100&sort_by=last_name", headers=auth_headers).json()
+        assert cursor_ids == [s["id"] for s in offset["items"]]
+        assert len(cursor_ids) == 25
+        assert len(pages) == 4
+        assert pages[1]["page"] is None
+        assert pages[1]["has_previous"] is True
+        assert pages[-1]["has_next"] is False
+        assert all(page["total"] == 25 for page in pages)
+
+    def test_payment_cursor_walk_descending_dates(self, client, sample_data, auth_headers):
+        """Payments walked newest first should come back in non-increasing date order."""
+        pages = self._walk(client, auth_headers, "/payments?size=4&sort_by=payment_date&sort_order=desc")
+        payments = [p for page in pages for p in page["items"]]
+        
+        assert len(payments) == 15
+        assert len({p["id"] for p in payments}) == 15
+        for i in range(len(payments) - 1):
+            assert payments[i]["payment_date"] >= payments[i + 1]["payment_date"]
+
+    def test_cursor_with_filters(self, client, sample_data, auth_headers):
+        """Cursor pages should keep applying the filters of the request."""
+        pages = self._walk(client, auth_headers, "/students?size=5&class_id=1")
+        students = [s for page in pages for s in page["items"]]
+        assert len(students) == 13
+        assert all(s["class_id"] == 1 for s in students)
+
+    def test_unindexed_sort_field_rejected(self, client, sample_data, auth_headers):
+        """Sorting is restricted to index-backed columns."""
+        response = client.get("/students?sort_by=place_of_birth", headers=auth_headers)
+        assert response.status_code == 400
+
+    def test_invalid_cursor_rejected(self, client, sample_data, auth_headers):
+        """Garbage or mismatched cursors should be refused rather than ignored."""
+        response = client.get("/students?cursor=not-a-cursor", headers=auth_headers)
+        assert response.status_code == 400
+        
+        first = client.get("/students?size=5&sort_by=first_name", headers=auth_headers).json()
+        response = client.get(f"/students?sort_by=last_name&cursor={first['next_cursor']}", headers=auth_headers)
+        assert response.status_code == 400
+
+class TestTotalCounts:
+    def _count_queries(self, client, auth_headers, url):
+        """Issue a request and return (response json, number of COUNT queries run)."""
+        counts = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT COUNT"):
+                counts.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = client.get(url, headers=auth_headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert response.status_code == 200
+        return response.json(), len(counts)
+
+    def test_without_total_skips_count(self, client, sample_data, auth_headers):
+        """include_total=false should page with a single query and still report has_next."""
+        data, counts = self._count_queries(client, auth_headers, "/students?size=10&include_total=false")
+        assert counts == 0
+        assert data["total"] is None
+        assert data["pages"] is None
+        assert len(data["items"]) == 10
+        assert data["has_next"] is True
+        
+        data, _ = self._count_queries(client, auth_headers, "/students?page=3&size=10&include_total=false")
+        assert len(data["items"]) == 5
+        assert data["has_next"] is False
+
+    def test_total_is_cached_per_filter_signature(self, client, sample_data, auth_headers):
+        """Repeating a filtered listing (any page or sort) should reuse the cached total."""
+        data, counts = self._count_queries(client, auth_headers, "/students?class_id=1&size=5")
+        assert (data["total"], counts) == (13, 1)
+        
+        data, counts = self._count_queries(client, auth_headers, "/students?class_id=1&size=5&page=2&sort_by=last_name")
+        assert (data["total"], counts) == (13, 0)
+        
+        # Different filters are counted separately
+        data, counts = self._count_queries(client, auth_headers, "/students?class_id=2&size=5")
+        assert (data["total"], counts) == (12, 1)
+
+    def test_write_invalidates_cached_total(self, client, sample_data, auth_headers):
+        """Creating a student should be reflected in the next total right away."""
+        data, _ = self._count_queries(client, auth_headers, "/students?class_id=1")
+        assert data["total"] == 13
+        
+        response = client.post("/students/", json={
+            "first_name": "New", "last_name": "Student", "date_of_birth": "2018-01-01",
+            "gender": "M", "parent_id": sample_data["parents"][0].id,
+            "class_id": sample_data["classes"][0].id, "academic_year": "2024-2025"
+        }, headers=auth_headers)
+        assert response.status_code == 200
+        
+        data, counts = self._count_queries(client, auth_headers, "/students?class_id=1")
+        assert (data["total"], counts) == (14, 1)
+
 class TestPaginationEdgeCases:
     def test_invalid_page_number(self, client, sample_data, auth_headers):
         """Test handling of invalid page numbers."""
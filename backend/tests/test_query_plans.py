@@ -0,0 +1,173 @@
+"""Check that hot service queries are served by indexes rather than full table scans"""
+import re
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from datetime import date, datetime
+
+from app.database.models import (
+    Base, Parent, Class, Student, Subject, Grade, Attendance, Payment,
+    RegistrationStatus, PaymentType, GradeType, AcademicPeriod, AttendanceStatus
+)
+from app.database.migrations import run_migrations
+from app.api.search import PaymentSearchFilters, apply_payment_filters
+from app.schemas.academic import AttendanceCreate
+from app.services import class_service, registration_service
+from app.services.academic_service import GradeService, AttendanceService
+
+INDEXED_TABLES = {"students", "payments", "grades", "attendance", "student_flags"}
+
+@pytest.fixture
+def test_db():
+    """In-memory database with a little data in every hot table"""
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = TestingSessionLocal()
+    
+    parent = Parent(first_name="Test", last_name="Parent", phone="123456")
+    class_obj = Class(name="CP - Matin", level="CP", time_slot="10h-13h", capacity=20, academic_year="2024-2025")
+    db.add_all([parent, class_obj])
+    db.flush()
+    student = Student(
+        first_name="Test", last_name="Student", date_of_birth=date(2017, 1, 1), gender="M",
+        parent_id=parent.id, class_id=class_obj.id, academic_year="2024-2025",
+        registration_status=RegistrationStatus.PENDING
+    )
+    subject = Subject(name="Arabic", code="ARAB", class_id=class_obj.id, academic_year="2024-2025")
+    db.add_all([student, subject])
+    db.flush()
+    db.add_all([
+        Grade(
+            student_id=student.id, subject_id=subject.id, grade_value=15, max_grade=20,
+            grade_type=GradeType.TEST, academic_period=AcademicPeriod.FIRST_TERM,
+            academic_year="2024-2025", assessment_date=date(2024, 10, 1)
+        ),
+        Attendance(
+            student_id=student.id, class_id=class_obj.id, attendance_date=date(2024, 10, 1),
+            status=AttendanceStatus.PRESENT
+        ),
+        Payment(
+            student_id=student.id, amount=100, payment_method="Cash",
+            payment_type=PaymentType.INSCRIPTION, payment_date=datetime(2024, 9, 1)
+        ),
+    ])
+    db.commit()
+    
+    try:
+        yield db, engine, {"student_id": student.id, "class_id": class_obj.id, "subject_id": subject.id}
+    finally:
+        db.close()
+
+class QueryRecorder:
+    """Collect the SELECT statements an engine executes"""
+    
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+    
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.statements.append((statement, parameters))
+    
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+    
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+def assert_no_full_scans(engine, statements):
+    """Run EXPLAIN QUERY PLAN on each statement and fail on a full scan of an indexed table"""
+    assert statements, "no queries were recorded"
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            for row in plan:
+                detail = row[-1]
+                words = detail.split()
+                if words[0] == "SCAN" and words[1] in INDEXED_TABLES and "INDEX" not in detail:
+                    pytest.fail(f"Full table scan ({detail}) in:\n{statement}")
+
+def test_capacity_checks_use_class_status_index(test_db):
+    db, engine, ids = test_db
+    with QueryRecorder(engine) as recorder:
+        registration_service.confirm_registration(db=db, student_id=ids["student_id"])
+        class_service.get_class(db=db, class_id=ids["class_id"])
+    assert_no_full_scans(engine, recorder.statements)
+
+def test_attendance_queries_use_indexes(test_db):
+    db, engine, ids = test_db
+    with QueryRecorder(engine) as recorder:
+        AttendanceService.create_attendance(db, AttendanceCreate(
+            student_id=ids["student_id"], class_id=ids["class_id"],
+            attendance_date=date(2024, 10, 2), status="absent"
+        ), recorded_by=None)
+        AttendanceService.get_student_attendance(db, ids["student_id"], start_date=date(2024, 9, 1))
+        AttendanceService.get_class_attendance(db, ids["class_id"], date(2024, 10, 1))
+        AttendanceService.get_attendance_statistics(db, ids["student_id"])
+    assert_no_full_scans(engine, recorder.statements)
+
+def test_grade_queries_use_indexes(test_db):
+    db, engine, ids = test_db
+    with QueryRecorder(engine) as recorder:
+        GradeService.get_student_grades(db, ids["student_id"], subject_id=ids["subject_id"], academic_period="FIRST_TERM")
+        GradeService.get_grade_statistics(db, ids["student_id"], subject_id=ids["subject_id"])
+        GradeService.get_class_grades(db, ids["class_id"])
+    assert_no_full_scans(engine, recorder.statements)
+
+def test_student_payment_history_uses_index(test_db):
+    db, engine, ids = test_db
+    with QueryRecorder(engine) as recorder:
+        query = apply_payment_filters(db.query(Payment), PaymentSearchFilters(student_id=ids["student_id"]))
+        query.order_by(Payment.payment_date.desc()).all()
+    assert_no_full_scans(engine, recorder.statements)
+
+def payment_plans(engine, statements):
+    """EXPLAIN QUERY PLAN details of the statements that read payments"""
+    plans = []
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            if "FROM payments" in statement:
+                plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+                plans.append(" | ".join(row[-1] for row in plan))
+    assert plans, "no payment queries were recorded"
+    return plans
+
+@pytest.mark.parametrize("payment_type", [None, "quarterly"])
+def test_monthly_payment_listing_uses_index_range_scan(test_db, payment_type):
+    db, engine, ids = test_db
+    filters = PaymentSearchFilters(date_from=date(2024, 9, 1), date_to=date(2024, 9, 30), payment_type=payment_type)
+    with QueryRecorder(engine) as recorder:
+        query = apply_payment_filters(db.query(Payment), filters)
+        query.order_by(Payment.payment_date.desc(), Payment.id.desc()).limit(20).all()
+        query.count()
+    listing, count = payment_plans(engine, recorder.statements)
+    # Read in index order between the two bounds, no sort step
+    assert re.fullmatch(r"SEARCH payments USING INDEX ix_payments_\w+ \(payment_date>\? AND payment_date<\?\)", listing)
+    # The type is checked in the index, the count never reads the table
+    index = "ix_payments_date_type" if payment_type else "ix_payments_\\w+"
+    assert re.fullmatch(rf"SEARCH payments USING COVERING INDEX {index} \(payment_date>\? AND payment_date<\?\)", count)
+
+def test_migration_adds_indexes_to_existing_database(tmp_path):
+    """An old database without the new indexes gets them, duplicates are collapsed first"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                connection.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        connection.execute(text(
+            "INSERT INTO attendance (student_id, class_id, attendance_date, status) VALUES "
+            "(1, 1, '2024-10-01', 'ABSENT'), (1, 1, '2024-10-01', 'PRESENT')"
+        ))
+    
+    assert "0001" in run_migrations(engine)
+    assert run_migrations(engine) == []
+    
+    with engine.connect() as connection:
+        index_names = set(connection.execute(text("SELECT name FROM sqlite_master WHERE type='index'")).scalars())
+        statuses = connection.execute(text("SELECT status FROM attendance")).scalars().all()
+    assert {"ix_students_class_status", "uq_attendance_student_class_date", "ix_payments_student_date",
+            "ix_payments_date_type"} <= index_names
+    assert statuses == ["PRESENT"]
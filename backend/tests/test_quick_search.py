@@ -0,0 +1,153 @@
+"""Quick search answered from the in-memory autocomplete index"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from datetime import date
+
+from app.main import app
+from app.database.models import Base, Parent, Class, Student, User
+from app.database.session import get_db
+from app.api.dependencies import get_current_user
+from app.services import autocomplete_service
+from app.services.autocomplete_service import AutocompleteIndex
+
+engine = create_engine(
+    "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture
+def client():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    parent = Parent(first_name="Karim", last_name="Ben Ali", phone="0611223344", email="karim@example.com")
+    other_parent = Parent(first_name="Sara", last_name="Haddad", phone="0655667788")
+    class_obj = Class(name="CP - Matin", level="CP", time_slot="10h-13h", capacity=30, academic_year="2024-2025")
+    db.add_all([parent, other_parent, class_obj])
+    db.flush()
+    for first_name, last_name, parent_id in [
+        ("Yasmine", "Ben Ali", parent.id), ("Adam", "Ben Ali", parent.id), ("Alia", "Haddad", other_parent.id)
+    ]:
+        db.add(Student(
+            first_name=first_name, last_name=last_name, date_of_birth=date(2017, 1, 1), gender="F",
+            parent_id=parent_id, class_id=class_obj.id, academic_year="2024-2025"
+        ))
+    db.commit()
+    db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, username="admin", role="admin")
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_current_user, None)
+        Base.metadata.drop_all(bind=engine)
+
+def names(response):
+    assert response.status_code == 200
+    return [f"{item['first_name']} {item['last_name']}" for item in response.json()]
+
+def test_index_orders_prefix_matches_before_substrings():
+    index = AutocompleteIndex()
+    index.add(1, ("Malik Rahmani",), ("malik", "rahmani", 1))
+    index.add(2, ("Ali Haddad",), ("ali", "haddad", 2))
+    index.add(3, ("Alia Benali",), ("alia", "benali", 3))
+    # Word-start matches compare separator-free: "aliabenali" < "alihaddad"
+    assert index.search("ali") == [3, 2, 1]
+    assert index.search("ALI", limit=1) == [3]
+    assert index.search("had") == [2]
+    assert index.search("ma") == [1]
+
+    index.add(2, ("Ali Mansour",), ("ali", "mansour", 2))
+    assert index.search("had") == []
+    index.remove(3)
+    assert index.search("ali") == [2, 1]
+
+def test_index_ignores_accents_and_separators():
+    index = AutocompleteIndex()
+    index.add(1, ("Yasmine Benaïssa",), ("yasmine", "benaissa", 1))
+    index.add(2, ("Abd el Kader Mansouri",), ("abdelkader", "mansouri", 2))
+    assert index.search("benais") == [1]
+    assert index.search("BÉNAÏ") == [1]
+    assert index.search("abdel") == [2]
+    assert index.search("el kad") == [2]
+    assert index.search("delka") == [2]
+
+def test_quick_search_students(client):
+    assert names(client.get("/quick-search/students?search=ben")) == ["Adam Ben Ali", "Yasmine Ben Ali"]
+    # Word-start matches are ordered by the matched text: "ali" before "alia haddad"
+    assert names(client.get("/quick-search/students?search=ali")) == ["Adam Ben Ali", "Yasmine Ben Ali", "Alia Haddad"]
+    response = client.get("/quick-search/students?search=yasmine b")
+    assert response.json()[0]["class"]["name"] == "CP - Matin"
+    assert names(client.get("/quick-search/students?search=nobody")) == []
+
+def test_quick_search_parents_by_name_phone_and_email(client):
+    assert names(client.get("/quick-search/parents?search=sara")) == ["Sara Haddad"]
+    assert names(client.get("/quick-search/parents?search=0611")) == ["Karim Ben Ali"]
+    assert names(client.get("/quick-search/parents?search=example.com")) == ["Karim Ben Ali"]
+
+def test_parent_search_does_not_query_the_database(client):
+    client.get("/quick-search/parents?search=sara")
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        assert names(client.get("/quick-search/parents?search=kar")) == ["Karim Ben Ali"]
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert statements == []
+
+def test_service_writes_update_the_index(client):
+    assert names(client.get("/quick-search/students?search=ada")) == ["Adam Ben Ali"]
+    parent_id = client.get("/quick-search/parents?search=karim").json()[0]["id"]
+
+    response = client.post("/students/", json={
+        "first_name": "Adel", "last_name": "Ben Ali", "date_of_birth": "2018-01-01",
+        "gender": "M", "parent_id": parent_id, "academic_year": "2024-2025"
+    })
+    assert response.status_code == 200
+    adel_id = response.json()["id"]
+    assert names(client.get("/quick-search/students?search=ad")) == ["Adam Ben Ali", "Adel Ben Ali"]
+
+    response = client.put(f"/students/{adel_id}", json={"first_name": "Nour"})
+    assert response.status_code == 200
+    assert names(client.get("/quick-search/students?search=ad")) == ["Adam Ben Ali"]
+    assert names(client.get("/quick-search/students?search=nour")) == ["Nour Ben Ali"]
+
+    response = client.put(f"/parents/{parent_id}", json={"phone": "0700000000"})
+    assert response.status_code == 200
+    assert names(client.get("/quick-search/parents?search=0611")) == []
+    assert names(client.get("/quick-search/parents?search=0700")) == ["Karim Ben Ali"]
+
+    response = client.delete(f"/students/{adel_id}")
+    assert response.status_code == 200
+    assert names(client.get("/quick-search/students?search=nour")) == []
+
+def test_rolled_back_changes_are_not_indexed(client):
+    client.get("/quick-search/students?search=ada")
+    db = TestingSessionLocal()
+    student = db.query(Student).filter(Student.first_name == "Adam").one()
+    student.first_name = "Zaid"
+    db.flush()
+    db.rollback()
+    db.close()
+    assert names(client.get("/quick-search/students?search=ada")) == ["Adam Ben Ali"]
+    assert names(client.get("/quick-search/students?search=zaid")) == []
+
+def test_rebuild_picks_up_raw_writes(client):
+    client.get("/quick-search/students?search=ada")
+    with engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE students SET first_name = 'Zaid' WHERE first_name = 'Adam'")
+    autocomplete_service.rebuild(engine)
+    assert names(client.get("/quick-search/students?search=zaid")) == ["Zaid Ben Ali"]
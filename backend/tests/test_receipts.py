@@ -0,0 +1,158 @@
+"""Receipt numbers (block allocation per year) and cached PDF receipts"""
+import os
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from datetime import date, datetime
+from weakref import WeakKeyDictionary
+
+from app.main import app
+from app.database.models import Base, Parent, Class, Student, Payment, PaymentType, ReceiptSequence, User
+from app.database.session import get_db, create_sqlite_engine, backend_dir
+from app.api.dependencies import get_current_user
+from app.schemas.payment import PaymentCreate
+from app.services import receipt_service, payment_service
+from app.services.receipt_service import ReceiptNumberAllocator
+
+engine = create_engine(
+    "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture
+def db(monkeypatch):
+    # Blocks reserved in a previous test's database must not be reused
+    monkeypatch.setattr(receipt_service, "_allocators", WeakKeyDictionary())
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(receipt_service, "RECEIPT_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+@pytest.fixture
+def client(db, cache_dir):
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, username="admin", role="admin")
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_current_user, None)
+
+@pytest.fixture
+def student(db):
+    parent = Parent(first_name="Karim", last_name="Haddad")
+    class_obj = Class(name="CE1 - Matin", level="CE1", time_slot="10h-13h", capacity=30, academic_year="2024-2025")
+    db.add_all([parent, class_obj])
+    db.flush()
+    student = Student(
+        first_name="Amira", last_name="Haddad", date_of_birth=date(2016, 1, 1), gender="F",
+        parent_id=parent.id, class_id=class_obj.id, academic_year="2024-2025"
+    )
+    db.add(student)
+    db.commit()
+    return student
+
+def test_make_payment_numbers_receipts(db, student):
+    numbers = [
+        payment_service.make_payment(db, PaymentCreate(
+            student_id=student.id, amount=100, payment_method="Cash", payment_type="quarterly"
+        )).receipt_number
+        for _ in range(3)
+    ]
+    year = datetime.now().year
+    assert numbers == [f"{year}-000001", f"{year}-000002", f"{year}-000003"]
+    # One block reserved for the three of them
+    sequence = db.query(ReceiptSequence).one()
+    assert (sequence.prefix, sequence.next_value) == (str(year), 1 + receipt_service.RECEIPT_BLOCK_SIZE)
+
+def test_blocks_per_year_prefix(db):
+    allocator = ReceiptNumberAllocator(engine, block_size=2)
+    assert [allocator.allocate("2024") for _ in range(5)] == [1, 2, 3, 4, 5]
+    assert allocator.allocate("2025") == 1
+    # A second process gets the next block, never a number already handed out
+    other = ReceiptNumberAllocator(engine, block_size=2)
+    assert [other.allocate("2024"), other.allocate("2024"), allocator.allocate("2024")] == [7, 8, 6]
+    with pytest.raises(ValueError):
+        ReceiptNumberAllocator(engine, block_size=0)
+
+def test_concurrent_desks_get_unique_numbers(tmp_path):
+    file_engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'receipts.db'}")
+    Base.metadata.create_all(bind=file_engine)
+    # Two processes, each with threads recording payments
+    allocators = [ReceiptNumberAllocator(file_engine, block_size=10) for _ in range(2)]
+    numbers = []
+    lock = threading.Lock()
+
+    def desk(allocator):
+        allocated = [allocator.allocate("2024") for _ in range(100)]
+        with lock:
+            numbers.extend(allocated)
+
+    threads = [threading.Thread(target=desk, args=(allocators[i % 2],)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(numbers) == len(set(numbers)) == 800
+    with file_engine.connect() as connection:
+        next_value = connection.execute(ReceiptSequence.__table__.select()).one().next_value
+    # Every number handed out came from a reserved block
+    assert max(numbers) < next_value <= 800 + 2 * 10 + 1
+    file_engine.dispose()
+
+def test_receipt_is_rendered_once(client, db, student, cache_dir, monkeypatch):
+    payment = payment_service.make_payment(db, PaymentCreate(
+        student_id=student.id, amount=150, payment_method="Cash", payment_type="inscription", notes="Frais & fournitures"
+    ))
+    rendered = []
+    render_receipt = receipt_service.render_receipt
+    monkeypatch.setattr(receipt_service, "render_receipt", lambda receipt: rendered.append(receipt) or render_receipt(receipt))
+
+    response = client.get(f"/payments/{payment.id}/receipt")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert f"receipt_{payment.receipt_number}.pdf" in response.headers["content-disposition"]
+    assert response.content.startswith(b"%PDF")
+    assert rendered[0]["student_name"] == "Amira Haddad"
+    assert rendered[0]["amount"] == "150.00"
+
+    # The reprint comes from the cache
+    assert client.get(f"/payments/{payment.id}/receipt").content == response.content
+    assert len(rendered) == 1
+    assert [path.name for path in cache_dir.glob("*.pdf")] == [f"{payment.id}_{payment.receipt_number}.pdf"]
+
+    assert client.get("/payments/99/receipt").status_code == 404
+
+def test_legacy_payment_numbered_on_first_print(client, db, student):
+    payment = Payment(
+        student_id=student.id, amount=80, payment_method="Check", payment_type=PaymentType.QUARTERLY,
+        payment_date=datetime(2023, 10, 2, 9, 30)
+    )
+    db.add(payment)
+    db.commit()
+
+    assert client.get(f"/payments/{payment.id}/receipt").status_code == 200
+    db.refresh(payment)
+    assert payment.receipt_number == "2023-000001"
+
+def test_cache_dir_defaults_to_backend_directory():
+    assert receipt_service.RECEIPT_CACHE_DIR == os.path.join(backend_dir, "cache", "receipts")
@@ -0,0 +1,170 @@
+"""Report card data, rendering, the content cache and the class zip bundle"""
+import io
+import os
+import zipfile
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from datetime import date
+
+from app.main import app
+from app.database.models import (
+    Base, Parent, Class, Student, Subject, Grade, Attendance, User, GradeType, AcademicPeriod, AttendanceStatus
+)
+from app.database.session import get_db, backend_dir
+from app.api.dependencies import get_current_user
+from app.schemas.academic import AcademicPeriodEnum
+from app.services import report_card_service
+from app.services.report_card_service import ReportCardService, render_report_card, cache_key, purge_cache
+
+engine = create_engine(
+    "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_card_service, "REPORT_CARD_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+@pytest.fixture
+def client(db, cache_dir):
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, username="admin", role="admin")
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_current_user, None)
+
+@pytest.fixture
+def class_obj(db):
+    parent = Parent(first_name="Karim", last_name="Haddad")
+    class_obj = Class(name="CE1 - Matin", level="CE1", time_slot="10h-13h", capacity=30, academic_year="2024-2025")
+    db.add_all([parent, class_obj])
+    db.flush()
+    db.add_all([
+        Subject(id=1, name="Mathématiques", code="MATH", class_id=class_obj.id, academic_year="2024-2025"),
+        Subject(id=2, name="Arabe", code="AR", class_id=class_obj.id, academic_year="2024-2025"),
+    ])
+    db.add_all([
+        Student(
+            id=student_id, first_name=first_name, last_name="Haddad", date_of_birth=date(2016, 1, 1), gender="F",
+            parent_id=parent.id, class_id=class_obj.id, academic_year="2024-2025"
+        )
+        for student_id, first_name in ((1, "Amira"), (2, "Sami"), (3, "Lina"))
+    ])
+    db.add_all([
+        Grade(student_id=student_id, subject_id=subject_id, grade_value=value, max_grade=20,
+              grade_type=GradeType.TEST, academic_period=AcademicPeriod[period], academic_year="2024-2025",
+              assessment_date=date(2024, 11, 4), comments=comment)
+        for student_id, subject_id, value, period, comment in (
+            (1, 1, 16, "FIRST_TERM", "Très bon travail & régulier"),
+            (1, 2, 12, "FIRST_TERM", None),
+            (1, 1, 5, "SECOND_TERM", "Second term grade"),
+            (2, 1, 9, "FIRST_TERM", ""),
+        )
+    ])
+    db.add_all([
+        Attendance(student_id=1, class_id=class_obj.id, attendance_date=date(2024, 11, day), status=status)
+        for day, status in ((4, AttendanceStatus.PRESENT), (5, AttendanceStatus.LATE), (6, AttendanceStatus.ABSENT))
+    ])
+    db.commit()
+    return class_obj
+
+def test_report_card_data(db, class_obj):
+    cards = ReportCardService.get_report_card_data(
+        db, class_obj.id, "2024-2025", AcademicPeriodEnum.FIRST_TERM, end_date=date(2024, 11, 5)
+    )
+    assert [card.first_name for card in cards] == ["Amira", "Lina", "Sami"]
+    amira, lina, _ = cards
+    assert [(s.subject_name, s.average_grade, s.comments) for s in amira.subjects] == [
+        ("Arabe", 12.0, []), ("Mathématiques", 16.0, ["Très bon travail & régulier"])
+    ]
+    assert amira.average_percentage == 70.0
+    assert (amira.attendance.total_days, amira.attendance.late_days, amira.attendance.attendance_rate) == (2, 1, 100.0)
+    assert (lina.subjects, lina.average_percentage, lina.attendance.total_days) == ([], None, 0)
+
+    # One student's card is gathered alone, identical to the class's
+    assert ReportCardService.get_report_card_data(
+        db, class_obj.id, "2024-2025", AcademicPeriodEnum.FIRST_TERM, end_date=date(2024, 11, 5), student_id=amira.student_id
+    ) == [amira]
+
+    with pytest.raises(ValueError):
+        ReportCardService.get_report_card_data(db, 99)
+
+def test_rendering_is_deterministic(db, class_obj):
+    card = ReportCardService.get_report_card_data(db, class_obj.id, "2024-2025", AcademicPeriodEnum.FIRST_TERM)[0]
+    pdf = render_report_card(card.model_dump(mode="json"))
+    assert pdf.startswith(b"%PDF")
+    assert render_report_card(card.model_dump(mode="json")) == pdf
+
+def test_class_bundle_renders_only_changed_cards(client, db, class_obj, cache_dir):
+    url = f"/academic/classes/{class_obj.id}/report-cards?academic_year=2024-2025&academic_period=first_term"
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(response.content)) as bundle:
+        assert bundle.namelist() == ["Haddad_Amira_1.pdf", "Haddad_Lina_3.pdf", "Haddad_Sami_2.pdf"]
+        assert all(bundle.read(name).startswith(b"%PDF") for name in bundle.namelist())
+
+    cached = {path.name: path.stat().st_mtime_ns for path in cache_dir.glob("*.pdf")}
+    assert len(cached) == 3
+
+    # Only Sami's data changes, so only his card gets a new cache entry
+    db.query(Grade).filter(Grade.student_id == 2).update({"grade_value": 11})
+    db.commit()
+    assert client.get(url).status_code == 200
+    after = {path.name: path.stat().st_mtime_ns for path in cache_dir.glob("*.pdf")}
+    assert len(after) == 4
+    assert all(after[name] == mtime for name, mtime in cached.items())
+
+    assert client.get("/academic/classes/99/report-cards").status_code == 404
+
+def test_process_pool_renders_missing_cards(db, class_obj, tmp_path):
+    cards = ReportCardService.get_report_card_data(db, class_obj.id, "2024-2025", AcademicPeriodEnum.FIRST_TERM)
+    paths = ReportCardService.render_report_cards(cards, workers=2, cache_dir=str(tmp_path))
+    assert sorted(paths) == [1, 2, 3]
+    for card in cards:
+        assert paths[card.student_id] == os.path.join(str(tmp_path), f"{cache_key(card)}.pdf")
+        with open(paths[card.student_id], "rb") as file:
+            assert file.read() == render_report_card(card.model_dump(mode="json"))
+
+def test_student_report_card(client, class_obj):
+    response = client.get("/academic/students/1/report-card?academic_period=first_term")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert "Haddad_Amira_1.pdf" in response.headers["content-disposition"]
+    assert response.content.startswith(b"%PDF")
+    assert client.get("/academic/students/99/report-card").status_code == 404
+
+def test_purge_cache_removes_old_cards(tmp_path):
+    old, recent = tmp_path / "old.pdf", tmp_path / "recent.pdf"
+    old.write_bytes(b"%PDF")
+    recent.write_bytes(b"%PDF")
+    os.utime(old, (0, 0))
+    assert purge_cache(str(tmp_path), max_age_days=30) == 1
+    assert [path.name for path in tmp_path.iterdir()] == ["recent.pdf"]
+    assert purge_cache(str(tmp_path / "missing")) == 0
+
+def test_cache_dir_defaults_to_backend_directory():
+    assert report_card_service.REPORT_CARD_CACHE_DIR == os.path.join(backend_dir, "cache", "report_cards")
@@ -0,0 +1,188 @@
+"""Full-text search index: trigger synchronisation, relevance order and fallbacks"""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from datetime import date, datetime
+
+from app.database.models import Base, Parent, Class, Student, Payment, PaymentType
+from app.database.search_index import create_search_index, drop_search_index
+from app.database.migrations import run_migrations
+from app.api.search import (
+    StudentSearchFilters, PaymentSearchFilters, apply_student_filters, apply_payment_filters
+)
+
+@pytest.fixture
+def test_db():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = TestingSessionLocal()
+
+    class_obj = Class(name="CP - Matin", level="CP", time_slot="10h-13h", capacity=30, academic_year="2024-2025")
+    parents = [
+        Parent(first_name="Karim", last_name="Benaïssa", phone="0611223344", email="karim@example.com"),
+        Parent(first_name="Hassan", last_name="Hassan", phone="0655667788"),
+    ]
+    db.add_all([class_obj, *parents])
+    db.flush()
+    students = [
+        Student(first_name="Yasmine", last_name="Benaïssa", parent_id=parents[0].id),
+        Student(first_name="Ali", last_name="Hassan", parent_id=parents[1].id),
+        Student(first_name="Omar", last_name="Haddad", parent_id=parents[0].id),
+    ]
+    for student in students:
+        student.date_of_birth = date(2017, 1, 1)
+        student.gender = "M"
+        student.class_id = class_obj.id
+        student.academic_year = "2024-2025"
+    db.add_all(students)
+    db.flush()
+    db.add_all([
+        Payment(
+            student_id=students[0].id, amount=100, payment_method="Cash", receipt_number="REC-2024-0001",
+            payment_type=PaymentType.INSCRIPTION, payment_date=datetime(2024, 9, 1)
+        ),
+        Payment(
+            student_id=students[1].id, amount=100, payment_method="Cash", receipt_number="REC-2024-0002",
+            payment_type=PaymentType.INSCRIPTION, payment_date=datetime(2024, 9, 2)
+        ),
+    ])
+    db.commit()
+
+    try:
+        yield db, engine, students, parents
+    finally:
+        db.close()
+
+def search_students(db, term):
+    return [s.first_name for s in apply_student_filters(db.query(Student), StudentSearchFilters(search=term)).all()]
+
+def search_payments(db, term):
+    return [p.receipt_number for p in apply_payment_filters(db.query(Payment), PaymentSearchFilters(search=term)).all()]
+
+def test_substring_search_is_case_insensitive(test_db):
+    db, _, _, _ = test_db
+    assert search_students(db, "YASM") == ["Yasmine"]
+    assert search_students(db, "mine benaïssa") == ["Yasmine"]
+    # Parent names are searchable too
+    assert sorted(search_students(db, "karim")) == ["Omar", "Yasmine"]
+    assert search_students(db, "nobody") == []
+
+def test_search_terms_are_matched_literally(test_db):
+    db, _, _, _ = test_db
+    assert search_students(db, 'Ali" OR "Omar') == []
+    assert search_payments(db, "2024-0002") == ["REC-2024-0002"]
+
+def test_results_are_ordered_by_relevance(test_db):
+    db, _, _, _ = test_db
+    # Ali Hassan, child of Hassan Hassan, matches three times
+    assert search_students(db, "hassan") == ["Ali"]
+    assert search_students(db, "benaïssa") == ["Yasmine", "Omar"]
+
+def test_short_terms_match_name_prefixes(test_db):
+    db, _, _, _ = test_db
+    assert sorted(search_students(db, "om")) == ["Omar"]
+    # Last names and parent names count too
+    assert sorted(search_students(db, "Bé")) == ["Omar", "Yasmine"]
+    assert sorted(search_payments(db, "al")) == ["REC-2024-0002"]
+    assert search_students(db, "ma") == []
+    # Nothing is left of these once folded: they must not match every name
+    assert search_students(db, "-") == []
+    assert search_students(db, ".") == []
+    assert search_payments(db, "-") == []
+    assert search_payments(db, "RE") == ["REC-2024-0001", "REC-2024-0002"]
+
+def test_search_ignores_accents_and_separators(test_db):
+    db, _, students, _ = test_db
+    assert search_students(db, "benaissa") == ["Yasmine", "Omar"]
+    assert search_students(db, "yasmine ben-aïssa") == ["Yasmine"]
+    assert search_payments(db, "BENAISSA") == ["REC-2024-0001"]
+
+    students[2].first_name = "Abd el Kader"
+    db.commit()
+    assert search_students(db, "abdelkader") == ["Abd el Kader"]
+    assert search_students(db, "Abdel") == ["Abd el Kader"]
+
+def test_search_columns_follow_writes(test_db):
+    db, _, students, parents = test_db
+    assert (students[0].search_name, students[0].search_name_reversed) == ("yasminebenaissa", "benaissayasmine")
+    assert (parents[0].phone_digits, parents[1].mobile_digits) == ("0611223344", None)
+
+    parents[1].mobile = "+33 6 12-34-56-78"
+    students[1].last_name = "Haddad"
+    db.commit()
+    assert parents[1].mobile_digits == "33612345678"
+    assert students[1].search_name_reversed == "haddadali"
+
+def test_short_term_search_uses_indexes(test_db):
+    db, engine, _, _ = test_db
+    for query in (
+        apply_student_filters(db.query(Student), StudentSearchFilters(search="be")),
+        apply_payment_filters(db.query(Payment), PaymentSearchFilters(search="be")),
+    ):
+        statement = query.statement.compile(engine, compile_kwargs={"literal_binds": True})
+        with engine.connect() as connection:
+            plan = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}")]
+        assert not any(detail.startswith(("SCAN students", "SCAN parents", "SCAN payments")) for detail in plan), plan
+
+def test_triggers_follow_renames_and_deletes(test_db):
+    db, _, students, parents = test_db
+
+    parents[1].first_name = "Mourad"
+    students[0].first_name = "Nour"
+    db.commit()
+    assert search_students(db, "mourad") == ["Ali"]
+    assert search_students(db, "yasmine") == []
+    assert search_payments(db, "nour") == ["REC-2024-0001"]
+
+    db.query(Payment).filter(Payment.student_id == students[1].id).delete()
+    db.delete(students[1])
+    db.commit()
+    assert search_students(db, "mourad") == []
+    assert search_payments(db, "hassan") == []
+
+def test_search_uses_the_index(test_db):
+    db, engine, _, _ = test_db
+    query = apply_student_filters(db.query(Student), StudentSearchFilters(search="benaïssa"))
+    statement = query.statement.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as connection:
+        plan = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}")]
+    assert any("VIRTUAL TABLE INDEX" in detail for detail in plan), plan
+    assert not any(detail.startswith("SCAN students") for detail in plan), plan
+
+def test_missing_index_is_rebuilt_from_existing_rows(test_db):
+    db, engine, _, _ = test_db
+    with engine.begin() as connection:
+        drop_search_index(connection)
+        connection.execute(text("UPDATE students SET first_name = 'Lina' WHERE first_name = 'Omar'"))
+        create_search_index(connection)
+    assert search_students(db, "lina") == ["Lina"]
+    assert search_payments(db, "rec-2024") != []
+
+def test_migration_backfills_search_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        drop_search_index(connection)
+        for table, columns in (
+            ("students", ("search_name", "search_name_reversed")),
+            ("parents", ("search_name", "search_name_reversed", "phone_digits", "mobile_digits")),
+        ):
+            for column in columns:
+                connection.exec_driver_sql(f"DROP INDEX ix_{table}_{column}")
+                connection.exec_driver_sql(f"ALTER TABLE {table} DROP COLUMN {column}")
+        connection.exec_driver_sql("INSERT INTO parents (id, first_name, last_name, phone) VALUES (1, 'Karim', 'Benaïssa', '06 11 22 33 44')")
+        connection.exec_driver_sql(
+            "INSERT INTO students (id, first_name, last_name, date_of_birth, gender, parent_id, academic_year) "
+            "VALUES (1, 'Yasmine', 'Benaïssa', '2017-01-01', 'F', 1, '2024-2025')"
+        )
+
+    assert "0004" in run_migrations(engine)
+
+    db = sessionmaker(bind=engine)()
+    try:
+        assert db.get(Parent, 1).phone_digits == "0611223344"
+        assert search_students(db, "benaissa") == ["Yasmine"]
+        assert search_students(db, "be") == ["Yasmine"]
+    finally:
+        db.close()
@@ -0,0 +1,144 @@
+"""Seat allocation: the maintained enrollment counter and concurrent confirmations"""
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models import Base, Parent, Class, Student, RegistrationStatus
+from app.database.session import create_sqlite_engine
+from app.database.counters import rebuild_class_enrollment
+from app.database.migrations import run_migrations
+from app.services.class_service import allocate_seat
+from app.services.registration_service import confirm_registration
+
+@pytest.fixture
+def engine(tmp_path):
+    # A file database in WAL mode, shared by many connections like in production
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'seats.db'}")
+    Base.metadata.create_all(bind=engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+def add_class(db, capacity, pending=0, confirmed=0):
+    parent = Parent(first_name="Karim", last_name="Haddad")
+    class_obj = Class(name=f"CP {capacity}", level="CP", time_slot="10h-13h", capacity=capacity, academic_year="2024-2025")
+    db.add_all([parent, class_obj])
+    db.flush()
+    statuses = [RegistrationStatus.PENDING] * pending + [RegistrationStatus.CONFIRMED] * confirmed
+    students = [
+        Student(
+            first_name=f"Student{i}", last_name="Haddad", date_of_birth=date(2017, 1, 1), gender="M",
+            parent_id=parent.id, class_id=class_obj.id, academic_year="2024-2025", registration_status=status
+        )
+        for i, status in enumerate(statuses)
+    ]
+    db.add_all(students)
+    db.commit()
+    return class_obj, students
+
+def confirmed_in(db, class_id):
+    return db.query(func.count(Student.id)).filter(
+        Student.class_id == class_id, Student.registration_status == RegistrationStatus.CONFIRMED
+    ).scalar()
+
+def test_enrolled_count_follows_every_write(engine):
+    db = sessionmaker(bind=engine)()
+    try:
+        first, students = add_class(db, capacity=10, pending=2, confirmed=3)
+        second, _ = add_class(db, capacity=10)
+        assert first.enrolled_count == 3
+
+        students[0].registration_status = RegistrationStatus.CONFIRMED
+        students[2].class_id = second.id
+        db.delete(students[3])
+        students[4].registration_status = RegistrationStatus.CANCELLED
+        db.commit()
+
+        for class_obj in (first, second):
+            db.refresh(class_obj)
+            assert class_obj.enrolled_count == confirmed_in(db, class_obj.id)
+        assert (first.enrolled_count, second.enrolled_count) == (1, 1)
+
+        with engine.begin() as connection:
+            connection.exec_driver_sql("UPDATE classes SET enrolled_count = 99")
+            rebuild_class_enrollment(connection)
+        db.refresh(first)
+        assert first.enrolled_count == 1
+    finally:
+        db.close()
+
+def test_allocate_seat_stops_at_capacity(engine):
+    db = sessionmaker(bind=engine)()
+    try:
+        class_obj, students = add_class(db, capacity=2, pending=3)
+        assert [allocate_seat(db, s.id) for s in students] == [True, True, False]
+        # Already confirmed students do not take a second seat
+        assert allocate_seat(db, students[0].id) is False
+        db.commit()
+        db.refresh(class_obj)
+        assert class_obj.enrolled_count == confirmed_in(db, class_obj.id) == 2
+
+        with pytest.raises(HTTPException) as exc_info:
+            confirm_registration(db, students[2].id)
+        assert exc_info.value.detail == "Class is now full"
+        with pytest.raises(HTTPException) as exc_info:
+            confirm_registration(db, students[0].id)
+        assert exc_info.value.detail == "Registration already confirmed"
+    finally:
+        db.close()
+
+def test_concurrent_confirmations_never_overbook(engine):
+    SessionLocal = sessionmaker(bind=engine)
+    db = SessionLocal()
+    try:
+        class_obj, students = add_class(db, capacity=25, pending=200)
+        class_id, student_ids = class_obj.id, [s.id for s in students]
+    finally:
+        db.close()
+
+    def confirm(student_id):
+        session = SessionLocal()
+        try:
+            confirm_registration(session, student_id)
+            return "confirmed"
+        except HTTPException as exc:
+            return exc.detail
+        finally:
+            session.close()
+
+    # Every desk confirms at once, each with its own connection. Losing a
+    # race is reported as a full class, never as a lock error to retry.
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        outcomes = list(pool.map(confirm, student_ids))
+
+    assert outcomes.count("confirmed") == 25
+    assert outcomes.count("Class is now full") == 175
+
+    db = SessionLocal()
+    try:
+        assert db.get(Class, class_id).enrolled_count == confirmed_in(db, class_id) == 25
+    finally:
+        db.close()
+
+def test_migration_backfills_enrolled_count(tmp_path):
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        class_obj, _ = add_class(db, capacity=10, pending=1, confirmed=4)
+        with engine.begin() as connection:
+            for name in ("students_enrollment_ai", "students_enrollment_au", "students_enrollment_ad"):
+                connection.exec_driver_sql(f"DROP TRIGGER {name}")
+            connection.exec_driver_sql("ALTER TABLE classes DROP COLUMN enrolled_count")
+
+        assert "0006" in run_migrations(engine)
+
+        db.refresh(class_obj)
+        assert class_obj.enrolled_count == 4
+    finally:
+        db.close()
+        engine.dispose()
@@ -0,0 +1,169 @@
+"""Dashboard statistics served from the student counters"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from datetime import date, datetime, timedelta
+
+from app.main import app
+from app.database.models import (
+    Base, Parent, Class, Student, StudentCounter, Attendance, AttendanceStatus, User, RegistrationStatus
+)
+from app.database.session import get_db
+from app.database.counters import rebuild_student_counters
+from app.api.dependencies import get_current_user
+
+engine = create_engine(
+    "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def client(db):
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, username="admin", role="admin")
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_current_user, None)
+
+@pytest.fixture
+def students(db):
+    parent = Parent(first_name="Karim", last_name="Haddad")
+    class_obj = Class(name="CP - Matin", level="CP", time_slot="10h-13h", capacity=30, academic_year="2024-2025")
+    db.add_all([parent, class_obj])
+    db.flush()
+    rows = []
+    for i, (status, gender, year) in enumerate([
+        (RegistrationStatus.PENDING, "M", "2024-2025"),
+        (RegistrationStatus.PENDING, "F", "2024-2025"),
+        (RegistrationStatus.CONFIRMED, "F", "2024-2025"),
+        (RegistrationStatus.CONFIRMED, "M", "2023-2024"),
+        (RegistrationStatus.CANCELLED, "F", "2023-2024"),
+    ]):
+        rows.append(Student(
+            first_name=f"Student{i}", last_name="Haddad", date_of_birth=date(2017, 1, 1), gender=gender,
+            parent_id=parent.id, class_id=class_obj.id, academic_year=year, registration_status=status,
+            registration_date=datetime.now() if i < 3 else datetime.now() - timedelta(days=400)
+        ))
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+def expected_stats(db, academic_year=None):
+    """The statistics computed the slow way, straight from the students table"""
+    query = db.query(Student)
+    if academic_year:
+        query = query.filter(Student.academic_year == academic_year)
+    students = query.all()
+    return {
+        "total_students": len(students),
+        "pending": sum(s.registration_status == RegistrationStatus.PENDING for s in students),
+        "confirmed": sum(s.registration_status == RegistrationStatus.CONFIRMED for s in students),
+        "cancelled": sum(s.registration_status == RegistrationStatus.CANCELLED for s in students),
+        "male_students": sum(s.gender == "M" for s in students),
+        "female_students": sum(s.gender == "F" for s in students),
+    }
+
+def get_stats(client, url="/stats/students"):
+    response = client.get(url)
+    assert response.status_code == 200
+    data = response.json()
+    return data, {key: data[key] for key in (
+        "total_students", "pending", "confirmed", "cancelled", "male_students", "female_students"
+    )}
+
+def test_statistics_match_students(client, db, students):
+    data, totals = get_stats(client)
+    assert totals == expected_stats(db)
+    assert data["new_this_month"] == 3
+
+    _, totals = get_stats(client, "/stats/students?academic_year=2023-2024")
+    assert totals == expected_stats(db, "2023-2024")
+
+def test_counters_follow_status_changes_and_deletes(client, db, students):
+    response = client.put(f"/registrations/registrations/{students[0].id}/confirm")
+    assert response.status_code == 200
+    students[1].gender = "M"
+    db.delete(students[4])
+    db.commit()
+
+    _, totals = get_stats(client)
+    assert totals == expected_stats(db)
+    assert totals["confirmed"] == 3
+
+def test_rolled_back_writes_leave_counters_untouched(client, db, students):
+    students[0].registration_status = RegistrationStatus.CANCELLED
+    db.flush()
+    db.rollback()
+    _, totals = get_stats(client)
+    assert totals == expected_stats(db)
+
+def test_statistics_do_not_scan_students(client, db, students):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        get_stats(client)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert len(statements) == 3
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            assert not any(row[-1].startswith(("SCAN students", "SCAN attendance")) for row in plan), plan
+
+def test_present_today_counts_present_and_late(client, db, students):
+    today, yesterday = date.today(), date.today() - timedelta(days=1)
+    db.add_all([
+        Attendance(student_id=student.id, class_id=student.class_id, attendance_date=day, status=status)
+        for student, day, status in (
+            (students[0], today, AttendanceStatus.PRESENT),
+            (students[1], today, AttendanceStatus.LATE),
+            (students[2], today, AttendanceStatus.ABSENT),
+            (students[2], yesterday, AttendanceStatus.PRESENT),
+        )
+    ])
+    db.commit()
+
+    data, _ = get_stats(client)
+    assert data["present_today"] == 2
+    data, _ = get_stats(client, "/stats/students?academic_year=2023-2024")
+    assert data["present_today"] == 0
+
+def test_rebuild_recomputes_counters(db, students):
+    with engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE student_counters SET count = 99")
+        rebuild_student_counters(connection)
+    counts = {
+        (row.academic_year, row.status, row.gender): row.count
+        for row in db.query(StudentCounter).all()
+    }
+    assert counts == {
+        ("2024-2025", "PENDING", "M"): 1,
+        ("2024-2025", "PENDING", "F"): 1,
+        ("2024-2025", "CONFIRMED", "F"): 1,
+        ("2023-2024", "CONFIRMED", "M"): 1,
+        ("2023-2024", "CANCELLED", "F"): 1,
+    }